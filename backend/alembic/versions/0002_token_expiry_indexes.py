@@ -0,0 +1,53 @@
+"""token expiry indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+
+Partial indexes cover the refresh/reset lookups (live tokens only) and plain
+``expires_at`` indexes let the background sweeper find dead rows in batches.
+On PostgreSQL the indexes are built concurrently so large token tables stay
+writable during the upgrade.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_refresh_tokens_active_token', 'refresh_tokens', ['token', 'expires_at'], unique=False,
+            postgresql_where=sa.text('NOT is_revoked'), sqlite_where=sa.text('is_revoked = 0'),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'], unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_password_reset_tokens_unused_token', 'password_reset_tokens', ['token', 'expires_at'], unique=False,
+            postgresql_where=sa.text('NOT used'), sqlite_where=sa.text('used = 0'),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_password_reset_tokens_expires_at', 'password_reset_tokens', ['expires_at'], unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_password_reset_tokens_expires_at', table_name='password_reset_tokens')
+    op.drop_index('ix_password_reset_tokens_unused_token', table_name='password_reset_tokens')
+    op.drop_index('ix_refresh_tokens_expires_at', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_active_token', table_name='refresh_tokens')
@@ -0,0 +1,36 @@
+"""mood history index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:30:00.000000
+
+Keyset pagination and exports read one user's entries ordered by
+``(created_at, id)``; the composite index serves both and makes the
+single-column ``user_id`` index redundant.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_mood_entries_user_created_id', 'mood_entries', ['user_id', 'created_at', 'id'], unique=False,
+            postgresql_concurrently=True,
+        )
+    op.drop_index(op.f('ix_mood_entries_user_id'), table_name='mood_entries')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_mood_entries_user_id'), 'mood_entries', ['user_id'], unique=False)
+    op.drop_index('ix_mood_entries_user_created_id', table_name='mood_entries')
@@ -0,0 +1,51 @@
+"""mood rollups
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 11:00:00.000000
+
+Tables start empty; run ``scripts/rebuild_mood_rollups.py`` once after
+upgrading to backfill rollups for existing entries.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('mood_rollup_emojis',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=8), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('emoji', sa.String(length=32), nullable=False),
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'period', 'period_start', 'emoji')
+    )
+    op.create_table('mood_rollups',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=8), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Integer(), nullable=False),
+    sa.Column('score_min', sa.Integer(), nullable=False),
+    sa.Column('score_max', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'period', 'period_start')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('mood_rollups')
+    op.drop_table('mood_rollup_emojis')
@@ -0,0 +1,50 @@
+"""token revocation
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 11:30:00.000000
+
+Adds ``refresh_tokens.revoked_at`` and the ``revoked_access_tokens`` table so
+each worker can rebuild its in-memory revocation list at startup and poll for
+revocations made since its last sync. The ``revoked_at`` index on the large
+``refresh_tokens`` table is built concurrently on PostgreSQL.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('revoked_access_tokens',
+    sa.Column('jti', sa.String(length=32), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('jti')
+    )
+    op.create_index(op.f('ix_revoked_access_tokens_expires_at'), 'revoked_access_tokens', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_revoked_access_tokens_revoked_at'), 'revoked_access_tokens', ['revoked_at'], unique=False)
+    op.add_column('refresh_tokens', sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_refresh_tokens_revoked_at', 'refresh_tokens', ['revoked_at'], unique=False,
+            postgresql_where=sa.text('revoked_at IS NOT NULL'), sqlite_where=sa.text('revoked_at IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_tokens_revoked_at', table_name='refresh_tokens')
+    op.drop_column('refresh_tokens', 'revoked_at')
+    op.drop_index(op.f('ix_revoked_access_tokens_revoked_at'), table_name='revoked_access_tokens')
+    op.drop_index(op.f('ix_revoked_access_tokens_expires_at'), table_name='revoked_access_tokens')
+    op.drop_table('revoked_access_tokens')
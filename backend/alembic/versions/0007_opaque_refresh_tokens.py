@@ -0,0 +1,91 @@
+"""opaque refresh tokens
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 12:00:00.000000
+
+Adds ``refresh_tokens.token_hash``, the SHA-256 digest that opaque refresh
+tokens are looked up by, and backfills it for the existing JWT refresh tokens
+so they keep working until they expire. ``token`` becomes nullable and keeps
+its unique index during the dual-read period. Older app instances still
+running during a rolling deploy write rows without a digest, and those rows
+are matched on ``token`` instead. The partial ``(token, expires_at)`` index is
+dropped.
+
+Once REFRESH_TOKEN_EXPIRE_DAYS have passed with every instance on this
+version, a follow-up migration can drop ``token`` and make ``token_hash`` NOT
+NULL.
+
+Downgrading deletes refresh tokens that only exist as digests; those users
+have to sign in again.
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+refresh_tokens = sa.table(
+    'refresh_tokens',
+    sa.column('id', sa.Integer),
+    sa.column('token', sa.String),
+    sa.column('token_hash', sa.LargeBinary),
+)
+
+
+def _backfill_token_hashes() -> None:
+    """Digest legacy tokens in id order, one short batch at a time"""
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(refresh_tokens.c.id, refresh_tokens.c.token)
+            .where(refresh_tokens.c.id > last_id, refresh_tokens.c.token_hash.is_(None))
+            .order_by(refresh_tokens.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            refresh_tokens.update()
+            .where(refresh_tokens.c.id == sa.bindparam('row_id'))
+            .values(token_hash=sa.bindparam('digest')),
+            [{'row_id': row_id, 'digest': hashlib.sha256(token.encode()).digest()} for row_id, token in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_refresh_tokens_active_token', table_name='refresh_tokens')
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.add_column(sa.Column('token_hash', sa.LargeBinary(length=32), nullable=True))
+        batch_op.alter_column('token', existing_type=sa.VARCHAR(), nullable=True)
+    _backfill_token_hashes()
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_refresh_tokens_token_hash'), 'refresh_tokens', ['token_hash'], unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_refresh_tokens_token_hash'), table_name='refresh_tokens')
+    op.execute(refresh_tokens.delete().where(refresh_tokens.c.token.is_(None)))
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.alter_column('token', existing_type=sa.VARCHAR(), nullable=False)
+        batch_op.drop_column('token_hash')
+    op.create_index(
+        'ix_refresh_tokens_active_token', 'refresh_tokens', ['token', 'expires_at'], unique=False,
+        postgresql_where=sa.text('NOT is_revoked'), sqlite_where=sa.text('is_revoked = 0'),
+    )
@@ -0,0 +1,49 @@
+"""email jobs
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 13:00:00.000000
+
+Adds ``email_jobs``, the durable queue that request handlers insert outbound
+email into (in the same transaction as the change that triggers it) and that
+email workers drain. Sent jobs are deleted, so the table only holds pending
+and failed ones; workers poll it through a partial index on ``run_at`` of the
+pending jobs.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('email_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('template', sa.String(length=50), nullable=False),
+    sa.Column('recipient', sa.String(), nullable=False),
+    sa.Column('context', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_email_jobs_pending_run_at', 'email_jobs', ['run_at'], unique=False,
+        postgresql_where=sa.text("status = 'pending'"), sqlite_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_email_jobs_pending_run_at', table_name='email_jobs')
+    op.drop_table('email_jobs')
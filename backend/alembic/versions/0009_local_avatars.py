@@ -0,0 +1,89 @@
+"""local avatars
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 14:00:00.000000
+
+Points users still on the default DiceBear avatar at the identicon served by
+this API (``API_URL/api/v1/avatars/<sha256 of email>.svg``), so pages stop
+making a third-party request per avatar. Only the exact URL that registration
+generated (``.../7.x/avataaars/svg?seed=<email>``) is replaced; avatars users
+set themselves, DiceBear ones included, are left alone. Data only; the schema
+does not change.
+
+``API_URL`` is read from the environment (``.env`` included; default
+``http://localhost:8000``), not from the app's settings, so this revision does not depend on how the app
+parses its configuration. Set it to the same value as the API.
+
+Downgrading points the generated local identicons back at DiceBear.
+"""
+import hashlib
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+DICEBEAR_PREFIX = 'https://api.dicebear.com/7.x/avataaars/svg?seed='
+LOCAL_PREFIX = os.environ.get('API_URL', 'http://localhost:8000').rstrip('/') + '/api/v1/avatars/'
+
+users = sa.table(
+    'users',
+    sa.column('id', sa.Integer),
+    sa.column('email', sa.String),
+    sa.column('avatar_url', sa.String),
+)
+
+
+def _dicebear_url(email: str) -> str:
+    return f"{DICEBEAR_PREFIX}{email}"
+
+
+def _local_url(email: str) -> str:
+    return f"{LOCAL_PREFIX}{hashlib.sha256(email.strip().lower().encode()).hexdigest()}.svg"
+
+
+def _rewrite_avatars(prefix: str, old_url, new_url) -> None:
+    """Replace ``old_url(email)`` with ``new_url(email)``, scanning avatars under ``prefix`` in batches"""
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(users.c.id, users.c.email, users.c.avatar_url)
+            .where(users.c.id > last_id, users.c.avatar_url.startswith(prefix, autoescape=True))
+            .order_by(users.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = [
+            {'row_id': row_id, 'url': new_url(email)}
+            for row_id, email, avatar_url in rows
+            if avatar_url == old_url(email)
+        ]
+        if updates:
+            bind.execute(
+                users.update()
+                .where(users.c.id == sa.bindparam('row_id'))
+                .values(avatar_url=sa.bindparam('url')),
+                updates,
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rewrite_avatars(DICEBEAR_PREFIX, _dicebear_url, _local_url)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rewrite_avatars(LOCAL_PREFIX, _local_url, _dicebear_url)
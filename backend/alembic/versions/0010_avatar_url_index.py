@@ -0,0 +1,34 @@
+"""avatar url index
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 15:00:00.000000
+
+Indexes ``users.avatar_url``. The avatar endpoint looks up whether a key
+belongs to a user before writing its identicon to the on-disk cache, so
+unauthenticated requests for random keys cannot fill the disk. Built
+concurrently on PostgreSQL.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_users_avatar_url'), 'users', ['avatar_url'], unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_avatar_url'), table_name='users')
@@ -1,35 +1,54 @@
+import logging
 from datetime import datetime, timedelta
-import os
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from fastapi.security import HTTPAuthorizationCredentials, OAuth2PasswordRequestForm
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models import User
 from ..schemas import UserCreate, UserLogin, UserResponse, Token, UserUpdate, PasswordResetRequest, PasswordReset, PasswordChange, RefreshToken
 from ..core.auth import (
-    get_password_hash, 
-    verify_password, 
-    create_access_token, 
+    create_access_token,
     get_current_active_user,
     create_password_reset_token,
     verify_password_reset_token,
-    create_refresh_token,
-    verify_refresh_token
+    verify_token,
+    optional_security,
+    token_signer
 )
+from ..core.token_cache import UserSnapshot, token_cache
+from ..core.revocation import refresh_key, revocation_list, revoke_access_token, revoke_refresh_token
+from ..core.token_issuance import issue_login_tokens, issue_registration_tokens
+from ..core.hashing import hash_password_async, verify_and_update_password_async, verify_password_async
+from ..core.refresh_tokens import get_refresh_token_owner
+from ..core.settings import settings
+from ..core.rate_limit import login_rate_limit, password_reset_rate_limit
+from ..core.serialization import ORJSONResponse, serialize
+from ..core.email_queue import enqueue_email
+from ..core.avatars import avatar_url
 
-router = APIRouter(prefix="/auth", tags=["authentication"])
+router = APIRouter(prefix="/auth", tags=["authentication"], default_response_class=ORJSONResponse)
+
+logger = logging.getLogger(__name__)
+
+# Built once; see app.core.serialization
+_token_adapter = TypeAdapter(Token)
+_user_adapter = TypeAdapter(UserResponse)
 
 def generate_avatar_url(email: str) -> str:
-    """Generate avatar URL using DiceBear API"""
-    return f"https://api.dicebear.com/7.x/avataaars/svg?seed={email}"
+    """Default avatar: an identicon served by this API (see app.core.avatars)"""
+    return avatar_url(email)
 
 @router.post("/register", response_model=Token)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    result = await db.execute(select(User).where(User.email == user_data.email))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -37,7 +56,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
     avatar_url = generate_avatar_url(user_data.email)
     
     db_user = User(
@@ -48,49 +67,32 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         last_login=datetime.utcnow()
     )
     
+    # Store the user, its refresh token and the welcome email job in one transaction
+    enqueue_email(db, "welcome", db_user.email, {"name": db_user.name})
     try:
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        access_token, refresh_token = await issue_registration_tokens(db, db_user)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Create access token and refresh token
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": db_user.email}, expires_delta=access_token_expires
-    )
-    refresh_token = create_refresh_token(db_user.id)
+    logger.info("Welcome email queued", extra={"event": "auth.registered", "user_id": db_user.id})
     
-    # Store refresh token in database
-    from ..models import RefreshToken
-    db_refresh_token = RefreshToken(
-        user_id=db_user.id,
-        token=refresh_token,
-        expires_at=datetime.utcnow() + timedelta(days=7)
-    )
-    db.add(db_refresh_token)
-    db.commit()
-    
-    # Log welcome message (email service removed)
-    print(f"Welcome email would be sent to {user_data.email} for user {user_data.name}")
-    
-    return {
+    return serialize(_token_adapter, {
         "access_token": access_token,
         "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": db_user
-    }
+    })
 
-@router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+@router.post("/login", response_model=Token, dependencies=[Depends(login_rate_limit)])
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login user"""
     # Find user by email
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    result = await db.execute(select(User).where(User.email == user_credentials.email))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -99,7 +101,8 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
         )
     
     # Verify password
-    if not verify_password(user_credentials.password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password_async(user_credentials.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -113,83 +116,94 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Inactive user"
         )
     
-    # Update last login
-    user.last_login = datetime.utcnow()
-    db.commit()
-    
-    # Create access token and refresh token
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    refresh_token = create_refresh_token(user.id)
+    # Upgrade a hash made at an older, cheaper cost; committed with the login
+    if new_hash is not None:
+        user.hashed_password = new_hash
     
-    # Store refresh token in database
-    from ..models import RefreshToken
-    db_refresh_token = RefreshToken(
-        user_id=user.id,
-        token=refresh_token,
-        expires_at=datetime.utcnow() + timedelta(days=7)
-    )
-    db.add(db_refresh_token)
-    db.commit()
+    # Update last login and store refresh token in one transaction
+    try:
+        access_token, refresh_token = await issue_login_tokens(db, user)
+    except LookupError:
+        # Deleted since the lookup above
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    return {
+    return serialize(_token_adapter, {
         "access_token": access_token,
         "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": user
-    }
+    })
+
+@router.get("/jwks")
+async def jwks():
+    """Public keys for verifying access tokens (empty when tokens use an HMAC secret)"""
+    return token_signer.jwks()
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_info(current_user: UserSnapshot = Depends(get_current_active_user)):
     """Get current user information"""
-    return current_user
+    return serialize(_user_adapter, current_user)
 
 @router.put("/me", response_model=UserResponse)
-def update_current_user(
+async def update_current_user(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update current user information"""
+    user = await db.get(User, current_user.id)
+    if user is None:
+        # Deleted after its cached snapshot let the request through
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
     # Update user fields
     if user_update.name is not None:
-        current_user.name = user_update.name
+        user.name = user_update.name
     if user_update.avatar_url is not None:
-        current_user.avatar_url = user_update.avatar_url
-    
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+        user.avatar_url = user_update.avatar_url
+    
+    await db.commit()
+    await db.refresh(user)
+    # Cache the new values rather than only dropping the old ones, so the next
+    # request does not reload the user from a replica that may still lag
+    await token_cache.invalidate_user(user.id, user.email)
+    await token_cache.put_user(UserSnapshot.from_user(user))
+    return serialize(_user_adapter, user)
 
 @router.post("/refresh")
-def refresh_token(refresh_data: RefreshToken, db: Session = Depends(get_db)):
+async def refresh_token(refresh_data: RefreshToken, db: AsyncSession = Depends(get_async_db)):
     """Refresh access token using refresh token"""
-    # Verify refresh token
-    user_id = verify_refresh_token(refresh_data.refresh_token)
-    if not user_id:
+    # Revocations this worker knows about are rejected in memory, without a query.
+    # The list is only a fast reject: it can lag revocations made by other workers.
+    if revocation_list.is_revoked(refresh_key(refresh_data.refresh_token)):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid refresh token"
+            detail="Invalid or expired refresh token"
         )
     
-    # Check if refresh token exists and is not revoked
-    from ..models import RefreshToken
-    db_refresh_token = db.query(RefreshToken).filter(
-        RefreshToken.token == refresh_data.refresh_token,
-        RefreshToken.is_revoked == False,
-        RefreshToken.expires_at > datetime.utcnow()
-    ).first()
-    
-    if not db_refresh_token:
+    # The stored row is authoritative for revocation and expiry (one probe of the token_hash index)
+    user_id = await get_refresh_token_owner(db, refresh_data.refresh_token)
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token"
         )
     
     # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await token_cache.get_user_by_id(user_id)
+    if user is None:
+        db_user = await db.get(User, user_id)
+        if db_user:
+            user = UserSnapshot.from_user(db_user)
+            await token_cache.put_user(user)
     if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -208,25 +222,34 @@ def refresh_token(refresh_data: RefreshToken, db: Session = Depends(get_db)):
     }
 
 @router.post("/logout")
-def logout(refresh_data: RefreshToken, db: Session = Depends(get_db)):
-    """Logout user and revoke refresh token"""
+async def logout(
+    refresh_data: RefreshToken,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Logout user and revoke refresh token (and the access token, if sent)"""
     # Revoke refresh token
-    from ..models import RefreshToken
-    db_refresh_token = db.query(RefreshToken).filter(
-        RefreshToken.token == refresh_data.refresh_token
-    ).first()
-    
-    if db_refresh_token:
-        db_refresh_token.is_revoked = True
-        db.commit()
+    await revoke_refresh_token(db, refresh_data.refresh_token)
+    
+    # Revoke the bearer access token so it stops working before it expires
+    if credentials is not None:
+        token_data = token_cache.get_claims(credentials.credentials)
+        if token_data is None:
+            try:
+                token_data = verify_token(credentials.credentials, HTTPException(status_code=401))
+            except HTTPException:
+                token_data = None
+        if token_data is not None and token_data.jti:
+            await revoke_access_token(db, token_data.jti, token_data.expires_at)
     
     return {"message": "Successfully logged out"}
 
-@router.post("/forgot-password")
-def forgot_password(request: PasswordResetRequest, db: Session = Depends(get_db)):
+@router.post("/forgot-password", dependencies=[Depends(password_reset_rate_limit)])
+async def forgot_password(request: PasswordResetRequest, db: AsyncSession = Depends(get_async_db)):
     """Request password reset"""
     # Check if user exists
-    user = db.query(User).filter(User.email == request.email).first()
+    result = await db.execute(select(User).where(User.email == request.email))
+    user = result.scalars().first()
     if not user:
         # Don't reveal if email exists or not for security
         return {"message": "If the email exists, a password reset link has been sent"}
@@ -242,19 +265,23 @@ def forgot_password(request: PasswordResetRequest, db: Session = Depends(get_db)
         expires_at=datetime.utcnow() + timedelta(hours=1)
     )
     
+    # The email is sent by the email worker once this commits
     try:
         db.add(db_token)
-        db.commit()
+        enqueue_email(db, "password_reset", user.email, {"name": user.name, "token": reset_token})
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         return {"message": "If the email exists, a password reset link has been sent"}
     
-    # Log password reset request (email service removed)
-    print(f"Password reset email would be sent to {request.email}")
-    print(f"Reset token: {reset_token}")
+    # Never log the token itself
+    logger.info(
+        "Password reset email queued",
+        extra={"event": "auth.password_reset_requested", "user_id": user.id},
+    )
     
     # In development, return token for testing
-    if os.getenv("ENVIRONMENT") == "development":
+    if settings.environment == "development":
         return {
             "message": "If the email exists, a password reset link has been sent",
             "reset_token": reset_token  # Only in development
@@ -262,7 +289,7 @@ def forgot_password(request: PasswordResetRequest, db: Session = Depends(get_db)
     return {"message": "If the email exists, a password reset link has been sent"}
 
 @router.post("/reset-password")
-def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db)):
+async def reset_password(reset_data: PasswordReset, db: AsyncSession = Depends(get_async_db)):
     """Reset password using token"""
     # Verify token
     email = verify_password_reset_token(reset_data.token)
@@ -274,11 +301,14 @@ def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db)):
     
     # Check if token exists and is not used
     from ..models import PasswordResetToken
-    db_token = db.query(PasswordResetToken).filter(
-        PasswordResetToken.token == reset_data.token,
-        PasswordResetToken.used == False,
-        PasswordResetToken.expires_at > datetime.utcnow()
-    ).first()
+    result = await db.execute(
+        select(PasswordResetToken).where(
+            PasswordResetToken.token == reset_data.token,
+            PasswordResetToken.used == False,
+            PasswordResetToken.expires_at > datetime.utcnow()
+        )
+    )
+    db_token = result.scalars().first()
     
     if not db_token:
         raise HTTPException(
@@ -287,49 +317,59 @@ def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db)):
         )
     
     # Update user password
-    user = db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User not found"
         )
     
-    user.hashed_password = get_password_hash(reset_data.new_password)
+    user.hashed_password = await hash_password_async(reset_data.new_password)
     db_token.used = True
     
     try:
-        db.commit()
+        await db.commit()
         return {"message": "Password reset successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to reset password"
         )
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     password_data: PasswordChange,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Change password for authenticated user"""
+    user = await db.get(User, current_user.id)
+    if user is None:
+        # Deleted after its cached snapshot let the request through
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
     # Verify current password
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    if not await verify_password_async(password_data.current_password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
     
     # Update password
-    current_user.hashed_password = get_password_hash(password_data.new_password)
+    user.hashed_password = await hash_password_async(password_data.new_password)
     
     try:
-        db.commit()
+        await db.commit()
         return {"message": "Password changed successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to change password"
-        ) 
\ No newline at end of file
+        )
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, Path, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ..database import get_async_read_session_factory
+from ..models import User
+from ..core.avatars import AVATAR_CACHE_CONTROL, avatar_cache, avatar_url_for_key
+
+router = APIRouter(prefix="/avatars", tags=["avatars"])
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as RFC 9110 asks for If-None-Match"""
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+@router.get(
+    "/{key}.svg",
+    response_class=Response,
+    responses={200: {"content": {"image/svg+xml": {}}}, 304: {"description": "Not modified"}},
+)
+async def get_avatar(
+    request: Request,
+    key: str = Path(pattern=r"^[0-9a-f]{64}$"),
+    session_factory: async_sessionmaker = Depends(get_async_read_session_factory),
+):
+    """Identicon for an avatar key (the SHA-256 of an email); the content never changes"""
+    async def is_known(key: str) -> bool:
+        # Only consulted when the avatar is in neither cache; probes ix_users_avatar_url
+        async with session_factory() as db:
+            result = await db.execute(select(User.id).where(User.avatar_url == avatar_url_for_key(key)).limit(1))
+            return result.first() is not None
+
+    content, etag = await avatar_cache.get(key, is_known)
+    headers = {"ETag": etag, "Cache-Control": AVATAR_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content, media_type="image/svg+xml", headers=headers)
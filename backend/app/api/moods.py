@@ -0,0 +1,303 @@
+from datetime import date, datetime, timezone
+from typing import Annotated, List, Literal, Optional, Tuple
+import base64
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import Field, TypeAdapter, ValidationError
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..database import get_async_db, get_async_read_db, get_async_read_session_factory
+from ..models import MoodEntry, MoodRollup, MoodRollupEmoji
+from ..schemas import MoodEntryCreate, MoodBulkResult, MoodPage, MoodSummary
+from ..core.auth import get_current_active_user
+from ..core.token_cache import UserSnapshot
+from ..core.mood_rollups import apply_rollups
+from ..core.serialization import ORJSONResponse
+from ..core.settings import settings
+
+router = APIRouter(prefix="/moods", tags=["moods"], default_response_class=ORJSONResponse)
+
+# Limits for a single bulk upload
+MOOD_BULK_MAX_ENTRIES = settings.mood_bulk_max_entries
+MOOD_BULK_MAX_BYTES = settings.mood_bulk_max_bytes
+
+# Rows fetched per round trip when streaming an export
+MOOD_EXPORT_BATCH_SIZE = settings.mood_export_batch_size
+
+_EXPORT_COLUMNS = (
+    MoodEntry.id, MoodEntry.score, MoodEntry.emoji, MoodEntry.note, MoodEntry.tags, MoodEntry.created_at
+)
+
+# Validates a whole upload in one pass straight from JSON bytes
+_bulk_adapter = TypeAdapter(Annotated[List[MoodEntryCreate], Field(max_length=MOOD_BULK_MAX_ENTRIES)])
+# NDJSON is validated one line at a time, so errors point at line numbers
+_entry_adapter = TypeAdapter(MoodEntryCreate)
+
+_bulk_request_body = {
+    "required": True,
+    "content": {
+        media_type: {"schema": {"type": "array", "items": MoodEntryCreate.model_json_schema()}}
+        for media_type in ("application/json", "application/x-ndjson")
+    },
+}
+
+def _to_utc_naive(value: datetime) -> datetime:
+    """Store timestamps as naive UTC, like the rest of the schema"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Upload exceeds {MOOD_BULK_MAX_BYTES} bytes"
+    )
+
+async def read_bulk_body(request: Request, max_bytes: int = MOOD_BULK_MAX_BYTES) -> bytes:
+    """Read the upload, refusing it (413) as soon as it passes ``max_bytes``
+
+    A declared Content-Length over the limit is refused before reading;
+    chunked or understated bodies are counted as they stream in.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Content-Length")
+        if declared > max_bytes:
+            raise _upload_too_large()
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise _upload_too_large()
+    return bytes(body)
+
+def parse_ndjson_body(body: bytes) -> List[MoodEntryCreate]:
+    """Validate an NDJSON upload line by line; error locations are ``["line", n, ...]``"""
+    lines = [(number, line) for number, line in enumerate(body.splitlines(), start=1) if line.strip()]
+    if len(lines) > MOOD_BULK_MAX_ENTRIES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[{"type": "too_long", "loc": [], "msg": f"At most {MOOD_BULK_MAX_ENTRIES} entries per upload"}]
+        )
+
+    entries, errors = [], []
+    for number, line in lines:
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            errors.append({"type": "json_invalid", "loc": ["line", number], "msg": f"Invalid JSON: {e}"})
+            continue
+        try:
+            entries.append(_entry_adapter.validate_python(value))
+        except ValidationError as e:
+            errors.extend(
+                {**error, "loc": ["line", number, *error["loc"]]}
+                for error in e.errors(include_url=False, include_context=False)
+            )
+    if errors:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=errors)
+    return entries
+
+def parse_bulk_body(body: bytes, content_type: str) -> List[MoodEntryCreate]:
+    """Validate a JSON array or NDJSON upload of mood entries"""
+    if "ndjson" in content_type:
+        return parse_ndjson_body(body)
+    try:
+        return _bulk_adapter.validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(include_url=False, include_context=False)
+        )
+
+def encode_cursor(created_at: datetime, entry_id: int) -> str:
+    """Opaque cursor pointing just past an entry"""
+    raw = json.dumps([created_at.isoformat(), entry_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, entry_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(entry_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+@router.get("", response_model=MoodPage)
+async def list_moods(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """List mood entries, newest first, with keyset (cursor) pagination"""
+    query = (
+        select(MoodEntry)
+        .where(MoodEntry.user_id == current_user.id)
+        .order_by(MoodEntry.created_at.desc(), MoodEntry.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        created_at, entry_id = decode_cursor(cursor)
+        query = query.where(tuple_(MoodEntry.created_at, MoodEntry.id) < tuple_(created_at, entry_id))
+
+    result = await db.execute(query)
+    entries = result.scalars().all()
+
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(entries[-1].created_at, entries[-1].id)
+
+    return {"items": entries, "next_cursor": next_cursor}
+
+@router.get("/summary", response_model=MoodSummary)
+async def mood_summary(
+    period: Literal["day", "week"] = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Daily or weekly mood aggregates, read from the precomputed rollups"""
+    filters = [MoodRollup.user_id == current_user.id, MoodRollup.period == period]
+    emoji_filters = [MoodRollupEmoji.user_id == current_user.id, MoodRollupEmoji.period == period]
+    if start:
+        filters.append(MoodRollup.period_start >= start)
+        emoji_filters.append(MoodRollupEmoji.period_start >= start)
+    if end:
+        filters.append(MoodRollup.period_start <= end)
+        emoji_filters.append(MoodRollupEmoji.period_start <= end)
+
+    rollups = (await db.execute(
+        select(MoodRollup).where(*filters).order_by(MoodRollup.period_start)
+    )).scalars().all()
+    emoji_rows = await db.execute(
+        select(MoodRollupEmoji.period_start, MoodRollupEmoji.emoji, MoodRollupEmoji.entry_count).where(*emoji_filters)
+    )
+    emojis = {}
+    for period_start, emoji, count in emoji_rows:
+        emojis.setdefault(period_start, {})[emoji] = count
+
+    return {
+        "period": period,
+        "buckets": [
+            {
+                "period_start": rollup.period_start,
+                "entry_count": rollup.entry_count,
+                "score_mean": rollup.score_mean,
+                "score_min": rollup.score_min,
+                "score_max": rollup.score_max,
+                "emojis": emojis.get(rollup.period_start, {}),
+            }
+            for rollup in rollups
+        ],
+    }
+
+async def _export_rows(session_factory: async_sessionmaker, user_id: int):
+    """Yield the user's entries in batches from a server-side cursor"""
+    query = (
+        select(*_EXPORT_COLUMNS)
+        .where(MoodEntry.user_id == user_id)
+        .order_by(MoodEntry.created_at, MoodEntry.id)
+        .execution_options(yield_per=MOOD_EXPORT_BATCH_SIZE)
+    )
+    async with session_factory() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            yield rows
+
+async def _export_ndjson(batches):
+    async for rows in batches:
+        yield "".join(
+            json.dumps({
+                "id": row.id,
+                "score": row.score,
+                "emoji": row.emoji,
+                "note": row.note,
+                "tags": row.tags,
+                "created_at": row.created_at.isoformat(),
+            }, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+async def _export_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "created_at", "score", "emoji", "tags", "note"])
+    async for rows in batches:
+        for row in rows:
+            writer.writerow([row.id, row.created_at.isoformat(), row.score, row.emoji, ";".join(row.tags or []), row.note or ""])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for users without entries
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@router.get("/export")
+async def export_moods(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    session_factory: async_sessionmaker = Depends(get_async_read_session_factory)
+):
+    """Stream the full mood history as NDJSON or CSV with constant memory"""
+    batches = _export_rows(session_factory, current_user.id)
+    if format == "csv":
+        body, media_type = _export_csv(batches), "text/csv"
+    else:
+        body, media_type = _export_ndjson(batches), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="moods.{format}"'}
+    )
+
+@router.post(
+    "/bulk",
+    response_model=MoodBulkResult,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra={"requestBody": _bulk_request_body},
+)
+async def bulk_create_moods(
+    request: Request,
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create many mood entries at once (JSON array or NDJSON)"""
+    body = await read_bulk_body(request)
+    entries = parse_bulk_body(body, request.headers.get("content-type", ""))
+    if not entries:
+        return {"inserted": 0}
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "user_id": current_user.id,
+            "score": entry.score,
+            "emoji": entry.emoji,
+            "note": entry.note,
+            "tags": entry.tags,
+            "created_at": _to_utc_naive(entry.created_at) if entry.created_at else now,
+        }
+        for entry in entries
+    ]
+
+    # executemany: batched multi-row INSERTs, all in one transaction
+    await db.execute(insert(MoodEntry), rows)
+    await apply_rollups(db, rows)
+    await db.commit()
+
+    return {"inserted": len(rows)}
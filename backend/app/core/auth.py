@@ -1,122 +1,166 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import time
+import uuid
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-import os
-from dotenv import load_dotenv
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import get_async_read_db
 from ..models.user import User
 from ..schemas.user import TokenData
-
-load_dotenv()
+from .hashing import pwd_context
+from .metrics import JWT_DURATION
+from .token_signing import InvalidTokenError, create_token_signer
+from .token_cache import UserSnapshot, token_cache
+from .read_replicas import switch_to_primary
+from .revocation import access_key, revocation_list
+from .settings import settings
 
 # Security configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Keys are loaded once; see token_signing for the asymmetric algorithms
+token_signer = create_token_signer(ALGORITHM, SECRET_KEY)
 
 # JWT token security
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
+    """Verify a password against its hash (blocking; async code uses verify_password_async)"""
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """Hash a password"""
+    """Hash a password (blocking; async code uses hash_password_async)"""
     return pwd_context.hash(password)
 
+def _jwt_encode(claims: dict) -> str:
+    """Sign claims, recording the time spent"""
+    started = time.perf_counter()
+    try:
+        return token_signer.encode(claims)
+    finally:
+        JWT_DURATION.observe(("encode",), time.perf_counter() - started)
+
+def _jwt_decode(token: str) -> dict:
+    """Verify and decode a token, recording the time spent"""
+    started = time.perf_counter()
+    try:
+        return token_signer.decode(token)
+    finally:
+        JWT_DURATION.observe(("decode",), time.perf_counter() - started)
+
+def _expiry(expires_delta: timedelta) -> int:
+    """``exp`` claim as an integer timestamp, skipping datetime round trips"""
+    return int(time.time() + expires_delta.total_seconds())
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    if expires_delta is None:
+        expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # jti identifies the token for revocation
+    to_encode.update({"exp": _expiry(expires_delta), "jti": uuid.uuid4().hex})
+    encoded_jwt = _jwt_encode(to_encode)
     return encoded_jwt
 
 def create_password_reset_token(email: str) -> str:
     """Create a password reset token"""
-    expire = datetime.utcnow() + timedelta(hours=1)  # 1 hour expiration
+    expire = _expiry(timedelta(hours=1))  # 1 hour expiration
     to_encode = {"sub": email, "type": "password_reset", "exp": expire}
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return _jwt_encode(to_encode)
 
 def verify_password_reset_token(token: str) -> Optional[str]:
     """Verify and decode a password reset token"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _jwt_decode(token)
         email: str = payload.get("sub")
         token_type: str = payload.get("type")
         
         if email is None or token_type != "password_reset":
             return None
         return email
-    except JWTError:
-        return None
-
-def create_refresh_token(user_id: int) -> str:
-    """Create a refresh token"""
-    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode = {"sub": str(user_id), "type": "refresh", "exp": expire}
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
-def verify_refresh_token(token: str) -> Optional[int]:
-    """Verify and decode a refresh token"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        token_type: str = payload.get("type")
-        
-        if user_id is None or token_type != "refresh":
-            return None
-        return int(user_id)
-    except JWTError:
+    except InvalidTokenError:
         return None
 
 def verify_token(token: str, credentials_exception: HTTPException) -> TokenData:
     """Verify and decode a JWT token"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _jwt_decode(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = TokenData(email=email)
+        token_data = TokenData(
+            email=email,
+            expires_at=datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+            jti=payload.get("jti")
+        )
         return token_data
-    except JWTError:
+    except InvalidTokenError:
         raise credentials_exception
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user"""
+    db: AsyncSession = Depends(get_async_read_db)
+) -> UserSnapshot:
+    """Get the current authenticated user
+
+    Verified tokens and user snapshots are served from ``token_cache`` so hot
+    sessions skip both signature verification and the user query, and the
+    revocation check is an in-memory lookup. Cache misses read the user from a
+    replica when one is configured, falling back to the primary for users the
+    replica does not have yet. Routes that modify the user must load the
+    ORM row by ``id`` from their own (primary) session.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token_data = verify_token(credentials.credentials, credentials_exception)
-    user = db.query(User).filter(User.email == token_data.email).first()
+    token = credentials.credentials
+    token_data = token_cache.get_claims(token)
+    if token_data is None:
+        token_data = verify_token(token, credentials_exception)
+        token_cache.put_claims(token, token_data)
     
-    if user is None:
+    if token_data.jti and revocation_list.is_revoked(access_key(token_data.jti)):
         raise credentials_exception
     
-    return user
+    email = token_data.email
+    snapshot = await token_cache.get_user(email)
+    if snapshot is None:
+        query = select(User).where(User.email == email)
+        user = (await db.execute(query)).scalars().first()
+        # A lagging replica may not have a user who just registered yet
+        if user is None and switch_to_primary(db):
+            user = (await db.execute(query)).scalars().first()
+        if user is None:
+            raise credentials_exception
+        snapshot = UserSnapshot.from_user(user)
+        await token_cache.put_user(snapshot)
+    
+    return snapshot
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     """Get the current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user 
\ No newline at end of file
+    return current_user 
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_cached_user(mapper, connection, target: User) -> None:
+    """Evict the cached snapshot when a user is updated, deactivated or deleted
+
+    Runs inside the flush, so the eviction is scheduled rather than awaited;
+    code paths that change the snapshot also await ``invalidate_user``
+    after committing.
+    """
+    token_cache.invalidate_user_soon(target.id, target.email)
@@ -0,0 +1,197 @@
+"""Identicon avatars rendered by the API instead of a third-party service.
+
+Each user's default avatar is a 5x5 mirrored identicon drawn from the SHA-256
+of their normalised email (the avatar *key*). Rendering is deterministic, so
+the URL ``/api/v1/avatars/<key>.svg`` always serves the same bytes and is sent
+with a strong ``ETag`` and ``Cache-Control: immutable``; browsers and CDNs
+fetch it once.
+
+Rendered SVGs are kept in a per-process LRU and in an on-disk cache shared by
+the workers on a host, addressed by ``AVATAR_STYLE_VERSION`` and key. Bump the
+version whenever the drawing changes, so old files and URLs are never served
+for new content. The endpoint needs no auth and accepts any key, so only
+avatars of existing users are written to disk, and the directory is capped at
+``AVATAR_CACHE_MAX_FILES``, dropping the least recently used files first.
+Other keys are rendered (cheaply) and kept in memory only.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import tempfile
+import threading
+from typing import Awaitable, Callable, Optional, Tuple
+
+from .cache import TTLCache
+from .metrics import REGISTRY, Counter
+from .settings import settings
+
+API_URL = settings.api_url.rstrip("/")
+AVATAR_CACHE_MAX_ENTRIES = settings.avatar_cache_max_entries
+AVATAR_CACHE_DIR = settings.avatar_cache_dir
+AVATAR_CACHE_MAX_FILES = settings.avatar_cache_max_files
+AVATAR_STYLE_VERSION = "v1"
+AVATAR_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+AVATAR_REQUESTS = REGISTRY.register(Counter(
+    "avatar_requests_total", "Avatar requests by where the SVG came from (memory, disk, rendered)", ("source",)
+))
+
+_GRID = 5
+
+
+def avatar_key(email: str) -> str:
+    """Hex SHA-256 of the trimmed, lower-cased email"""
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+
+def avatar_url(email: str) -> str:
+    """Absolute URL of the default avatar for ``email``"""
+    return avatar_url_for_key(avatar_key(email))
+
+
+def avatar_url_for_key(key: str) -> str:
+    return f"{API_URL}/api/v1/avatars/{key}.svg"
+
+
+def render_identicon(key: str) -> bytes:
+    """SVG identicon for a 64-character hex key
+
+    The first 15 nibbles switch the cells of the left three columns (mirrored
+    to the right); the last bytes pick the hue.
+    """
+    hue = int(key[-6:], 16) % 360
+    cells = []
+    for column in range((_GRID + 1) // 2):
+        for row in range(_GRID):
+            if int(key[column * _GRID + row], 16) % 2 == 0:
+                continue
+            for x in {column, _GRID - 1 - column}:
+                cells.append(f'<rect x="{x + 1}" y="{row + 1}" width="1" height="1"/>')
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 7 7" width="128" height="128" '
+        'shape-rendering="crispEdges">'
+        '<rect width="7" height="7" fill="#f0f0f0"/>'
+        f'<g fill="hsl({hue},55%,50%)">{"".join(cells)}</g>'
+        '</svg>'
+    ).encode()
+
+
+def etag_for(content: bytes) -> str:
+    """Strong ETag derived from the bytes served"""
+    return '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+
+
+class AvatarCache:
+    """Rendered avatars in a bounded in-memory LRU, backed by a capped directory of files"""
+
+    def __init__(
+        self,
+        max_entries: int = AVATAR_CACHE_MAX_ENTRIES,
+        directory: Optional[str] = AVATAR_CACHE_DIR,
+        max_files: int = AVATAR_CACHE_MAX_FILES,
+    ):
+        self.directory = directory
+        self.max_files = max(1, max_files)
+        self._memory = TTLCache(max_entries)
+        # Files under the current style version; counted on first write
+        self._files: Optional[int] = None
+        self._files_lock = threading.Lock()
+        self.files_pruned = 0
+
+    def _root(self) -> str:
+        return os.path.join(self.directory, AVATAR_STYLE_VERSION)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._root(), key[:2], f"{key}.svg")
+
+    def _load(self, key: str) -> Optional[bytes]:
+        """Read the cached file, marking it recently used; blocking"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return content
+
+    def _list_files(self):
+        for entry in os.scandir(self._root()):
+            if entry.is_dir():
+                yield from (f for f in os.scandir(entry.path) if f.name.endswith(".svg"))
+
+    def _store(self, key: str, content: bytes) -> None:
+        """Write the file, then prune the least recently used ones past the cap; blocking"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so other workers never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._files_lock:
+            if self._files is None:
+                self._files = sum(1 for _ in self._list_files())
+            else:
+                self._files += 1
+            if self._files > self.max_files:
+                self._prune()
+
+    def _prune(self) -> None:
+        # Down to 90% of the cap, so pruning runs once per many writes
+        files = sorted(self._list_files(), key=lambda f: f.stat().st_mtime)
+        excess = len(files) - int(self.max_files * 0.9)
+        for f in files[:max(0, excess)]:
+            try:
+                os.unlink(f.path)
+                self.files_pruned += 1
+            except FileNotFoundError:
+                pass
+        self._files = len(files) - max(0, excess)
+
+    async def get(
+        self, key: str, is_known: Optional[Callable[[str], Awaitable[bool]]] = None
+    ) -> Tuple[bytes, str]:
+        """Return ``(svg, etag)`` for ``key``
+
+        A render is only written to disk when ``is_known(key)`` says the key
+        belongs to a user; without ``is_known`` nothing is written.
+        """
+        cached = self._memory.get(key)
+        if cached is not None:
+            AVATAR_REQUESTS.inc(("memory",))
+            return cached
+        content = None
+        if self.directory is not None:
+            content = await asyncio.to_thread(self._load, key)
+        if content is not None:
+            AVATAR_REQUESTS.inc(("disk",))
+        else:
+            content = render_identicon(key)
+            AVATAR_REQUESTS.inc(("rendered",))
+            if self.directory is not None and is_known is not None and await is_known(key):
+                await asyncio.to_thread(self._store, key, content)
+        entry = (content, etag_for(content))
+        self._memory.set(key, entry, math.inf)
+        return entry
+
+    def clear(self) -> None:
+        """Forget the in-memory entries (files on disk are kept)"""
+        self._memory.clear()
+
+    def stats(self) -> dict:
+        return {
+            "memory": self._memory.stats(),
+            "directory": self.directory,
+            "files": self._files,
+            "max_files": self.max_files,
+            "files_pruned": self.files_pruned,
+        }
+
+
+avatar_cache = AvatarCache()
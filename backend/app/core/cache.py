@@ -0,0 +1,386 @@
+"""Shared cache layer.
+
+State such as user snapshots, refresh-token status and rate counters must be
+the same in every uvicorn worker. ``CacheBackend`` is the one interface the
+app codes against; ``CACHE_BACKEND`` picks the implementation:
+
+- ``memory``: in-process LRU with per-key TTL, for tests and single-node use
+- ``redis``: a Redis (or Redis-compatible) server shared by all workers, with
+  a bounded connection pool and pipelined multi-key operations
+
+Values are bytes; callers own serialization. Keys are namespaced with
+``CACHE_KEY_PREFIX`` so several deployments can share one server.
+
+The cache is never the source of truth, so an unreachable or slow Redis
+degrades to misses: reads return nothing and writes are dropped, with the
+error logged and counted. Only ``incr``, whose callers must pick a policy
+(see ``app.core.rate_limit``), raises ``CacheUnavailableError``.
+"""
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence
+
+from .metrics import REGISTRY, Counter
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = settings.cache_backend
+CACHE_URL = settings.cache_url
+CACHE_KEY_PREFIX = settings.cache_key_prefix
+CACHE_MAX_ENTRIES = settings.cache_max_entries
+CACHE_REDIS_MAX_CONNECTIONS = settings.cache_redis_max_connections
+CACHE_REDIS_TIMEOUT_SECONDS = settings.cache_redis_timeout_seconds
+# Log cache backend errors at most this often; every error is counted
+CACHE_ERROR_LOG_INTERVAL_SECONDS = 10
+
+CACHE_ERRORS = REGISTRY.register(Counter(
+    "cache_errors_total", "Cache backend operations that failed and were treated as misses", ("operation",)
+))
+
+
+class CacheUnavailableError(Exception):
+    """The cache backend could not be reached for an operation that cannot degrade to a miss"""
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries carry an absolute expiry timestamp"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value, expires_at: float) -> None:
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def incr(self, key: Hashable, amount: int, ttl_seconds: float) -> int:
+        """Add to an integer entry, creating it with ``ttl_seconds`` if missing"""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= now:
+                entry = (0, now + ttl_seconds)
+            value = entry[0] + amount
+            self._data[key] = (value, entry[1])
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return value
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CacheBackend(ABC):
+    """Async key-value store with per-key expiry"""
+
+    name = ""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    async def set_many(self, items: Dict[str, bytes], ttl_seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1, ttl_seconds: float = 60) -> int:
+        """Atomically add to a counter; a new counter expires after ``ttl_seconds``
+
+        Raises ``CacheUnavailableError`` when the backend cannot be reached.
+        """
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete_soon(self, *keys: str) -> None:
+        """Best-effort delete callable from synchronous code (e.g. ORM events)
+
+        A later ``set``/``set_many`` of the same keys must not be undone by it.
+        """
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Remove every key under this backend's prefix"""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process backend; operations never block, so they complete immediately"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self._cache = TTLCache(max_entries)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return [self._cache.get(key) for key in keys]
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self._cache.set(key, value, time.time() + ttl_seconds)
+
+    async def set_many(self, items: Dict[str, bytes], ttl_seconds: float) -> None:
+        expires_at = time.time() + ttl_seconds
+        for key, value in items.items():
+            self._cache.set(key, value, expires_at)
+
+    async def incr(self, key: str, amount: int = 1, ttl_seconds: float = 60) -> int:
+        return self._cache.incr(key, amount, ttl_seconds)
+
+    async def delete(self, *keys: str) -> None:
+        self.delete_soon(*keys)
+
+    def delete_soon(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.delete(key)
+
+    async def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"backend": self.name, **self._cache.stats()}
+
+
+class RedisCacheBackend(CacheBackend):
+    """Backend on a Redis server shared by all workers
+
+    Multi-key reads use ``MGET`` and multi-key writes a non-transactional
+    pipeline, so each costs one round trip regardless of the number of keys.
+    Redis errors (including timeouts and an exhausted pool) turn reads into
+    misses and writes into no-ops.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str = CACHE_URL,
+        prefix: str = CACHE_KEY_PREFIX,
+        max_connections: int = CACHE_REDIS_MAX_CONNECTIONS,
+        timeout_seconds: float = CACHE_REDIS_TIMEOUT_SECONDS,
+    ):
+        try:
+            from redis import asyncio as redis_asyncio
+            from redis.exceptions import RedisError
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+
+        self.prefix = prefix
+        self._pool = redis_asyncio.BlockingConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            timeout=timeout_seconds,
+            socket_timeout=timeout_seconds,
+            socket_connect_timeout=timeout_seconds,
+        )
+        self._client = redis_asyncio.Redis(connection_pool=self._pool)
+        self._errors = RedisError
+        # Scheduled deletes by key, awaited before a write to the same key
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._error_logged_at = 0.0
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        CACHE_ERRORS.inc((operation,))
+        now = time.monotonic()
+        if now - self._error_logged_at >= CACHE_ERROR_LOG_INTERVAL_SECONDS:
+            self._error_logged_at = now
+            logger.warning("Redis cache %s failed, treating it as a miss: %r", operation, error)
+
+    def _count(self, values: List[Optional[bytes]]) -> None:
+        found = sum(value is not None for value in values)
+        self.hits += found
+        self.misses += len(values) - found
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = await self._client.get(self._key(key))
+        except self._errors as e:
+            self._failed("get", e)
+            return None
+        self._count([value])
+        return value
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        try:
+            values = await self._client.mget([self._key(key) for key in keys])
+        except self._errors as e:
+            self._failed("get_many", e)
+            return [None] * len(keys)
+        self._count(values)
+        return values
+
+    async def _settle_deletes(self, keys) -> None:
+        """Wait for scheduled deletes of ``keys`` so they cannot land after a write"""
+        loop = asyncio.get_running_loop()
+        tasks = {
+            task for task in (self._pending.get(key) for key in keys)
+            if task is not None and not task.done() and task.get_loop() is loop
+        }
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        await self._settle_deletes((key,))
+        try:
+            await self._client.set(self._key(key), value, px=max(1, int(ttl_seconds * 1000)))
+        except self._errors as e:
+            self._failed("set", e)
+
+    async def set_many(self, items: Dict[str, bytes], ttl_seconds: float) -> None:
+        if not items:
+            return
+        await self._settle_deletes(items)
+        ttl_ms = max(1, int(ttl_seconds * 1000))
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(self._key(key), value, px=ttl_ms)
+                await pipe.execute()
+        except self._errors as e:
+            self._failed("set_many", e)
+
+    async def incr(self, key: str, amount: int = 1, ttl_seconds: float = 60) -> int:
+        full_key = self._key(key)
+        try:
+            async with self._client.pipeline(transaction=True) as pipe:
+                pipe.incrby(full_key, amount)
+                # Only a new counter gets an expiry; later increments keep it
+                pipe.pexpire(full_key, max(1, int(ttl_seconds * 1000)), nx=True)
+                value, _ = await pipe.execute()
+        except self._errors as e:
+            self._failed("incr", e)
+            raise CacheUnavailableError(str(e)) from e
+        return int(value)
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        try:
+            await self._client.delete(*(self._key(key) for key in keys))
+        except self._errors as e:
+            # Stale entries still expire by TTL
+            self._failed("delete", e)
+
+    def delete_soon(self, *keys: str) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.warning("No event loop to delete cache keys %s; they will expire by TTL", keys)
+            return
+        task = loop.create_task(self.delete(*keys))
+        # Also keeps a reference until done so the task is not garbage collected
+        for key in keys:
+            self._pending[key] = task
+        task.add_done_callback(lambda _: self._forget_deletes(task, keys))
+
+    def _forget_deletes(self, task: asyncio.Task, keys) -> None:
+        for key in keys:
+            if self._pending.get(key) is task:
+                del self._pending[key]
+
+    async def clear(self) -> None:
+        batch = []
+        async for key in self._client.scan_iter(match=self.prefix + "*", count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                await self._client.delete(*batch)
+                batch = []
+        if batch:
+            await self._client.delete(*batch)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "max_connections": self._pool.max_connections,
+        }
+
+    async def close(self) -> None:
+        await self._client.aclose()
+        await self._pool.disconnect()
+
+
+def create_cache_backend(kind: str = CACHE_BACKEND) -> CacheBackend:
+    """Build the backend selected by ``CACHE_BACKEND``"""
+    if kind == "memory":
+        return MemoryCacheBackend()
+    if kind == "redis":
+        return RedisCacheBackend()
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind!r}")
+
+
+cache = create_cache_backend()
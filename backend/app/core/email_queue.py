@@ -0,0 +1,178 @@
+"""Durable queue of outbound email, drained by background workers.
+
+Request handlers call ``enqueue_email``, which only adds an ``email_jobs`` row
+to their session: the email is queued by the same commit as the change that
+triggers it (no welcome email for a registration that rolled back) and the
+request never waits on SMTP.
+
+Workers (``run_email_worker``, in the API process or ``scripts/email_worker.py``)
+claim due jobs in batches with one ``UPDATE ... RETURNING`` (``FOR UPDATE SKIP
+LOCKED`` on PostgreSQL, so several workers never claim the same job), send
+each batch over a pooled SMTP connection, delete the sent jobs and reschedule
+failed ones with exponential backoff. A job stays claimed for
+``EMAIL_LEASE_SECONDS``; if its worker dies, it becomes due again after that.
+"""
+import asyncio
+import logging
+import random
+import smtplib
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..models.email_job import EmailJob
+from .mailer import TEMPLATES, SMTPSender, render_email
+from .metrics import REGISTRY, Counter
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+EMAIL_WORKER_ENABLED = settings.email_worker_enabled
+EMAIL_BATCH_SIZE = settings.email_batch_size
+EMAIL_POLL_INTERVAL_SECONDS = settings.email_poll_interval_seconds
+EMAIL_MAX_ATTEMPTS = settings.email_max_attempts
+EMAIL_RETRY_BASE_SECONDS = settings.email_retry_base_seconds
+EMAIL_RETRY_MAX_SECONDS = 3600
+EMAIL_LEASE_SECONDS = settings.email_lease_seconds
+
+EMAIL_JOBS = REGISTRY.register(Counter(
+    "email_jobs_total", "Email jobs processed by outcome (sent, retried, failed)", ("template", "outcome")
+))
+
+
+def enqueue_email(db: AsyncSession, template: str, recipient: str, context: dict) -> EmailJob:
+    """Queue an email in ``db``'s transaction; workers send it once the caller commits"""
+    if template not in TEMPLATES:
+        raise ValueError(f"Unknown email template: {template!r}")
+    job = EmailJob(
+        template=template,
+        recipient=recipient,
+        context=context,
+        status="pending",
+        attempts=0,
+        run_at=datetime.utcnow(),
+    )
+    db.add(job)
+    return job
+
+
+def retry_delay(attempts: int, base_seconds: float = EMAIL_RETRY_BASE_SECONDS) -> float:
+    """Backoff after the ``attempts``-th failure: doubling, capped, with +-20% jitter"""
+    delay = min(base_seconds * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _is_permanent(error: Exception) -> bool:
+    """5xx replies (unknown mailbox, rejected sender) will not succeed on retry"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return isinstance(error, (KeyError, ValueError))
+
+
+async def claim_email_jobs(
+    session_factory: async_sessionmaker,
+    batch_size: int = EMAIL_BATCH_SIZE,
+    lease_seconds: float = EMAIL_LEASE_SECONDS,
+):
+    """Claim up to ``batch_size`` due jobs, counting the attempt and leasing them"""
+    now = datetime.utcnow()
+    due = (
+        select(EmailJob.id)
+        .where(EmailJob.status == "pending", EmailJob.run_at <= now)
+        .order_by(EmailJob.run_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    async with session_factory() as db:
+        result = await db.execute(
+            update(EmailJob)
+            .where(EmailJob.id.in_(due.scalar_subquery()))
+            .values(attempts=EmailJob.attempts + 1, run_at=now + timedelta(seconds=lease_seconds))
+            .returning(EmailJob.id, EmailJob.template, EmailJob.recipient, EmailJob.context, EmailJob.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        jobs = result.all()
+        await db.commit()
+    return jobs
+
+
+async def process_email_jobs(
+    session_factory: async_sessionmaker,
+    sender: SMTPSender,
+    batch_size: int = EMAIL_BATCH_SIZE,
+    max_attempts: int = EMAIL_MAX_ATTEMPTS,
+) -> int:
+    """Claim, send and settle one batch; returns the number of jobs claimed"""
+    jobs = await claim_email_jobs(session_factory, batch_size)
+    if not jobs:
+        return 0
+
+    errors = {}
+    to_send = []
+    for job in jobs:
+        try:
+            to_send.append((job, render_email(job.template, job.recipient, job.context)))
+        except (KeyError, ValueError) as e:
+            errors[job.id] = e
+    if to_send:
+        results = await asyncio.to_thread(sender.send_batch, [message for _, message in to_send])
+        for (job, _), error in zip(to_send, results):
+            if error is not None:
+                errors[job.id] = error
+
+    now = datetime.utcnow()
+    sent_ids = [job.id for job in jobs if job.id not in errors]
+    async with session_factory() as db:
+        if sent_ids:
+            await db.execute(delete(EmailJob).where(EmailJob.id.in_(sent_ids)))
+        for job in jobs:
+            error = errors.get(job.id)
+            if error is None:
+                EMAIL_JOBS.inc((job.template, "sent"))
+                continue
+            values = {"last_error": repr(error)[:1000]}
+            if job.attempts >= max_attempts or _is_permanent(error):
+                values["status"] = "failed"
+                EMAIL_JOBS.inc((job.template, "failed"))
+                logger.warning("Email job %s failed after %d attempts: %r", job.id, job.attempts, error)
+            else:
+                values["run_at"] = now + timedelta(seconds=retry_delay(job.attempts))
+                EMAIL_JOBS.inc((job.template, "retried"))
+            await db.execute(update(EmailJob).where(EmailJob.id == job.id).values(**values))
+        await db.commit()
+    return len(jobs)
+
+
+async def run_email_worker(
+    session_factory: async_sessionmaker,
+    sender: Optional[SMTPSender] = None,
+    interval_seconds: float = EMAIL_POLL_INTERVAL_SECONDS,
+    batch_size: int = EMAIL_BATCH_SIZE,
+) -> None:
+    """Send queued email forever; run as a background task and cancel it on shutdown
+
+    Runs one loop per pooled SMTP connection. A loop that claimed a full batch
+    goes straight on to the next one.
+    """
+    sender = sender or SMTPSender()
+
+    async def loop():
+        while True:
+            try:
+                claimed = await process_email_jobs(session_factory, sender, batch_size)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email worker batch failed")
+                claimed = 0
+            if claimed < batch_size:
+                await asyncio.sleep(interval_seconds)
+
+    try:
+        await asyncio.gather(*(loop() for _ in range(max(1, sender.pool_size))))
+    finally:
+        await asyncio.to_thread(sender.close)
@@ -0,0 +1,267 @@
+"""Dedicated worker pool for password hashing.
+
+bcrypt is deliberately slow, so running it on the event loop or in Starlette's
+shared threadpool lets a burst of logins starve every other request. Async
+callers go through ``hash_password_async`` / ``verify_password_async``, which
+run the work on a private pool with a bounded backlog and answer 503 once that
+backlog is full.
+
+The bcrypt cost is tuned to the host: at startup ``calibrate_bcrypt_rounds``
+picks the highest cost whose verify stays under ``PASSWORD_HASH_TARGET_MS``
+(or ``PASSWORD_HASH_ROUNDS`` pins it). Hashes below the current cost are
+upgraded transparently on the next successful login, so raising the cost never
+forces a password reset.
+"""
+import asyncio
+import logging
+import math
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .metrics import PASSWORD_HASH_DURATION, REGISTRY, Counter, register_callback_gauge
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+# "thread" works well because bcrypt releases the GIL; "process" isolates the
+# CPU work completely at the cost of pickling arguments to a child process.
+PASSWORD_HASH_EXECUTOR = settings.password_hash_executor
+PASSWORD_HASH_WORKERS = settings.password_hash_workers
+# Number of hash jobs allowed to wait for a free worker before rejecting
+PASSWORD_HASH_MAX_QUEUE = settings.password_hash_max_queue
+
+# Verify latency to aim for when calibrating the bcrypt cost at startup
+PASSWORD_HASH_TARGET_MS = settings.password_hash_target_ms
+PASSWORD_HASH_MIN_ROUNDS = settings.password_hash_min_rounds
+PASSWORD_HASH_MAX_ROUNDS = settings.password_hash_max_rounds
+# Fixed cost; skips calibration when set
+PASSWORD_HASH_ROUNDS = settings.password_hash_rounds
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_bcrypt = pwd_context.handler("bcrypt")
+
+# Cost for new hashes; hashes below it are upgraded on login
+bcrypt_rounds: int = _bcrypt.default_rounds
+
+
+def set_bcrypt_rounds(rounds: int) -> None:
+    """Hash new passwords with ``rounds`` and flag cheaper hashes for upgrade"""
+    global bcrypt_rounds
+    bcrypt_rounds = rounds
+    pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds)
+
+
+def calibrate_bcrypt_rounds(
+    target_seconds: float = PASSWORD_HASH_TARGET_MS / 1000,
+    min_rounds: int = PASSWORD_HASH_MIN_ROUNDS,
+    max_rounds: int = PASSWORD_HASH_MAX_ROUNDS,
+    samples: int = 3,
+) -> int:
+    """Highest bcrypt cost whose verify time stays within ``target_seconds`` on this host"""
+    handler = _bcrypt.using(rounds=min_rounds)
+    sample_hash = handler.hash("calibration")
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.verify("calibration", sample_hash)
+        timings.append(time.perf_counter() - started)
+
+    # Each extra round doubles the work; the fastest sample is the least noisy
+    fastest = min(timings)
+    extra = math.floor(math.log2(target_seconds / fastest)) if fastest < target_seconds else 0
+    return max(min_rounds, min(max_rounds, min_rounds + extra))
+
+
+def configure_password_hashing() -> int:
+    """Apply ``PASSWORD_HASH_ROUNDS`` or calibrate the cost for this host"""
+    if PASSWORD_HASH_ROUNDS:
+        rounds = int(PASSWORD_HASH_ROUNDS)
+    else:
+        rounds = calibrate_bcrypt_rounds()
+        logger.info("Calibrated bcrypt cost to %d rounds for a %.0f ms target", rounds, PASSWORD_HASH_TARGET_MS)
+    set_bcrypt_rounds(rounds)
+    return rounds
+
+
+def _needs_rehash(hashed_password: str, rounds: int) -> bool:
+    if not _bcrypt.identify(hashed_password):
+        return pwd_context.needs_update(hashed_password)
+    return _bcrypt.from_string(hashed_password).rounds < rounds
+
+
+# Jobs take the cost explicitly: process workers do not see set_bcrypt_rounds
+def _hash_job(password: str, rounds: Optional[int] = None) -> Tuple[str, float]:
+    """Hash a password, returning the hash and the time spent hashing"""
+    started = time.perf_counter()
+    hashed = _bcrypt.using(rounds=rounds or bcrypt_rounds).hash(password)
+    return hashed, time.perf_counter() - started
+
+
+def _verify_job(plain_password: str, hashed_password: str) -> Tuple[bool, float]:
+    """Verify a password, returning the result and the time spent verifying"""
+    started = time.perf_counter()
+    valid = pwd_context.verify(plain_password, hashed_password)
+    return valid, time.perf_counter() - started
+
+
+def _verify_and_update_job(
+    plain_password: str, hashed_password: str, rounds: int
+) -> Tuple[Tuple[bool, Optional[str]], float]:
+    """Verify a password and rehash it at ``rounds`` if its hash is cheaper"""
+    started = time.perf_counter()
+    valid = pwd_context.verify(plain_password, hashed_password)
+    new_hash = None
+    if valid and _needs_rehash(hashed_password, rounds):
+        new_hash = _bcrypt.using(rounds=rounds).hash(plain_password)
+    return (valid, new_hash), time.perf_counter() - started
+
+
+class HashingPool:
+    """Bounded executor for bcrypt work with queue depth and latency stats"""
+
+    def __init__(self, kind: str, workers: int, max_queue: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown PASSWORD_HASH_EXECUTOR: {kind!r}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[Executor] = None
+
+        # Counters are only touched from the event loop thread, so no lock is needed
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+        self.wait_seconds_total = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs submitted but not yet picked up by a worker"""
+        return max(0, self.in_flight - self.workers)
+
+    async def run(self, fn, *args, operation: str = "other"):
+        """Run a hash job on the pool, rejecting with 503 when the backlog is full"""
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            PASSWORD_HASH_REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        submitted = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        # The job keeps its worker after a caller is cancelled (client disconnect),
+        # so it only stops counting against the backlog once the job itself is done.
+        # Registered before wrap_future so the count drops before the caller resumes.
+        future.add_done_callback(lambda _: self._job_done(loop))
+        result, elapsed = await asyncio.wrap_future(future)
+
+        PASSWORD_HASH_DURATION.observe((operation,), elapsed)
+        self.completed += 1
+        self.hash_seconds_total += elapsed
+        self.hash_seconds_max = max(self.hash_seconds_max, elapsed)
+        self.wait_seconds_total += max(0.0, time.perf_counter() - submitted - elapsed)
+        return result
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Runs on the worker thread; hand the decrement back to the event loop
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # Loop already closed; nothing is left to admit against
+            self.in_flight -= 1
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """Snapshot of pool counters"""
+        return {
+            "executor": self.kind,
+            "bcrypt_rounds": bcrypt_rounds,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "hash_seconds_avg": self.hash_seconds_total / self.completed if self.completed else 0.0,
+            "hash_seconds_max": self.hash_seconds_max,
+            "wait_seconds_avg": self.wait_seconds_total / self.completed if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker pool; it is recreated lazily on next use"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_pool = HashingPool(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+
+PASSWORD_HASH_REJECTED = REGISTRY.register(Counter(
+    "password_hash_rejected_total", "Hash jobs rejected because the queue was full"
+))
+PASSWORD_REHASHED = REGISTRY.register(Counter(
+    "password_rehashed_total", "Stored password hashes upgraded to the current cost on login"
+))
+register_callback_gauge(
+    "password_hash_rounds", "bcrypt cost used for new password hashes", (),
+    lambda: {(): bcrypt_rounds},
+)
+register_callback_gauge(
+    "password_hash_queue_depth", "Hash jobs waiting for a free worker", (),
+    lambda: {(): hashing_pool.queue_depth},
+)
+register_callback_gauge(
+    "password_hash_in_flight", "Hash jobs queued or running", (),
+    lambda: {(): hashing_pool.in_flight},
+)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the dedicated hashing pool"""
+    return await hashing_pool.run(_hash_job, password, bcrypt_rounds, operation="hash")
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash on the dedicated hashing pool"""
+    return await hashing_pool.run(_verify_job, plain_password, hashed_password, operation="verify")
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also return a new hash if the stored one is below the current cost"""
+    valid, new_hash = await hashing_pool.run(
+        _verify_and_update_job, plain_password, hashed_password, bcrypt_rounds, operation="verify"
+    )
+    if new_hash is not None:
+        PASSWORD_REHASHED.inc()
+    return valid, new_hash
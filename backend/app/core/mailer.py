@@ -0,0 +1,150 @@
+"""Email templates and a pooled SMTP sender.
+
+``SMTPSender`` keeps up to ``SMTP_POOL_SIZE`` authenticated connections open
+between batches, so a batch costs one connection checkout instead of a TCP
+(and TLS) handshake and login per message. It is blocking; the email worker
+calls it from a thread.
+"""
+import queue
+import smtplib
+from email.message import EmailMessage
+from typing import List, Optional
+from urllib.parse import quote
+
+from .settings import settings
+
+EMAIL_FROM = settings.email_from
+FRONTEND_URL = settings.frontend_url
+SMTP_HOST = settings.smtp_host
+SMTP_PORT = settings.smtp_port
+SMTP_USERNAME = settings.smtp_username
+SMTP_PASSWORD = settings.smtp_password
+SMTP_STARTTLS = settings.smtp_starttls
+SMTP_TIMEOUT_SECONDS = settings.smtp_timeout_seconds
+SMTP_POOL_SIZE = settings.smtp_pool_size
+
+
+def _welcome(context: dict):
+    return (
+        "Welcome to MoodMate",
+        f"Hi {context['name']},\n\nThanks for signing up for MoodMate. "
+        f"Start tracking your mood at {FRONTEND_URL}.\n",
+    )
+
+
+def _password_reset(context: dict):
+    link = f"{FRONTEND_URL}/reset-password?token={quote(context['token'])}"
+    return (
+        "Reset your MoodMate password",
+        f"Hi {context['name']},\n\nReset your password within the next hour at:\n\n{link}\n\n"
+        "If you did not ask for this, you can ignore this email.\n",
+    )
+
+
+TEMPLATES = {
+    "welcome": _welcome,
+    "password_reset": _password_reset,
+}
+
+
+def render_email(template: str, recipient: str, context: dict) -> EmailMessage:
+    """Build the message for a queued job; raises KeyError for unknown templates"""
+    subject, body = TEMPLATES[template](context)
+    message = EmailMessage()
+    message["From"] = EMAIL_FROM
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+
+class SMTPSender:
+    """Sends batches of messages over a small pool of reused SMTP connections"""
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        username: Optional[str] = SMTP_USERNAME,
+        password: Optional[str] = SMTP_PASSWORD,
+        starttls: bool = SMTP_STARTTLS,
+        timeout_seconds: float = SMTP_TIMEOUT_SECONDS,
+        pool_size: int = SMTP_POOL_SIZE,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout_seconds = timeout_seconds
+        self.pool_size = pool_size
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout_seconds)
+        try:
+            if self.starttls:
+                connection.starttls()
+            if self.username:
+                connection.login(self.username, self.password or "")
+        except BaseException:
+            connection.close()
+            raise
+        self.connections_opened += 1
+        return connection
+
+    def _release(self, connection: smtplib.SMTP) -> None:
+        if self._idle.qsize() < self.pool_size:
+            self._idle.put(connection)
+        else:
+            self._quit(connection)
+
+    @staticmethod
+    def _quit(connection: smtplib.SMTP) -> None:
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def send_batch(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        """Send ``messages`` over one connection; returns the error (or None) for each
+
+        A connection dropped by the server (idle timeout) is replaced once and
+        the message retried. Errors for single messages, such as a refused
+        recipient, do not stop the batch; connection errors fail the rest.
+        """
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                connection = self._connect()
+            except (smtplib.SMTPException, OSError) as e:
+                return [e] * len(messages)
+
+        results: List[Optional[Exception]] = []
+        try:
+            for message in messages:
+                try:
+                    try:
+                        connection.send_message(message)
+                    except smtplib.SMTPServerDisconnected:
+                        connection.close()
+                        connection = self._connect()
+                        connection.send_message(message)
+                    results.append(None)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                    results.append(e)
+        except (smtplib.SMTPException, OSError) as e:
+            connection.close()
+            return results + [e] * (len(messages) - len(results))
+        self._release(connection)
+        return results
+
+    def close(self) -> None:
+        """Quit every idle connection"""
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                return
@@ -0,0 +1,397 @@
+"""Prometheus-style metrics with a lock-free hot path.
+
+Every metric keeps one shard per thread. Updates only touch the calling
+thread's shard, so recording a sample never takes a lock; shards are summed
+when ``/metrics`` is scraped. Values are per worker process, so scrape each
+worker (or run one worker per container) when using several.
+
+Statements are also attributed to the request that ran them: the middleware
+puts a ``RequestQueries`` in a context variable, the engine hooks add to it,
+and the totals go out in a ``Server-Timing`` header and the
+``http_request_db_queries`` histogram. Statements slower than
+``SLOW_QUERY_THRESHOLD_MS`` are logged with their route.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+from .settings import settings
+
+SERVER_TIMING_ENABLED = settings.server_timing_enabled
+SLOW_QUERY_THRESHOLD_SECONDS = settings.slow_query_threshold_ms / 1000
+# Longest statement text written to the slow-query log
+SLOW_QUERY_MAX_LENGTH = 500
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class holding per-thread shards of label values -> state"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+
+    type_name = "counter"
+
+    def inc(self, labels: LabelValues = (), amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in list(self._shards):
+            for labels, value in shard.copy().items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down, or is read from a callback at scrape time"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def dec(self, labels: LabelValues = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def collect(self) -> Dict[LabelValues, float]:
+        if self.callback is not None:
+            return self.callback()
+        return super().collect()
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # One slot per bucket plus +Inf, then sum and count
+            state = shard[labels] = [0] * (len(self.buckets) + 3)
+        state[bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def collect(self) -> Dict[LabelValues, List[float]]:
+        totals: Dict[LabelValues, List[float]] = {}
+        for shard in list(self._shards):
+            for labels, state in shard.copy().items():
+                total = totals.get(labels)
+                if total is None:
+                    totals[labels] = list(state)
+                else:
+                    for index, value in enumerate(state):
+                        total[index] += value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        bucket_labels = self.labelnames + ("le",)
+        for labels, state in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_labels, labels + (_format_value(bound),))} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{label_text} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "Total HTTP requests", ("method", "route", "status")
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method", "route")
+))
+PASSWORD_HASH_DURATION = REGISTRY.register(Histogram(
+    "password_hash_duration_seconds", "Time spent hashing or verifying passwords", ("operation",)
+))
+JWT_DURATION = REGISTRY.register(Histogram(
+    "jwt_duration_seconds", "Time spent encoding or decoding JWTs", ("operation",), buckets=FAST_BUCKETS
+))
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "Database statement execution time", ("operation",), buckets=FAST_BUCKETS
+))
+HTTP_REQUEST_DB_QUERIES = REGISTRY.register(Histogram(
+    "http_request_db_queries", "Database statements per HTTP request", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+))
+SLOW_QUERIES = REGISTRY.register(Counter(
+    "db_slow_queries_total", "Statements slower than SLOW_QUERY_THRESHOLD_MS", ("route", "operation")
+))
+
+
+class RequestQueries:
+    """Statements run on behalf of one request"""
+
+    __slots__ = ("route", "count", "seconds")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.count = 0
+        self.seconds = 0.0
+
+    def server_timing(self, total_seconds: float) -> bytes:
+        return (
+            f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries", '
+            f"app;dur={total_seconds * 1000:.1f}"
+        ).encode()
+
+
+# Set by MetricsMiddleware; None outside of requests (startup, background tasks)
+current_request_queries: ContextVar[Optional[RequestQueries]] = ContextVar(
+    "current_request_queries", default=None
+)
+
+
+def register_callback_gauge(
+    name: str, documentation: str, labelnames: Sequence[str], callback: Callable[[], Dict[LabelValues, float]]
+) -> Gauge:
+    """Register a gauge whose values are read from ``callback`` at scrape time"""
+    return REGISTRY.register(Gauge(name, documentation, labelnames, callback=callback))
+
+
+def register_pool_gauges(pool_stats: Callable[[], dict]) -> None:
+    """Expose connection pool statistics (see ``app.database.pool_stats``) as gauges"""
+
+    def gauge_for(key: str) -> Callable[[], Dict[LabelValues, float]]:
+        return lambda: {
+            (name,): stats[key] for name, stats in pool_stats().items() if key in stats
+        }
+
+    for key, documentation in (
+        ("checked_out", "Connections currently checked out"),
+        ("overflow_in_use", "Overflow connections currently open"),
+        ("max_checked_out", "Most connections checked out at once"),
+        ("checkouts", "Connection checkouts"),
+        ("timeouts", "Checkouts that timed out waiting for a connection"),
+        ("wait_seconds_avg", "Average time spent waiting for a connection"),
+        ("wait_seconds_max", "Longest time spent waiting for a connection"),
+    ):
+        register_callback_gauge(f"db_pool_{key}", documentation, ("engine",), gauge_for(key))
+
+
+def _statement_operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return keyword if keyword in ("select", "insert", "update", "delete") else "other"
+
+
+def instrument_engine(sync_engine) -> None:
+    """Record statement timings for an engine (pass ``sync_engine`` for async engines)
+
+    Each statement counts towards the current request, if any, and is logged
+    when slower than ``SLOW_QUERY_THRESHOLD_MS``. Parameters are never logged.
+    """
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        operation = _statement_operation(statement)
+        DB_QUERY_DURATION.observe((operation,), elapsed)
+
+        queries = current_request_queries.get()
+        if queries is not None:
+            queries.count += 1
+            queries.seconds += elapsed
+        if elapsed >= SLOW_QUERY_THRESHOLD_SECONDS:
+            route = queries.route if queries is not None else "<background>"
+            SLOW_QUERIES.inc((route, operation))
+            logger.warning(
+                "Slow query (%.1f ms) on %s: %s",
+                elapsed * 1000, route, " ".join(statement.split())[:SLOW_QUERY_MAX_LENGTH],
+            )
+
+
+# Scope key holding the matched route template for the rest of the middleware stack
+ROUTE_TEMPLATE_SCOPE_KEY = "moodmate.route_template"
+
+
+def route_template(routes: Iterable, scope) -> str:
+    """Path template of the route matching ``scope`` (``/api/v1/moods/{id}``)
+
+    The route table is scanned once per request, by the outermost caller; the
+    result is kept in ``scope`` for the middleware and routes inside it.
+    """
+    template = scope.get(ROUTE_TEMPLATE_SCOPE_KEY)
+    if template is not None:
+        return template
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            template = route.path
+            break
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    else:
+        template = partial or "<unmatched>"
+    scope[ROUTE_TEMPLATE_SCOPE_KEY] = template
+    return template
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request count, latency and in-flight requests
+
+    Requests are labeled by route template (``/api/v1/auth/login``) rather than
+    raw path so that path parameters cannot blow up label cardinality. The
+    response carries a ``Server-Timing`` header with the database time and
+    statement count up to the start of the response (streamed bodies are not
+    included).
+    """
+
+    def __init__(self, app, routes: Iterable, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.routes = routes
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.routes, scope)
+        status_code = 500
+        queries = RequestQueries(route)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    timing = queries.server_timing(time.perf_counter() - started)
+                    message = {**message, "headers": [*message.get("headers", ()), (b"server-timing", timing)]}
+            await send(message)
+
+        in_flight_labels = (method, route)
+        HTTP_REQUESTS_IN_FLIGHT.inc(in_flight_labels)
+        token = current_request_queries.set(queries)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_queries.reset(token)
+            elapsed = time.perf_counter() - started
+            HTTP_REQUESTS_IN_FLIGHT.dec(in_flight_labels)
+            labels = (method, route, str(status_code))
+            HTTP_REQUESTS.inc(labels)
+            HTTP_REQUEST_DURATION.observe(labels, elapsed)
+            HTTP_REQUEST_DB_QUERIES.observe(in_flight_labels, queries.count)
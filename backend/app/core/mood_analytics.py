@@ -0,0 +1,199 @@
+"""Vectorized mood analytics.
+
+Mood entries are loaded into columnar NumPy arrays (one array per column,
+not one object per row) and every statistic is computed with array
+operations. ``analyze_users`` handles any number of users in one pass: the
+entries are grouped by user once and each statistic is a single grouped
+reduction, so a nightly job over thousands of users costs a handful of
+array operations rather than a Python loop per entry.
+
+Days are UTC days; weekday 0 is Monday.
+"""
+from dataclasses import dataclass
+from datetime import date, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.mood import MoodEntry
+
+DEFAULT_WINDOW_DAYS = 7
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@dataclass
+class MoodArrays:
+    """Mood entries of one or more users as parallel columns"""
+    user_ids: np.ndarray  # int64
+    days: np.ndarray  # int64 days since 1970-01-01 (UTC)
+    scores: np.ndarray  # float64
+    tag_names: List[str]
+    # Tags as (entry, tag) coordinate pairs: entry tag_rows[i] has tag_names[tag_ids[i]]
+    tag_rows: np.ndarray  # int64
+    tag_ids: np.ndarray  # int64
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence]) -> "MoodArrays":
+        """Build from ``(user_id, created_at, score, tags)`` rows"""
+        user_ids, days, scores = [], [], []
+        tag_rows, tag_ids = [], []
+        tag_index: Dict[str, int] = {}
+        for row, (user_id, created_at, score, tags) in enumerate(rows):
+            if created_at.tzinfo is not None:
+                created_at = created_at.astimezone(timezone.utc)
+            user_ids.append(user_id)
+            days.append(created_at.toordinal() - _EPOCH_ORDINAL)
+            scores.append(score)
+            for tag in set(tags or ()):
+                tag_rows.append(row)
+                tag_ids.append(tag_index.setdefault(tag, len(tag_index)))
+
+        # Number tags alphabetically so results do not depend on row order
+        tag_names = sorted(tag_index)
+        renumber = np.empty(len(tag_names), dtype=np.int64)
+        renumber[[tag_index[tag] for tag in tag_names]] = np.arange(len(tag_names))
+
+        return cls(
+            user_ids=np.asarray(user_ids, dtype=np.int64),
+            days=np.asarray(days, dtype=np.int64),
+            scores=np.asarray(scores, dtype=np.float64),
+            tag_names=tag_names,
+            tag_rows=np.asarray(tag_rows, dtype=np.int64),
+            tag_ids=renumber[np.asarray(tag_ids, dtype=np.int64)],
+        )
+
+
+@dataclass
+class MoodTrends:
+    """Analytics for one user over a contiguous range of days"""
+    first_day: np.datetime64
+    daily_mean: np.ndarray  # NaN on days without entries
+    rolling_mean: np.ndarray  # entry-weighted mean over the trailing window
+    volatility: np.ndarray  # std of daily means over the trailing window
+    weekday_mean: np.ndarray  # 7 values, Monday first; NaN if no entries
+    tag_correlation: Dict[str, float]  # Pearson r of tag presence vs score
+
+    @property
+    def days(self) -> np.ndarray:
+        return self.first_day + np.arange(len(self.daily_mean))
+
+
+async def load_mood_arrays(db: AsyncSession, user_ids: Optional[Sequence[int]] = None) -> MoodArrays:
+    """Load entries of the given users (or everyone) with a single query"""
+    query = select(MoodEntry.user_id, MoodEntry.created_at, MoodEntry.score, MoodEntry.tags)
+    if user_ids is not None:
+        query = query.where(MoodEntry.user_id.in_(user_ids))
+    result = await db.execute(query)
+    return MoodArrays.from_rows(result.tuples())
+
+
+def _windowed(cumulative: np.ndarray, index: np.ndarray, lower: np.ndarray) -> np.ndarray:
+    """Sum over [lower, index] from a cumulative array with a leading zero"""
+    return cumulative[index + 1] - cumulative[lower]
+
+
+def analyze_users(data: MoodArrays, window: int = DEFAULT_WINDOW_DAYS) -> Dict[int, MoodTrends]:
+    """Compute trends for every user in ``data`` in one vectorized pass"""
+    if len(data.scores) == 0:
+        return {}
+
+    users, user_index = np.unique(data.user_ids, return_inverse=True)
+    user_count = len(users)
+
+    # Day range per user, then one slot per (user, day) laid out user after user
+    first = np.full(user_count, np.iinfo(np.int64).max)
+    last = np.full(user_count, np.iinfo(np.int64).min)
+    np.minimum.at(first, user_index, data.days)
+    np.maximum.at(last, user_index, data.days)
+    spans = last - first + 1
+    offsets = np.concatenate(([0], np.cumsum(spans)[:-1]))
+    slots = offsets[user_index] + data.days - first[user_index]
+    total = int(spans.sum())
+
+    score_sums = np.bincount(slots, weights=data.scores, minlength=total)
+    entry_counts = np.bincount(slots, minlength=total).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily_mean = score_sums / entry_counts
+
+    # Trailing windows clipped at the start of each user's range
+    index = np.arange(total)
+    segment_start = np.repeat(offsets, spans)
+    lower = np.maximum(index + 1 - window, segment_start)
+
+    def cumulative(values):
+        return np.concatenate(([0.0], np.cumsum(values)))
+
+    window_sum = _windowed(cumulative(score_sums), index, lower)
+    window_entries = _windowed(cumulative(entry_counts), index, lower)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rolling_mean = window_sum / window_entries
+
+    # Volatility from explicit windows: E[x^2] - E[x]^2 over running sums
+    # cancels badly when the daily means are flat. Each user's range is
+    # preceded by window - 1 NaN days so no window reaches into another user.
+    slot_user = np.repeat(np.arange(user_count), spans)
+    padded = np.full(total + user_count * (window - 1), np.nan)
+    padded[index + (slot_user + 1) * (window - 1)] = daily_mean
+    windows = sliding_window_view(padded, window)[index + slot_user * (window - 1)]
+    present = ~np.isnan(windows)
+    window_days = present.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        window_mean = np.where(present, windows, 0.0).sum(axis=1) / window_days
+        deviations = np.where(present, windows - window_mean[:, None], 0.0)
+        variance = (deviations ** 2).sum(axis=1) / window_days
+    volatility = np.where(window_days >= 2, np.sqrt(variance), np.nan)
+
+    # Day-of-week seasonality: 1970-01-01 was a Thursday
+    weekday = (data.days + 3) % 7
+    weekday_key = user_index * 7 + weekday
+    weekday_sums = np.bincount(weekday_key, weights=data.scores, minlength=user_count * 7)
+    weekday_counts = np.bincount(weekday_key, minlength=user_count * 7)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weekday_mean = (weekday_sums / weekday_counts).reshape(user_count, 7)
+
+    # Pearson correlation of each tag's presence with the score, per (user, tag)
+    # pair that occurs; sparse, so memory follows the data rather than users x tags
+    n = np.bincount(user_index, minlength=user_count).astype(np.float64)
+    sum_y = np.bincount(user_index, weights=data.scores, minlength=user_count)
+    sum_y2 = np.bincount(user_index, weights=data.scores ** 2, minlength=user_count)
+    pair_keys, pair_index = np.unique(
+        user_index[data.tag_rows] * len(data.tag_names) + data.tag_ids, return_inverse=True
+    )
+    pair_user, pair_tag = np.divmod(pair_keys, max(len(data.tag_names), 1))
+    sum_x = np.bincount(pair_index, minlength=len(pair_keys)).astype(np.float64)
+    sum_xy = np.bincount(pair_index, weights=data.scores[data.tag_rows], minlength=len(pair_keys))
+    pair_n, pair_y, pair_y2 = n[pair_user], sum_y[pair_user], sum_y2[pair_user]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # x is 0/1, so sum(x^2) == sum(x)
+        correlation = (pair_n * sum_xy - sum_x * pair_y) / np.sqrt(
+            (pair_n * sum_x - sum_x ** 2) * (pair_n * pair_y2 - pair_y ** 2)
+        )
+    # pair_keys is sorted, so each user's pairs are one contiguous run
+    pair_bounds = np.searchsorted(pair_user, np.arange(user_count + 1))
+
+    trends = {}
+    for position, user_id in enumerate(users.tolist()):
+        segment = slice(offsets[position], offsets[position] + spans[position])
+        pairs = slice(pair_bounds[position], pair_bounds[position + 1])
+        trends[user_id] = MoodTrends(
+            first_day=np.datetime64(int(first[position]), "D"),
+            daily_mean=daily_mean[segment],
+            rolling_mean=rolling_mean[segment],
+            volatility=volatility[segment],
+            weekday_mean=weekday_mean[position],
+            tag_correlation={
+                data.tag_names[tag]: float(value)
+                for tag, value in zip(pair_tag[pairs].tolist(), correlation[pairs].tolist())
+            },
+        )
+    return trends
+
+
+def analyze_user(data: MoodArrays, window: int = DEFAULT_WINDOW_DAYS) -> Optional[MoodTrends]:
+    """Trends for a single-user ``MoodArrays``, or None if it has no entries"""
+    trends = analyze_users(data, window)
+    return next(iter(trends.values()), None)
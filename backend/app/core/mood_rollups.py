@@ -0,0 +1,151 @@
+"""Per-user daily and weekly mood aggregates.
+
+Dashboards read ``mood_rollups`` (count, score sum/min/max) and
+``mood_rollup_emojis`` (emoji histogram) instead of scanning raw entries, so
+an analytics query touches one row per day or week. The rollups are kept up
+to date incrementally: every write to ``mood_entries`` upserts the buckets it
+touches in the same transaction. ``scripts/rebuild_mood_rollups.py``
+recomputes them from scratch for backfills.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.mood import MoodEntry, MoodRollup, MoodRollupEmoji
+
+PERIODS = ("day", "week")
+
+UPSERT_CHUNK_SIZE = 1000
+
+RollupKey = Tuple[int, str, date]
+
+
+def period_start(period: str, timestamp: datetime) -> date:
+    """First day of the UTC day or ISO week (Monday) containing ``timestamp``"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    day = timestamp.date()
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def aggregate(entries: Iterable[Tuple[int, datetime, int, str]]) -> Tuple[List[dict], List[dict]]:
+    """Fold ``(user_id, created_at, score, emoji)`` tuples into rollup and emoji rows
+
+    Rows come back sorted by primary key so concurrent upserts lock buckets
+    in the same order.
+    """
+    rollups: Dict[RollupKey, List[int]] = {}
+    emojis: Dict[Tuple[int, str, date, str], int] = {}
+
+    for user_id, created_at, score, emoji in entries:
+        for period in PERIODS:
+            key = (user_id, period, period_start(period, created_at))
+            bucket = rollups.get(key)
+            if bucket is None:
+                rollups[key] = [1, score, score, score]
+            else:
+                bucket[0] += 1
+                bucket[1] += score
+                bucket[2] = min(bucket[2], score)
+                bucket[3] = max(bucket[3], score)
+            emoji_key = key + (emoji,)
+            emojis[emoji_key] = emojis.get(emoji_key, 0) + 1
+
+    rollup_rows = [
+        {
+            "user_id": user_id, "period": period, "period_start": start,
+            "entry_count": count, "score_sum": total, "score_min": low, "score_max": high,
+        }
+        for (user_id, period, start), (count, total, low, high) in sorted(rollups.items())
+    ]
+    emoji_rows = [
+        {"user_id": user_id, "period": period, "period_start": start, "emoji": emoji, "entry_count": count}
+        for (user_id, period, start, emoji), count in sorted(emojis.items())
+    ]
+    return rollup_rows, emoji_rows
+
+
+def _insert_for(dialect_name: str):
+    if dialect_name == "postgresql":
+        return postgresql.insert
+    if dialect_name == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Mood rollups need INSERT ... ON CONFLICT, unsupported on {dialect_name}")
+
+
+def rollup_upsert(dialect_name: str, rows: List[dict]):
+    """``INSERT ... ON CONFLICT`` adding ``rows`` onto existing rollup buckets"""
+    columns = MoodRollup.__table__.c
+    statement = _insert_for(dialect_name)(MoodRollup).values(rows)
+    new = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[columns.user_id, columns.period, columns.period_start],
+        set_={
+            "entry_count": columns.entry_count + new.entry_count,
+            "score_sum": columns.score_sum + new.score_sum,
+            "score_min": case((new.score_min < columns.score_min, new.score_min), else_=columns.score_min),
+            "score_max": case((new.score_max > columns.score_max, new.score_max), else_=columns.score_max),
+        },
+    )
+
+
+def emoji_upsert(dialect_name: str, rows: List[dict]):
+    """``INSERT ... ON CONFLICT`` adding ``rows`` onto existing emoji counts"""
+    columns = MoodRollupEmoji.__table__.c
+    statement = _insert_for(dialect_name)(MoodRollupEmoji).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[columns.user_id, columns.period, columns.period_start, columns.emoji],
+        set_={"entry_count": columns.entry_count + statement.excluded.entry_count},
+    )
+
+
+async def apply_rollups(db: AsyncSession, entries: List[dict]) -> None:
+    """Add freshly inserted entries to their rollups; the caller commits"""
+    rollup_rows, emoji_rows = aggregate(
+        (entry["user_id"], entry["created_at"], entry["score"], entry["emoji"]) for entry in entries
+    )
+    dialect_name = db.bind.dialect.name
+    # Multi-row VALUES lists are chunked to stay under bind-parameter limits
+    for build, rows in ((rollup_upsert, rollup_rows), (emoji_upsert, emoji_rows)):
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            await db.execute(build(dialect_name, rows[start:start + UPSERT_CHUNK_SIZE]))
+
+
+def rebuild_rollups(db: Session, user_id: Optional[int] = None, batch_size: int = 5000) -> int:
+    """Recompute rollups from ``mood_entries`` (all users, or one), returning the entry count
+
+    Entries are streamed in batches, so memory grows with the number of
+    buckets rather than the number of entries.
+    """
+    query = select(MoodEntry.user_id, MoodEntry.created_at, MoodEntry.score, MoodEntry.emoji)
+    if user_id is not None:
+        query = query.where(MoodEntry.user_id == user_id)
+
+    seen = 0
+
+    def counted(rows):
+        nonlocal seen
+        for row in rows:
+            seen += 1
+            yield row
+
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    rollup_rows, emoji_rows = aggregate(counted(result.tuples()))
+
+    for model in (MoodRollupEmoji, MoodRollup):
+        stale = delete(model)
+        if user_id is not None:
+            stale = stale.where(model.user_id == user_id)
+        db.execute(stale)
+    for start in range(0, len(rollup_rows), batch_size):
+        db.execute(MoodRollup.__table__.insert(), rollup_rows[start:start + batch_size])
+    for start in range(0, len(emoji_rows), batch_size):
+        db.execute(MoodRollupEmoji.__table__.insert(), emoji_rows[start:start + batch_size])
+    db.commit()
+    return seen
@@ -0,0 +1,145 @@
+"""Sliding-window rate limiting for expensive unauthenticated endpoints.
+
+Each failed login costs a full bcrypt verify, so ``/auth/login`` and
+``/auth/forgot-password`` are throttled per client IP and per email before
+any hashing or SQL runs. Limits are enforced as FastAPI dependencies, which
+resolve before the route body executes.
+
+Counters use the sliding-window approximation: one counter per fixed window,
+with the previous window's count weighted by how much of it still overlaps
+the sliding window. That costs two keys per limit and one ``INCR`` plus one
+``GET`` per request, and works on any ``app.core.cache`` backend: in-process
+for a single node, Redis to share the limits across workers. If the backend
+is unreachable, ``RATE_LIMIT_FAIL_OPEN`` decides between letting requests
+through and answering 503.
+"""
+import asyncio
+import hashlib
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+from ..schemas import PasswordResetRequest, UserLogin
+from .cache import CacheBackend, CacheUnavailableError, cache
+from .metrics import REGISTRY, Counter
+from .settings import settings
+
+RATE_LIMIT_ENABLED = settings.rate_limit_enabled
+# Only enable behind a proxy that sets X-Forwarded-For; clients can forge it otherwise
+RATE_LIMIT_TRUST_FORWARDED_FOR = settings.rate_limit_trust_forwarded_for
+RATE_LIMIT_FAIL_OPEN = settings.rate_limit_fail_open
+
+RATE_LIMITED = REGISTRY.register(Counter(
+    "rate_limited_total", "Requests rejected by a rate limit", ("limit",)
+))
+RATE_LIMIT_UNAVAILABLE = REGISTRY.register(Counter(
+    "rate_limit_unavailable_total", "Rate limit checks skipped or refused because the cache was down", ("limit",)
+))
+
+
+@dataclass(frozen=True)
+class Rate:
+    """``limit`` requests per ``window_seconds``"""
+    limit: int
+    window_seconds: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        """Parse ``"<requests>/<seconds>"``, e.g. ``"5/60"``"""
+        limit, window_seconds = value.split("/")
+        return cls(int(limit), int(window_seconds))
+
+
+RATE_LIMIT_LOGIN_PER_IP = Rate.parse(settings.rate_limit_login_per_ip)
+RATE_LIMIT_LOGIN_PER_EMAIL = Rate.parse(settings.rate_limit_login_per_email)
+RATE_LIMIT_PASSWORD_RESET_PER_IP = Rate.parse(settings.rate_limit_password_reset_per_ip)
+RATE_LIMIT_PASSWORD_RESET_PER_EMAIL = Rate.parse(settings.rate_limit_password_reset_per_email)
+
+
+class SlidingWindowLimiter:
+    """Sliding-window counters stored in a cache backend"""
+
+    def __init__(self, backend: CacheBackend, prefix: str = "ratelimit:"):
+        self.backend = backend
+        self.prefix = prefix
+
+    async def hit(self, name: str, subject: str, rate: Rate, now: Optional[float] = None) -> Optional[int]:
+        """Count a request; return None if allowed, else seconds until the next one is"""
+        now = time.time() if now is None else now
+        window = int(now // rate.window_seconds)
+        elapsed = now / rate.window_seconds - window
+        key = f"{self.prefix}{name}:{subject}:"
+
+        current, previous = await asyncio.gather(
+            # Kept for two windows: it is the "previous" window for the next one
+            self.backend.incr(key + str(window), ttl_seconds=2 * rate.window_seconds),
+            self.backend.get(key + str(window - 1)),
+        )
+        previous = int(previous) if previous is not None else 0
+        if previous * (1 - elapsed) + current <= rate.limit:
+            return None
+
+        # Time until the previous window's share decays enough, or until
+        # this window rolls over if the current count alone is too high
+        if current <= rate.limit and previous:
+            wait = (1 - (rate.limit - current) / previous - elapsed) * rate.window_seconds
+        else:
+            wait = (1 - elapsed) * rate.window_seconds
+        return max(1, math.ceil(wait))
+
+
+limiter = SlidingWindowLimiter(cache)
+
+
+def client_ip(request: Request) -> str:
+    """Client address, honoring X-Forwarded-For only when configured to"""
+    if RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _email_subject(email: str) -> str:
+    # Keep addresses out of cache keys
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+
+
+async def enforce(name: str, subject: str, rate: Rate) -> None:
+    """Raise 429 with ``Retry-After`` if ``subject`` is over ``rate`` for ``name``"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    try:
+        retry_after = await limiter.hit(name, subject, rate)
+    except CacheUnavailableError:
+        RATE_LIMIT_UNAVAILABLE.inc((name,))
+        if RATE_LIMIT_FAIL_OPEN:
+            return
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service temporarily unavailable, please try again later",
+            headers={"Retry-After": "1"},
+        )
+    if retry_after is not None:
+        RATE_LIMITED.inc((name,))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+async def login_rate_limit(http_request: Request, user_credentials: UserLogin) -> None:
+    """Throttle login attempts per client IP and per account"""
+    await enforce("login-ip", client_ip(http_request), RATE_LIMIT_LOGIN_PER_IP)
+    await enforce("login-email", _email_subject(user_credentials.email), RATE_LIMIT_LOGIN_PER_EMAIL)
+
+
+async def password_reset_rate_limit(http_request: Request, request: PasswordResetRequest) -> None:
+    """Throttle password reset requests per client IP and per account"""
+    # Body parameters share the route's name so FastAPI parses the body once
+    await enforce("password-reset-ip", client_ip(http_request), RATE_LIMIT_PASSWORD_RESET_PER_IP)
+    await enforce("password-reset-email", _email_subject(request.email), RATE_LIMIT_PASSWORD_RESET_PER_EMAIL)
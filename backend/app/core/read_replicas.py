@@ -0,0 +1,169 @@
+"""Routing of read-only sessions to database replicas.
+
+Sessions from ``AsyncReadSessionLocal`` (``get_async_read_db``) send their
+SELECTs to one of the ``DATABASE_REPLICA_URLS``; every other session still
+uses the primary only. A read session picks one replica for its lifetime and
+moves to the primary for good as soon as it writes, flushes or locks rows, so
+it always reads its own writes.
+
+Replicas are checked every ``REPLICA_HEALTH_CHECK_INTERVAL_SECONDS``. One that
+fails the check, lags more than ``REPLICA_MAX_LAG_SECONDS`` or drops a
+connection is skipped until a later check passes; with no usable replica, read
+sessions fall back to the primary.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import Select, event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+REPLICA_MAX_LAG_SECONDS = settings.replica_max_lag_seconds
+REPLICA_HEALTH_CHECK_INTERVAL_SECONDS = settings.replica_health_check_interval_seconds
+REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS = settings.replica_health_check_timeout_seconds
+
+# Replay delay of a hot standby; zero when it has replayed everything it received
+# (an idle primary would otherwise look like growing lag)
+_POSTGRES_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+    " END"
+)
+
+
+class Replica:
+    """One replica engine and the result of its last health check"""
+
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.lag_seconds = 0.0
+        self.checked_at: Optional[float] = None
+        event.listen(engine.sync_engine, "handle_error", self._on_error)
+
+    def _on_error(self, context) -> None:
+        # Dropped or refused connections; statement errors say nothing about the replica
+        if context.is_disconnect or context.connection is None:
+            self.mark_unhealthy(str(context.original_exception))
+
+    def mark_unhealthy(self, reason: str) -> None:
+        if self.healthy:
+            logger.warning("Replica %s is unavailable: %s", self.name, reason)
+        self.healthy = False
+
+    async def measure_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                return float((await conn.execute(_POSTGRES_LAG_QUERY)).scalar() or 0)
+            await conn.execute(text("SELECT 1"))
+            return 0.0
+
+
+class ReplicaSet:
+    """Healthy replicas handed out round-robin"""
+
+    def __init__(self, replicas: Sequence[Replica], max_lag_seconds: float = REPLICA_MAX_LAG_SECONDS):
+        self.replicas: List[Replica] = list(replicas)
+        self.max_lag_seconds = max_lag_seconds
+        self._next = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        """A healthy replica, or None when reads must go to the primary"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    async def check(self, timeout_seconds: float = REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS) -> None:
+        """Measure every replica's lag and update which ones are usable"""
+        for replica in self.replicas:
+            try:
+                lag = await asyncio.wait_for(replica.measure_lag(), timeout_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                replica.mark_unhealthy(repr(e))
+                continue
+            finally:
+                replica.checked_at = time.time()
+            replica.lag_seconds = lag
+            if lag > self.max_lag_seconds:
+                replica.mark_unhealthy(f"{lag:.1f}s behind the primary")
+            elif not replica.healthy:
+                logger.info("Replica %s is available again (%.1fs behind)", replica.name, lag)
+                replica.healthy = True
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            replica.name: {
+                "healthy": replica.healthy,
+                "lag_seconds": replica.lag_seconds,
+                "checked_at": replica.checked_at,
+            }
+            for replica in self.replicas
+        }
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica until it writes
+
+    Pass ``replicas`` (a ``ReplicaSet``) through the sessionmaker; ``bind`` is
+    the primary.
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kw):
+        super().__init__(*args, **kw)
+        self.replicas = replicas
+        self.replica: Optional[Replica] = None
+        self.sticky_primary = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if not self.sticky_primary and self.replicas:
+            if self._flushing or not isinstance(clause, Select) or clause._for_update_arg is not None:
+                self.sticky_primary = True
+            else:
+                if self.replica is None or not self.replica.healthy:
+                    self.replica = self.replicas.choose()
+                if self.replica is not None:
+                    return self.replica.engine.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def switch_to_primary(db) -> bool:
+    """Send the rest of an async session's reads to the primary
+
+    Returns False when the session was not reading from a replica, so there
+    is nothing newer to find on the primary.
+    """
+    session = db.sync_session
+    if not isinstance(session, RoutingSession) or session.sticky_primary or session.replica is None:
+        return False
+    session.sticky_primary = True
+    return True
+
+
+async def run_replica_health_checks(
+    replicas: ReplicaSet,
+    interval_seconds: float = REPLICA_HEALTH_CHECK_INTERVAL_SECONDS,
+) -> None:
+    """Check replicas forever; run as a background task and cancel it on shutdown"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await replicas.check()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Replica health check failed")
@@ -0,0 +1,56 @@
+"""Opaque refresh tokens stored as SHA-256 digests.
+
+Refresh tokens used to be JWTs stored verbatim in a unique ``String`` column,
+so every lookup compared a ~200 character key against a bloated B-tree. They
+are now 32 random bytes (URL-safe base64) that carry no claims; the database
+keeps only their digest in the fixed-width ``token_hash`` column. Lookups are
+a single probe of that compact unique index, and a leaked table holds no
+usable tokens. 256 random bits need no salt or slow hash.
+
+Legacy JWT refresh tokens stay valid until they expire. Migration 0007
+backfilled their digests; rows written by older app instances during a
+rolling deploy (``token`` set, no digest) are matched on ``token`` instead.
+"""
+import hashlib
+import secrets
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.user import RefreshToken
+
+REFRESH_TOKEN_BYTES = 32
+
+
+def create_refresh_token() -> str:
+    """New opaque refresh token"""
+    return secrets.token_urlsafe(REFRESH_TOKEN_BYTES)
+
+
+def refresh_token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def refresh_token_filter(token: str):
+    """WHERE clause matching the row for ``token``"""
+    match = RefreshToken.token_hash == refresh_token_digest(token)
+    # Opaque tokens never contain dots; only JWTs need the legacy column
+    if token.count(".") == 2:
+        match = or_(match, RefreshToken.token == token)
+    return match
+
+
+async def get_refresh_token_owner(db: AsyncSession, token: str) -> Optional[int]:
+    """User id of a live (unexpired, unrevoked) refresh token, else None"""
+    result = await db.execute(
+        select(RefreshToken.user_id)
+        .where(
+            refresh_token_filter(token),
+            RefreshToken.is_revoked == False,
+            RefreshToken.expires_at > datetime.utcnow(),
+        )
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
@@ -0,0 +1,245 @@
+"""In-memory revocation list for refresh and access tokens.
+
+Every request that presents a token asks "has this been revoked?", and the
+answer is almost always no. A bloom filter answers those negative lookups in
+memory without touching the database or the network; only a filter hit (a
+real revocation or a rare false positive) is resolved against the exact set
+of revoked keys, which also lives in memory.
+
+Keys are ``access:<jti>`` for access tokens and ``refresh:<sha256>`` for
+refresh tokens (the same digest stored in ``refresh_tokens.token_hash``). The list is loaded from the database at startup and updated
+immediately by the worker that handles a logout. Other workers pick up new
+revocations by polling ``revoked_at`` every
+``REVOCATION_SYNC_INTERVAL_SECONDS``. Entries are dropped once their token
+expires.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..models.user import RefreshToken, RevokedAccessToken
+from .refresh_tokens import refresh_token_digest, refresh_token_filter
+from .metrics import REGISTRY, Counter, register_callback_gauge
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_BLOOM_CAPACITY = settings.revocation_bloom_capacity
+REVOCATION_BLOOM_ERROR_RATE = settings.revocation_bloom_error_rate
+REVOCATION_SYNC_INTERVAL_SECONDS = settings.revocation_sync_interval_seconds
+
+REVOCATION_LOOKUPS = REGISTRY.register(Counter(
+    "revocation_lookups_total", "Token revocation checks by outcome", ("result",)
+))
+
+
+def access_key(jti: str) -> str:
+    return f"access:{jti}"
+
+
+def refresh_key(token: str) -> str:
+    return _refresh_digest_key(refresh_token_digest(token))
+
+
+def _refresh_digest_key(digest: bytes) -> str:
+    return "refresh:" + digest.hex()
+
+
+def _utc(value: datetime) -> datetime:
+    # Token timestamps are stored as naive UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings using double hashing"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """Bloom filter in front of an exact key -> expiry map of revoked tokens"""
+
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR_RATE):
+        self.error_rate = error_rate
+        self._revoked: Dict[str, datetime] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self.synced_at: Optional[datetime] = None
+
+    def is_revoked(self, key: str) -> bool:
+        """O(1) check; never performs I/O"""
+        if key not in self._bloom:
+            REVOCATION_LOOKUPS.inc(("negative",))
+            return False
+        expires_at = self._revoked.get(key)
+        if expires_at is None:
+            REVOCATION_LOOKUPS.inc(("false_positive",))
+            return False
+        REVOCATION_LOOKUPS.inc(("revoked",))
+        return True
+
+    def add(self, key: str, expires_at: datetime) -> None:
+        self.add_many([(key, expires_at)])
+
+    def add_many(self, entries: Iterable[Tuple[str, datetime]]) -> None:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            for key, expires_at in entries:
+                expires_at = _utc(expires_at)
+                if expires_at <= now or key in self._revoked:
+                    continue
+                self._revoked[key] = expires_at
+                if self._bloom.count >= self._bloom.capacity:
+                    self._rebuild(capacity=self._bloom.capacity * 2)
+                else:
+                    self._bloom.add(key)
+
+    def prune(self) -> int:
+        """Forget revocations of tokens that have expired anyway"""
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            expired = [key for key, expires_at in self._revoked.items() if expires_at <= now]
+            for key in expired:
+                del self._revoked[key]
+            # Bloom filters cannot delete; rebuild once a good share is stale
+            if expired and len(expired) * 4 >= self._bloom.count:
+                self._rebuild(capacity=self._bloom.capacity)
+        return len(expired)
+
+    def _rebuild(self, capacity: int) -> None:
+        bloom = BloomFilter(max(capacity, len(self._revoked) * 2), self.error_rate)
+        for key in self._revoked:
+            bloom.add(key)
+        self._bloom = bloom
+
+    def clear(self) -> None:
+        with self._lock:
+            self._revoked.clear()
+            self._bloom = BloomFilter(self._bloom.capacity, self.error_rate)
+            self.synced_at = None
+
+    async def sync(self, session_factory: async_sessionmaker) -> int:
+        """Load revocations made since the last sync (everything on the first call)"""
+        now = datetime.utcnow()
+        # Overlap the previous window a little to tolerate clock skew between workers
+        since = self.synced_at - timedelta(seconds=REVOCATION_SYNC_INTERVAL_SECONDS) if self.synced_at else None
+
+        refresh_query = select(RefreshToken.token_hash, RefreshToken.token, RefreshToken.expires_at).where(
+            RefreshToken.is_revoked == True, RefreshToken.expires_at > now
+        )
+        access_query = select(RevokedAccessToken.jti, RevokedAccessToken.expires_at).where(
+            RevokedAccessToken.expires_at > now
+        )
+        if since is not None:
+            refresh_query = refresh_query.where(RefreshToken.revoked_at >= since)
+            access_query = access_query.where(RevokedAccessToken.revoked_at >= since)
+
+        async with session_factory() as db:
+            refresh_rows = (await db.execute(refresh_query)).all()
+            access_rows = (await db.execute(access_query)).all()
+
+        self.add_many(
+            # Rows written by older app versions may only have the legacy token
+            (_refresh_digest_key(digest) if digest is not None else refresh_key(token), expires_at)
+            for digest, token, expires_at in refresh_rows
+        )
+        self.add_many((access_key(jti), expires_at) for jti, expires_at in access_rows)
+        self.synced_at = now
+        return len(refresh_rows) + len(access_rows)
+
+    def stats(self) -> dict:
+        return {
+            "revoked": len(self._revoked),
+            "bloom_bits": self._bloom.size,
+            "bloom_hashes": self._bloom.hash_count,
+            "bloom_entries": self._bloom.count,
+            "synced_at": self.synced_at.isoformat() if self.synced_at else None,
+        }
+
+
+revocation_list = RevocationList()
+
+register_callback_gauge(
+    "revoked_tokens", "Unexpired revoked tokens held in memory", (),
+    lambda: {(): len(revocation_list._revoked)},
+)
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str) -> bool:
+    """Mark a refresh token revoked in the database and in this worker's list"""
+    key = refresh_key(token)
+    if revocation_list.is_revoked(key):
+        return True
+    # Keep the first revocation time if another worker got there first
+    result = await db.execute(
+        update(RefreshToken)
+        .where(refresh_token_filter(token))
+        .values(is_revoked=True, revoked_at=func.coalesce(RefreshToken.revoked_at, datetime.utcnow()))
+        .returning(RefreshToken.expires_at)
+    )
+    expires_at = result.scalar_one_or_none()
+    await db.commit()
+    if expires_at is None:
+        return False
+    revocation_list.add(key, expires_at)
+    return True
+
+
+async def revoke_access_token(db: AsyncSession, jti: str, expires_at: datetime) -> None:
+    """Record an access token's ``jti`` as revoked until the token expires"""
+    key = access_key(jti)
+    if revocation_list.is_revoked(key):
+        return
+    db.add(RevokedAccessToken(jti=jti, expires_at=expires_at, revoked_at=datetime.utcnow()))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Already revoked by another worker
+        await db.rollback()
+    revocation_list.add(key, expires_at)
+
+
+async def run_revocation_sync(
+    session_factory: async_sessionmaker,
+    interval_seconds: float = REVOCATION_SYNC_INTERVAL_SECONDS,
+) -> None:
+    """Poll for new revocations forever; run as a background task and cancel it on shutdown"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await revocation_list.sync(session_factory)
+            revocation_list.prune()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Revocation sync failed")
@@ -0,0 +1,26 @@
+"""Response serialization without FastAPI's generic ``response_model`` pass.
+
+For a route with ``response_model``, FastAPI validates the returned value
+(building ``UserResponse`` from the ORM ``User``), dumps it to a dict of JSON
+types, and then the response class encodes that dict again with the stdlib
+``json``. ``serialize`` does the same validation once with a precompiled
+``TypeAdapter`` and writes JSON bytes straight from pydantic-core. Routes
+keep ``response_model`` for the OpenAPI schema; returning a ``Response``
+makes FastAPI skip its own pass.
+
+Routes that still return plain values are encoded with orjson via
+``ORJSONResponse``, the routers' default response class.
+"""
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+__all__ = ["ORJSONResponse", "serialize"]
+
+
+def serialize(adapter: TypeAdapter, value: Any, status_code: int = 200) -> Response:
+    """Validate ``value`` (ORM objects included) with ``adapter`` and encode it as JSON"""
+    content = adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+    return Response(content, status_code=status_code, media_type="application/json")
@@ -0,0 +1,229 @@
+"""JSON logs written off the request path.
+
+``configure_logging`` (called from the app lifespan) points the root logger at
+a ``QueueHandler``. On the calling thread a record only gets its request id
+and route stamped, is sampled, and goes into a bounded queue; when the queue
+is full the record is dropped and counted instead of blocking. A
+``QueueListener`` thread then redacts it, formats it as one JSON line and
+writes it to stdout.
+
+Records can carry an ``event`` name (``extra={"event": "auth.registered"}``).
+``LOG_SAMPLE_RATES`` keeps only a fraction of the INFO and DEBUG records of
+busy events (``auth.registered=0.1``); warnings and errors are always kept.
+Fields named like secrets (passwords, tokens, authorization) are replaced
+with ``[REDACTED]``, as are JWT-shaped strings in messages.
+"""
+import copy
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterable, Optional
+
+import orjson
+
+from .metrics import REGISTRY, Counter, route_template
+from .settings import settings
+
+LOG_LEVEL = settings.log_level.upper()
+LOG_FORMAT = settings.log_format
+LOG_QUEUE_SIZE = settings.log_queue_size
+LOG_SAMPLE_RATES = settings.log_sample_rates
+
+REDACTED = "[REDACTED]"
+_SECRET_KEY = re.compile(r"password|passwd|secret|token|authorization|api_key|cookie", re.IGNORECASE)
+_JWT = re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]+")
+# Request ids accepted from clients (X-Request-ID); anything else is replaced
+_REQUEST_ID = re.compile(r"[\w.:-]{1,128}")
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "taskName", "request_id", "route",
+}
+
+LOG_RECORDS_DROPPED = REGISTRY.register(Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full"
+))
+
+# Set by RequestContextMiddleware for the duration of a request
+current_request_id: ContextVar[Optional[str]] = ContextVar("current_request_id", default=None)
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+
+def parse_sample_rates(items: Iterable[str]) -> Dict[str, float]:
+    """``["auth.registered=0.1"]`` -> ``{"auth.registered": 0.1}``"""
+    rates = {}
+    for item in items:
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+def redact(value: Any) -> Any:
+    """Copy of ``value`` with secret-looking keys and JWTs masked"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if isinstance(key, str) and _SECRET_KEY.search(key) else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return _JWT.sub(REDACTED, value)
+    return value
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request id and route, on the calling thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id.get()
+        record.route = current_route.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the INFO/DEBUG records of each sampled event"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(getattr(record, "event", None))
+        return rate is None or random.random() < rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener is in this process, so keep exc_info for the formatter
+        # and only freeze the message; formatting happens on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with secrets redacted"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+            entry["route"] = getattr(record, "route", None)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(redact(entry), default=str).decode()
+
+
+class RedactingFormatter(logging.Formatter):
+    """Plain-text formatter (LOG_FORMAT=text) with JWTs in messages redacted"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return _JWT.sub(REDACTED, super().format(record))
+
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    log_format: str = LOG_FORMAT,
+    queue_size: int = LOG_QUEUE_SIZE,
+    sample_rates: Iterable[str] = LOG_SAMPLE_RATES,
+    stream=None,
+) -> QueueListener:
+    """Route the root logger through a queue; stop the returned listener at shutdown"""
+    output = logging.StreamHandler(stream or sys.stdout)
+    if log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(RedactingFormatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(SamplingFilter(parse_sample_rates(sample_rates)))
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if isinstance(h, DroppingQueueHandler)]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def stop_logging(listener: QueueListener) -> None:
+    """Detach the queue handler and flush the records already queued"""
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if isinstance(h, DroppingQueueHandler)]:
+        root.removeHandler(handler)
+    listener.stop()
+
+
+class RequestContextMiddleware:
+    """ASGI middleware giving each request an id (``X-Request-ID``) for its logs
+
+    A well-formed ``X-Request-ID`` from the client or proxy is kept so logs can
+    be joined across services; otherwise a new one is generated. The id is
+    echoed in the response.
+    """
+
+    def __init__(self, app, routes: Iterable):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID.fullmatch(candidate):
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", ()), (b"x-request-id", request_id.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        id_token = current_request_id.set(request_id)
+        route_token = current_route.set(route_template(self.routes, scope))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_route.reset(route_token)
+            current_request_id.reset(id_token)
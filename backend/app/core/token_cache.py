@@ -0,0 +1,117 @@
+"""Cache for access-token verification.
+
+``get_current_user`` runs on every authenticated request. Caching the decoded
+claims per token lets hot sessions skip signature verification, and caching a
+compact snapshot of the user lets them skip the SQL lookup.
+
+Claims depend only on the token, so they stay in a per-process LRU; the
+signature check is cheaper than a network round trip. User snapshots live in
+the shared cache backend (``app.core.cache``), so every worker sees an
+eviction at once. Claims never outlive the token's ``exp``; user snapshots
+are evicted whenever the user row is updated or deleted (see
+``app.core.auth``). Revocation is tracked separately by
+``app.core.revocation``.
+"""
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+from ..schemas.user import TokenData
+from .cache import CacheBackend, TTLCache, cache
+from .settings import settings
+
+TOKEN_CACHE_MAX_ENTRIES = settings.token_cache_max_entries
+TOKEN_CACHE_USER_TTL_SECONDS = settings.token_cache_user_ttl_seconds
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Read-only view of the fields of a User needed by authenticated routes"""
+    id: int
+    email: str
+    name: str
+    avatar_url: Optional[str]
+    is_active: bool
+    created_at: datetime
+    last_login: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            avatar_url=user.avatar_url,
+            is_active=user.is_active,
+            created_at=user.created_at,
+            last_login=user.last_login,
+        )
+
+    def to_json(self) -> bytes:
+        data = asdict(self)
+        for field in ("created_at", "last_login"):
+            if data[field] is not None:
+                data[field] = data[field].isoformat()
+        return json.dumps(data).encode()
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "UserSnapshot":
+        data = json.loads(raw)
+        for field in ("created_at", "last_login"):
+            if data[field] is not None:
+                data[field] = datetime.fromisoformat(data[field])
+        return cls(**data)
+
+
+class TokenCache:
+    """Caches token -> claims locally and user snapshots in ``backend``"""
+
+    def __init__(self, backend: CacheBackend, max_entries: int, user_ttl_seconds: float):
+        self.backend = backend
+        self.user_ttl_seconds = user_ttl_seconds
+        self._claims = TTLCache(max_entries)
+
+    def get_claims(self, token: str) -> Optional[TokenData]:
+        """Return the cached claims of an already verified token"""
+        return self._claims.get(token)
+
+    def put_claims(self, token: str, claims: TokenData) -> None:
+        """Remember a verified token's claims until the token expires"""
+        self._claims.set(token, claims, claims.expires_at.timestamp())
+
+    @staticmethod
+    def _user_keys(user_id: int, email: str) -> tuple:
+        # Access tokens carry the email, refresh tokens the id
+        return f"user:{email}", f"user-id:{user_id}"
+
+    async def get_user(self, email: str) -> Optional[UserSnapshot]:
+        raw = await self.backend.get(f"user:{email}")
+        return UserSnapshot.from_json(raw) if raw is not None else None
+
+    async def get_user_by_id(self, user_id: int) -> Optional[UserSnapshot]:
+        raw = await self.backend.get(f"user-id:{user_id}")
+        return UserSnapshot.from_json(raw) if raw is not None else None
+
+    async def put_user(self, snapshot: UserSnapshot) -> None:
+        raw = snapshot.to_json()
+        keys = self._user_keys(snapshot.id, snapshot.email)
+        await self.backend.set_many({key: raw for key in keys}, self.user_ttl_seconds)
+
+    async def invalidate_user(self, user_id: int, email: str) -> None:
+        """Drop the cached snapshot so the next request reloads the user"""
+        await self.backend.delete(*self._user_keys(user_id, email))
+
+    def invalidate_user_soon(self, user_id: int, email: str) -> None:
+        """``invalidate_user`` for synchronous callers such as ORM events"""
+        self.backend.delete_soon(*self._user_keys(user_id, email))
+
+    async def clear(self) -> None:
+        self._claims.clear()
+        await self.backend.clear()
+
+    def stats(self) -> dict:
+        return {"tokens": self._claims.stats(), "shared": self.backend.stats()}
+
+
+token_cache = TokenCache(cache, TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_USER_TTL_SECONDS)
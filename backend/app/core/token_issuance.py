@@ -0,0 +1,114 @@
+"""Issue access/refresh token pairs in a single transaction.
+
+Login used to commit twice (``last_login``, then the refresh-token row) and
+register committed the user, re-selected it and committed again. Here the
+refresh-token insert and the ``last_login`` update share one transaction and
+one commit. On PostgreSQL both writes are sent as a single statement: a
+data-modifying CTE updates ``users`` and feeds the ``INSERT ... RETURNING``.
+"""
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from sqlalchemy import false, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+
+from ..models.user import RefreshToken, User
+from .auth import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    create_access_token,
+)
+from .refresh_tokens import create_refresh_token, refresh_token_digest
+from .token_cache import UserSnapshot, token_cache
+
+
+def _create_token_pair(user: User) -> Tuple[str, str, datetime]:
+    access_token = create_access_token(
+        data={"sub": user.email}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_refresh_token()
+    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    return access_token, refresh_token, expires_at
+
+
+def _login_statement(user_id: int, now: datetime, refresh_token: str, expires_at: datetime):
+    """Single statement that sets last_login and stores the refresh token"""
+    touched = (
+        update(User)
+        .where(User.id == user_id)
+        .values(last_login=now)
+        .returning(User.id)
+        .cte("touched")
+    )
+    return (
+        insert(RefreshToken)
+        .add_cte(touched)
+        .from_select(
+            ["user_id", "token_hash", "expires_at", "is_revoked"],
+            select(
+                touched.c.id,
+                literal(refresh_token_digest(refresh_token), RefreshToken.token_hash.type),
+                literal(expires_at, RefreshToken.expires_at.type),
+                false(),
+            ),
+        )
+        .returning(RefreshToken.id)
+    )
+
+
+async def issue_login_tokens(db: AsyncSession, user: User) -> Tuple[str, str]:
+    """Record a login and return ``(access_token, refresh_token)``
+
+    Updates ``last_login`` and inserts the refresh token in one transaction.
+    Raises ``LookupError`` if the user was deleted since it was loaded.
+    """
+    access_token, refresh_token, expires_at = _create_token_pair(user)
+    now = datetime.utcnow()
+    # Read before a rollback can expire the instance
+    user_id = user.id
+
+    if db.bind.dialect.name == "postgresql":
+        result = await db.execute(_login_statement(user_id, now, refresh_token, expires_at))
+        if result.scalar_one_or_none() is None:
+            await db.rollback()
+            raise LookupError(f"User {user_id} no longer exists")
+        await db.commit()
+        set_committed_value(user, "last_login", now)
+    else:
+        user.last_login = now
+        db.add(RefreshToken(user_id=user_id, token_hash=refresh_token_digest(refresh_token), expires_at=expires_at))
+        try:
+            await db.commit()
+        except StaleDataError:
+            # The UPDATE of last_login matched no row
+            await db.rollback()
+            raise LookupError(f"User {user_id} no longer exists")
+
+    # last_login is part of the cached snapshot; replace it rather than
+    # evicting it so the client's first authenticated request is a cache hit
+    # and never depends on replica lag. The ORM update above schedules an
+    # eviction of the same keys; put_user waits for it before writing.
+    await token_cache.invalidate_user(user.id, user.email)
+    await token_cache.put_user(UserSnapshot.from_user(user))
+    return access_token, refresh_token
+
+
+async def issue_registration_tokens(db: AsyncSession, user: User) -> Tuple[str, str]:
+    """Persist a new user together with its first refresh token
+
+    The user is flushed (``INSERT ... RETURNING`` fills in the id and server
+    defaults) and committed with the refresh token in one transaction, then
+    cached. Raises ``IntegrityError`` if the email is already taken.
+    """
+    db.add(user)
+    await db.flush()
+
+    access_token, refresh_token, expires_at = _create_token_pair(user)
+    db.add(RefreshToken(user_id=user.id, token_hash=refresh_token_digest(refresh_token), expires_at=expires_at))
+    await db.commit()
+
+    # A replica may not have the new user yet; serve the first requests from the cache
+    await token_cache.put_user(UserSnapshot.from_user(user))
+    return access_token, refresh_token
@@ -0,0 +1,178 @@
+"""JWT signing and verification with keys prepared once.
+
+python-jose parsed the key on every call and built claims from ``datetime``
+objects that were converted back to integers on encode. ``TokenSigner``
+prepares key objects once per process, serializes the fixed header once, and
+signs and verifies with PyJWT's algorithm implementations (``cryptography``
+for the asymmetric ones). Decoding does not go through ``jwt.decode``, which
+would prepare the key again on every call; it checks the algorithm, signature
+and time claims itself.
+
+HMAC (``HS256`` and friends) keeps using ``SECRET_KEY``. The asymmetric
+algorithms (``RS256``, ``ES256``, ``EdDSA``, ...) sign with the PEM private key
+in ``JWT_PRIVATE_KEY_FILE``. Services that only verify tokens can be given just
+the public key via ``JWT_PUBLIC_KEY_FILE``, or fetch it from ``/auth/jwks``.
+"""
+import json
+import time
+from typing import Optional, Union
+
+from jwt.algorithms import get_default_algorithms
+from jwt.exceptions import (
+    DecodeError,
+    ExpiredSignatureError,
+    ImmatureSignatureError,
+    InvalidAlgorithmError,
+    InvalidKeyError,
+    InvalidSignatureError,
+    InvalidTokenError,
+    MissingRequiredClaimError,
+)
+from jwt.utils import base64url_decode, base64url_encode
+
+from .settings import settings
+
+JWT_PRIVATE_KEY_FILE = settings.jwt_private_key_file
+JWT_PUBLIC_KEY_FILE = settings.jwt_public_key_file
+JWT_KEY_ID = settings.jwt_key_id
+JWT_LEEWAY_SECONDS = settings.jwt_leeway_seconds
+
+HMAC_ALGORITHMS = ("HS256", "HS384", "HS512")
+
+__all__ = ["InvalidTokenError", "TokenSigner", "create_token_signer"]
+
+
+def _read_key(path: Optional[str]) -> Optional[bytes]:
+    if not path:
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class TokenSigner:
+    """Encodes and decodes JWTs for one algorithm and key pair
+
+    ``signing_key`` is the HMAC secret or a PEM private key; without it the
+    signer can only verify. ``verification_key`` defaults to the public half of
+    the private key (or the secret for HMAC).
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        signing_key: Optional[Union[str, bytes]] = None,
+        verification_key: Optional[Union[str, bytes]] = None,
+        key_id: Optional[str] = None,
+        leeway_seconds: int = JWT_LEEWAY_SECONDS,
+    ):
+        algorithms = get_default_algorithms()
+        if algorithm not in algorithms or algorithm == "none":
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm!r}")
+        self.algorithm = algorithm
+        self.key_id = key_id
+        self.leeway_seconds = leeway_seconds
+        self._algorithm = algorithms[algorithm]
+
+        if algorithm in HMAC_ALGORITHMS:
+            if signing_key is None:
+                raise ValueError(f"{algorithm} requires a secret")
+            self._signing_key = self._verification_key = self._algorithm.prepare_key(signing_key)
+        else:
+            self._signing_key = self._algorithm.prepare_key(signing_key) if signing_key is not None else None
+            if verification_key is not None:
+                self._verification_key = self._algorithm.prepare_key(verification_key)
+            elif self._signing_key is not None:
+                self._verification_key = self._signing_key.public_key()
+            else:
+                raise ValueError(f"{algorithm} requires a private or public key")
+            if not hasattr(self._verification_key, "verify"):
+                raise InvalidKeyError("Expected a public key for verification")
+
+        header = {"alg": algorithm, "typ": "JWT"}
+        if key_id:
+            header["kid"] = key_id
+        self._header_segment = base64url_encode(json.dumps(header, separators=(",", ":")).encode())
+
+    @property
+    def can_sign(self) -> bool:
+        return self._signing_key is not None
+
+    def encode(self, claims: dict) -> str:
+        """Sign ``claims``; time claims must already be integer timestamps"""
+        if self._signing_key is None:
+            raise RuntimeError("This token signer only has a verification key")
+        payload = json.dumps(claims, separators=(",", ":")).encode()
+        signing_input = self._header_segment + b"." + base64url_encode(payload)
+        signature = self._algorithm.sign(signing_input, self._signing_key)
+        return (signing_input + b"." + base64url_encode(signature)).decode()
+
+    def decode(self, token: str) -> dict:
+        """Verify the algorithm, signature and ``exp`` (plus ``nbf``/``iat`` if set)
+
+        Raises a subclass of ``InvalidTokenError``, as ``jwt.decode`` does.
+        """
+        try:
+            signing_input, signature_segment = token.encode().rsplit(b".", 1)
+            header_segment, payload_segment = signing_input.split(b".")
+            # Our own tokens carry exactly our header; parse anything else
+            if header_segment != self._header_segment:
+                header = json.loads(base64url_decode(header_segment))
+                if not isinstance(header, dict):
+                    raise DecodeError("Invalid header")
+                if header.get("alg") != self.algorithm:
+                    raise InvalidAlgorithmError("The specified alg value is not allowed")
+            signature = base64url_decode(signature_segment)
+        except ValueError as e:
+            raise DecodeError("Invalid token") from e
+
+        if not self._algorithm.verify(signing_input, self._verification_key, signature):
+            raise InvalidSignatureError("Signature verification failed")
+
+        try:
+            claims = json.loads(base64url_decode(payload_segment))
+        except ValueError as e:
+            raise DecodeError("Invalid payload") from e
+        if not isinstance(claims, dict):
+            raise DecodeError("Invalid payload")
+        self._validate_times(claims)
+        return claims
+
+    def _validate_times(self, claims: dict) -> None:
+        now = time.time()
+        if "exp" not in claims:
+            raise MissingRequiredClaimError("exp")
+        times = {}
+        for claim in ("exp", "nbf", "iat"):
+            if claim in claims:
+                value = claims[claim]
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise DecodeError(f"The {claim} claim must be a number")
+                times[claim] = value
+        if times["exp"] <= now - self.leeway_seconds:
+            raise ExpiredSignatureError("Signature has expired")
+        if times.get("nbf", 0) > now + self.leeway_seconds:
+            raise ImmatureSignatureError("The token is not yet valid (nbf)")
+        if times.get("iat", 0) > now + self.leeway_seconds:
+            raise ImmatureSignatureError("The token is not yet valid (iat)")
+
+    def jwks(self) -> dict:
+        """Public verification keys as a JWK set (empty for HMAC)"""
+        if self.algorithm in HMAC_ALGORITHMS:
+            return {"keys": []}
+        jwk = self._algorithm.to_jwk(self._verification_key, as_dict=True)
+        jwk.update({"alg": self.algorithm, "use": "sig"})
+        if self.key_id:
+            jwk["kid"] = self.key_id
+        return {"keys": [jwk]}
+
+
+def create_token_signer(algorithm: str, secret_key: str) -> TokenSigner:
+    """Build the signer for ``ALGORITHM`` from ``SECRET_KEY`` or the configured key files"""
+    if algorithm in HMAC_ALGORITHMS:
+        return TokenSigner(algorithm, signing_key=secret_key, key_id=JWT_KEY_ID)
+    return TokenSigner(
+        algorithm,
+        signing_key=_read_key(JWT_PRIVATE_KEY_FILE),
+        verification_key=_read_key(JWT_PUBLIC_KEY_FILE),
+        key_id=JWT_KEY_ID,
+    )
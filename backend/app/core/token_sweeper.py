@@ -0,0 +1,91 @@
+"""Background sweeper for expired and spent tokens.
+
+Every login inserts a refresh token and every forgot-password request inserts
+a reset token. Rows that can no longer be used are deleted in bounded
+batches, each in its own short transaction, so the sweep never holds long
+locks and lookup tables stay small. Revoked refresh tokens and revoked
+access-token ids are kept until the token expires: they are the source the
+in-memory revocation list (``app.core.revocation``) is rebuilt from.
+
+Email jobs that failed for good are swept too, once
+``EMAIL_FAILED_RETENTION_SECONDS`` have passed since their last attempt: a
+failed password reset email still holds its reset token in ``context``.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ..models.email_job import EmailJob
+from ..models.user import PasswordResetToken, RefreshToken, RevokedAccessToken
+from .metrics import REGISTRY, Counter
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SWEEP_ENABLED = settings.token_sweep_enabled
+TOKEN_SWEEP_INTERVAL_SECONDS = settings.token_sweep_interval_seconds
+TOKEN_SWEEP_BATCH_SIZE = settings.token_sweep_batch_size
+EMAIL_FAILED_RETENTION_SECONDS = settings.email_failed_retention_seconds
+
+TOKENS_SWEPT = REGISTRY.register(Counter(
+    "tokens_swept_total", "Expired or used token rows (and failed email jobs) deleted", ("table",)
+))
+
+
+def _dead_token_filters(now: datetime):
+    return (
+        (RefreshToken, RefreshToken.expires_at < now),
+        (RevokedAccessToken, RevokedAccessToken.expires_at < now),
+        (PasswordResetToken, or_(PasswordResetToken.expires_at < now, PasswordResetToken.used == True)),
+        # run_at of a failed job is its last attempt plus the lease
+        (EmailJob, (EmailJob.status == "failed")
+            & (EmailJob.run_at < now - timedelta(seconds=EMAIL_FAILED_RETENTION_SECONDS))),
+    )
+
+
+async def sweep_tokens(session_factory: async_sessionmaker, batch_size: int = TOKEN_SWEEP_BATCH_SIZE) -> Dict[str, int]:
+    """Delete dead token rows in batches, returning the number deleted per table"""
+    now = datetime.utcnow()
+    deleted: Dict[str, int] = {}
+
+    for model, is_dead in _dead_token_filters(now):
+        table = model.__tablename__
+        deleted[table] = 0
+        while True:
+            primary_key = model.__mapper__.primary_key[0]
+            batch = select(primary_key).where(is_dead).limit(batch_size).scalar_subquery()
+            async with session_factory() as db:
+                result = await db.execute(
+                    delete(model).where(primary_key.in_(batch)).execution_options(synchronize_session=False)
+                )
+                await db.commit()
+            deleted[table] += result.rowcount
+            TOKENS_SWEPT.inc((table,), result.rowcount)
+            if result.rowcount < batch_size:
+                break
+            # Let request handlers run between batches
+            await asyncio.sleep(0)
+
+    return deleted
+
+
+async def run_token_sweeper(
+    session_factory: async_sessionmaker,
+    interval_seconds: float = TOKEN_SWEEP_INTERVAL_SECONDS,
+    batch_size: int = TOKEN_SWEEP_BATCH_SIZE,
+) -> None:
+    """Sweep forever; run as a background task and cancel it on shutdown"""
+    while True:
+        try:
+            deleted = await sweep_tokens(session_factory, batch_size)
+            if any(deleted.values()):
+                logger.info("Swept dead tokens: %s", deleted)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Token sweep failed")
+        await asyncio.sleep(interval_seconds)
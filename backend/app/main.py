@@ -1,32 +1,110 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import os
-from dotenv import load_dotenv
+from fastapi.responses import PlainTextResponse
 
-from .database import engine, Base
-from .api import auth
-
-load_dotenv()
+from .database import (
+    AsyncSessionLocal,
+    dispose_engines,
+    engine_created_hooks,
+    get_async_engine,
+    get_replica_set,
+    pool_stats,
+    replica_stats,
+)
+from .api import auth, avatars, moods
+from .core.hashing import configure_password_hashing, hashing_pool
+from .core.metrics import REGISTRY, MetricsMiddleware, instrument_engine, register_callback_gauge, register_pool_gauges
+from .core.read_replicas import run_replica_health_checks
+from .core.structured_logging import RequestContextMiddleware, configure_logging, stop_logging
+from .core.token_cache import token_cache
+from .core.avatars import avatar_cache
+from .core.cache import cache
+from .core.revocation import revocation_list, run_revocation_sync
+from .core.token_sweeper import TOKEN_SWEEP_ENABLED, run_token_sweeper
+from .core.email_queue import EMAIL_WORKER_ENABLED, run_email_worker
+from .core.settings import settings
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Importing the app does no I/O: the schema is managed by Alembic only
+# (``alembic upgrade head``), and engines, background tasks and the bcrypt
+# calibration are set up by the lifespan when a server starts.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start engines and background work at startup; stop them at shutdown"""
+    # Log records are written by a background thread from here on
+    log_listener = configure_logging()
+    
+    # Pick the bcrypt cost for this host before serving logins
+    configure_password_hashing()
+    get_async_engine()
+    
+    # Send queued email (or leave it to scripts/email_worker.py processes)
+    app.state.email_worker = None
+    if EMAIL_WORKER_ENABLED:
+        app.state.email_worker = asyncio.create_task(run_email_worker(AsyncSessionLocal))
+    
+    # Check replica lag before routing reads to them, then keep checking
+    replicas = get_replica_set()
+    app.state.replica_health = None
+    if replicas:
+        await replicas.check()
+        app.state.replica_health = asyncio.create_task(run_replica_health_checks(replicas))
+    
+    # Load revoked tokens, then poll for revocations made by other workers
+    await revocation_list.sync(AsyncSessionLocal)
+    app.state.revocation_sync = asyncio.create_task(run_revocation_sync(AsyncSessionLocal))
+    # Delete expired and revoked tokens in the background
+    app.state.token_sweeper = None
+    if TOKEN_SWEEP_ENABLED:
+        app.state.token_sweeper = asyncio.create_task(run_token_sweeper(AsyncSessionLocal))
+    
+    try:
+        yield
+    finally:
+        background = (
+            app.state.revocation_sync, app.state.token_sweeper, app.state.replica_health, app.state.email_worker,
+        )
+        tasks = [task for task in background if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        hashing_pool.shutdown()
+        await cache.close()
+        await dispose_engines()
+        stop_logging(log_listener)
 
 app = FastAPI(
     title="MoodMate API",
     description="A comprehensive mood tracking API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
-allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173,http://localhost:3000").split(",")
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allowed_origins,
+    allow_origins=list(settings.allowed_origins),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Record request metrics and database timings
+app.add_middleware(MetricsMiddleware, routes=app.router.routes)
+# Request ids for logs (outermost, so every log line of a request carries it)
+app.add_middleware(RequestContextMiddleware, routes=app.router.routes)
+engine_created_hooks.append(instrument_engine)
+register_pool_gauges(pool_stats)
+register_callback_gauge(
+    "db_replica_healthy", "Whether a read replica is receiving reads", ("replica",),
+    lambda: {(name,): float(stats["healthy"]) for name, stats in replica_stats().items()},
+)
+register_callback_gauge(
+    "db_replica_lag_seconds", "Replication lag at the last health check", ("replica",),
+    lambda: {(name,): stats["lag_seconds"] for name, stats in replica_stats().items()},
+)
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -37,8 +115,45 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "MoodMate API is running"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Metrics in Prometheus text exposition format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/db")
+async def database_health():
+    """Connection pool checkout wait time, usage and overflow"""
+    return pool_stats()
+
+@app.get("/health/replicas")
+async def replicas_health():
+    """Read replica health and lag at the last check"""
+    return replica_stats()
+
+@app.get("/health/hashing")
+async def hashing_health():
+    """Password hashing pool queue depth and latency"""
+    return hashing_pool.stats()
+
+@app.get("/health/token-cache")
+async def token_cache_health():
+    """Token verification cache and shared cache backend hit/miss counters"""
+    return token_cache.stats()
+
+@app.get("/health/avatars")
+async def avatar_cache_health():
+    """Avatar cache entries and hit/miss counters"""
+    return avatar_cache.stats()
+
+@app.get("/health/revocations")
+async def revocations_health():
+    """In-memory token revocation list size and last sync"""
+    return revocation_list.stats()
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1")
+app.include_router(moods.router, prefix="/api/v1")
+app.include_router(avatars.router, prefix="/api/v1")
 
 @app.get("/api/v1/")
 async def api_root():
@@ -47,7 +162,9 @@ async def api_root():
         "message": "MoodMate API v1",
         "endpoints": {
             "health": "/health",
+            "metrics": "/metrics",
             "auth": "/api/v1/auth",
+            "moods": "/api/v1/moods",
             "docs": "/docs",
             "redoc": "/redoc"
         }
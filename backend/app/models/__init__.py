@@ -1,3 +1,5 @@
-from .user import User, PasswordResetToken, RefreshToken, Base
+from .user import User, PasswordResetToken, RefreshToken, RevokedAccessToken, Base
+from .mood import MoodEntry, MoodRollup, MoodRollupEmoji
+from .email_job import EmailJob
 
-__all__ = ["User", "PasswordResetToken", "RefreshToken", "Base"]
+__all__ = ["User", "PasswordResetToken", "RefreshToken", "RevokedAccessToken", "MoodEntry", "MoodRollup", "MoodRollupEmoji", "EmailJob", "Base"]
@@ -0,0 +1,33 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, text
+from sqlalchemy.sql import func
+from ..database import Base
+
+class EmailJob(Base):
+    """Outbound email waiting for the email worker (see ``app.core.email_queue``)
+
+    Sent jobs are deleted. ``run_at`` is when the job is next due: claiming a
+    job pushes it forward by the lease, so a job whose worker died is picked
+    up again, and a failed attempt pushes it back by the retry backoff.
+    """
+    __tablename__ = "email_jobs"
+    __table_args__ = (
+        # Workers only ever look for due pending jobs
+        Index(
+            "ix_email_jobs_pending_run_at", "run_at",
+            postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    template = Column(String(50), nullable=False)
+    recipient = Column(String, nullable=False)
+    context = Column(JSON, nullable=False)
+    # "pending" until sent (deleted) or out of attempts ("failed")
+    status = Column(String(16), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<EmailJob(id={self.id}, template='{self.template}', status='{self.status}')>"
@@ -0,0 +1,55 @@
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Index, JSON
+from sqlalchemy.sql import func
+from ..database import Base
+
+class MoodEntry(Base):
+    __tablename__ = "mood_entries"
+    __table_args__ = (
+        # Serves history pages and exports: one user's entries in time order
+        Index("ix_mood_entries_user_created_id", "user_id", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    score = Column(Integer, nullable=False)  # 1 (worst) to 10 (best)
+    emoji = Column(String(32), nullable=False)
+    note = Column(Text)
+    tags = Column(JSON, nullable=False, default=list)
+    # When the mood was recorded; offline clients send their own timestamp
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<MoodEntry(id={self.id}, user_id={self.user_id}, score={self.score})>"
+
+
+class MoodRollup(Base):
+    """Per-user aggregate of mood entries for one UTC day or ISO week"""
+    __tablename__ = "mood_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(String(8), primary_key=True)  # "day" or "week"
+    period_start = Column(Date, primary_key=True)  # the day, or the Monday of the week
+    entry_count = Column(Integer, nullable=False)
+    score_sum = Column(Integer, nullable=False)
+    score_min = Column(Integer, nullable=False)
+    score_max = Column(Integer, nullable=False)
+
+    @property
+    def score_mean(self) -> float:
+        return self.score_sum / self.entry_count
+
+    def __repr__(self):
+        return f"<MoodRollup(user_id={self.user_id}, period={self.period}, period_start={self.period_start})>"
+
+class MoodRollupEmoji(Base):
+    """Emoji histogram bucket for a MoodRollup"""
+    __tablename__ = "mood_rollup_emojis"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(String(8), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    emoji = Column(String(32), primary_key=True)
+    entry_count = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<MoodRollupEmoji(user_id={self.user_id}, period_start={self.period_start}, emoji={self.emoji})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index, LargeBinary, text
 from sqlalchemy.sql import func
 from ..database import Base
 
@@ -9,7 +9,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
-    avatar_url = Column(String)
+    avatar_url = Column(String, index=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -20,6 +20,14 @@ class User(Base):
 
 class PasswordResetToken(Base):
     __tablename__ = "password_reset_tokens"
+    __table_args__ = (
+        # Lookups only ever match unused tokens; the sweeper scans by expiry
+        Index(
+            "ix_password_reset_tokens_unused_token", "token", "expires_at",
+            postgresql_where=text("NOT used"), sqlite_where=text("used = 0"),
+        ),
+        Index("ix_password_reset_tokens_expires_at", "expires_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, nullable=False, index=True)
@@ -32,14 +40,39 @@ class PasswordResetToken(Base):
         return f"<PasswordResetToken(email='{self.email}', expires_at='{self.expires_at}')>"
 
 class RefreshToken(Base):
+    """Refresh token row, found by the SHA-256 digest of the opaque token"""
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        # The sweeper scans by expiry
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+        # Workers poll for revocations made since their last sync
+        Index(
+            "ix_refresh_tokens_revoked_at", "revoked_at",
+            postgresql_where=text("revoked_at IS NOT NULL"), sqlite_where=text("revoked_at IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    token = Column(String, unique=True, nullable=False, index=True)
+    token_hash = Column(LargeBinary(32), unique=True, index=True)
+    # Legacy JWT refresh tokens, still accepted until they expire; new rows
+    # only store token_hash. Dropped once no legacy token can be live.
+    token = Column(String, unique=True, index=True)
     expires_at = Column(DateTime(timezone=True), nullable=False)
     is_revoked = Column(Boolean, default=False)
+    revoked_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     def __repr__(self):
-        return f"<RefreshToken(user_id={self.user_id}, expires_at='{self.expires_at}')>" 
\ No newline at end of file
+        return f"<RefreshToken(user_id={self.user_id}, expires_at='{self.expires_at}')>"
+
+class RevokedAccessToken(Base):
+    """Access token revoked before its expiry, identified by its ``jti`` claim"""
+    __tablename__ = "revoked_access_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<RevokedAccessToken(jti='{self.jti}', expires_at='{self.expires_at}')>" 
\ No newline at end of file
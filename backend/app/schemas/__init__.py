@@ -1,3 +1,4 @@
 from .user import UserBase, UserCreate, UserLogin, UserUpdate, UserResponse, Token, TokenData, PasswordResetRequest, PasswordReset, PasswordChange, RefreshToken
+from .mood import MoodEntryCreate, MoodEntryResponse, MoodBulkResult, MoodPage, MoodRollupResponse, MoodSummary
 
-__all__ = ["UserBase", "UserCreate", "UserLogin", "UserUpdate", "UserResponse", "Token", "TokenData", "PasswordResetRequest", "PasswordReset", "PasswordChange", "RefreshToken"]
+__all__ = ["UserBase", "UserCreate", "UserLogin", "UserUpdate", "UserResponse", "Token", "TokenData", "PasswordResetRequest", "PasswordReset", "PasswordChange", "RefreshToken", "MoodEntryCreate", "MoodEntryResponse", "MoodBulkResult", "MoodPage", "MoodRollupResponse", "MoodSummary"]
@@ -0,0 +1,42 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from datetime import date, datetime
+
+class MoodEntryCreate(BaseModel):
+    score: int = Field(ge=1, le=10)
+    emoji: str = Field(min_length=1, max_length=32)
+    note: Optional[str] = Field(default=None, max_length=10000)
+    tags: List[str] = Field(default_factory=list, max_length=20)
+    # When the mood was recorded; defaults to the time of upload
+    created_at: Optional[datetime] = None
+
+class MoodEntryResponse(BaseModel):
+    id: int
+    score: int
+    emoji: str
+    note: Optional[str] = None
+    tags: List[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class MoodBulkResult(BaseModel):
+    inserted: int
+
+class MoodPage(BaseModel):
+    items: List[MoodEntryResponse]
+    # Opaque cursor for the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
+
+class MoodRollupResponse(BaseModel):
+    period_start: date
+    entry_count: int
+    score_mean: float
+    score_min: int
+    score_max: int
+    emojis: Dict[str, int]
+
+class MoodSummary(BaseModel):
+    period: Literal["day", "week"]
+    buckets: List[MoodRollupResponse]
@@ -1,7 +1,11 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, WithJsonSchema
+from typing import Annotated, Optional
 from datetime import datetime
 
+# Emails in responses come from the database and were validated on the way in;
+# running email-validator again cost ~70 µs per response
+StoredEmail = Annotated[str, WithJsonSchema({"type": "string", "format": "email"})]
+
 class UserBase(BaseModel):
     email: EmailStr
     name: str
@@ -29,6 +33,7 @@ class PasswordChange(BaseModel):
     new_password: str
 
 class UserResponse(UserBase):
+    email: StoredEmail
     id: int
     avatar_url: Optional[str] = None
     is_active: bool
@@ -48,4 +53,6 @@ class RefreshToken(BaseModel):
     refresh_token: str
 
 class TokenData(BaseModel):
-    email: Optional[str] = None 
\ No newline at end of file
+    email: Optional[str] = None
+    expires_at: Optional[datetime] = None
+    jti: Optional[str] = None 
\ No newline at end of file
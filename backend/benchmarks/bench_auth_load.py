@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Load test the auth API: register, then a weighted login/refresh/me/logout mix.
+
+Runs the real app in-process (middleware, dependencies, lifespan) through
+httpx's ASGI transport against a temporary SQLite file, or any database passed
+with --database-url (e.g. a local Postgres container). The schema is created
+with the Alembic migrations. Reports p50/p95/p99 latency, requests per second
+and database queries per request for each operation, and writes them to a JSON
+file that --compare can diff against a run from another commit.
+
+    python benchmarks/bench_auth_load.py --users 50 --requests 2000 --concurrency 20
+    python benchmarks/bench_auth_load.py --compare benchmarks/results/auth_load-<commit>.json
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# Add the app directory to the Python path
+sys.path.append(BACKEND_DIR)
+
+OPERATIONS = ("register", "login", "refresh", "me", "logout")
+DEFAULT_MIX = "login=2,refresh=4,me=12,logout=1"
+PASSWORD = "load-test-password"
+
+# Statements executed on behalf of the request being served
+_request_queries = contextvars.ContextVar("request_queries", default=None)
+
+
+def parse_mix(value):
+    """``"login=2,me=10"`` -> ``{"login": 2.0, "me": 10.0}``"""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS[1:]:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class VirtualUser:
+    def __init__(self, email):
+        self.email = email
+        self.access_token = None
+        self.refresh_token = None
+
+    def signed_in(self, body):
+        self.access_token = body["access_token"]
+        self.refresh_token = body["refresh_token"]
+
+
+class LoadRun:
+    def __init__(self, client):
+        self.client = client
+        self.samples = {name: [] for name in OPERATIONS}
+        self.errors = {name: 0 for name in OPERATIONS}
+
+    async def request(self, operation, method, url, **kwargs):
+        queries = [0]
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        finally:
+            latency = time.perf_counter() - started
+            _request_queries.reset(token)
+        self.samples[operation].append((latency, queries[0]))
+        if response.status_code != 200:
+            self.errors[operation] += 1
+            return None
+        return response.json()
+
+    async def register(self, user):
+        body = await self.request("register", "POST", "/api/v1/auth/register", json={
+            "email": user.email, "name": "Load Test", "password": PASSWORD,
+        })
+        if body:
+            user.signed_in(body)
+
+    async def login(self, user):
+        body = await self.request("login", "POST", "/api/v1/auth/login", json={
+            "email": user.email, "password": PASSWORD,
+        })
+        if body:
+            user.signed_in(body)
+
+    async def refresh(self, user):
+        body = await self.request("refresh", "POST", "/api/v1/auth/refresh", json={
+            "refresh_token": user.refresh_token,
+        })
+        if body:
+            user.access_token = body["access_token"]
+
+    async def me(self, user):
+        await self.request("me", "GET", "/api/v1/auth/me", headers={
+            "Authorization": f"Bearer {user.access_token}",
+        })
+
+    async def logout(self, user):
+        await self.request("logout", "POST", "/api/v1/auth/logout", json={
+            "refresh_token": user.refresh_token,
+        }, headers={"Authorization": f"Bearer {user.access_token}"})
+        user.access_token = user.refresh_token = None
+
+    async def run_phase(self, operations, users, concurrency):
+        """Run ``operations`` (names, in order) with ``concurrency`` workers
+
+        Each worker checks a user out of a shared queue, so one user never has
+        two requests in flight. Signed-out users log in instead of the
+        operation they drew.
+        """
+        queue = asyncio.Queue()
+        for user in users:
+            queue.put_nowait(user)
+        pending = iter(operations)
+
+        async def worker():
+            for operation in pending:
+                user = await queue.get()
+                if operation not in ("register", "login") and user.refresh_token is None:
+                    operation = "login"
+                await getattr(self, operation)(user)
+                queue.put_nowait(user)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+    def summary(self, operation, wall_seconds):
+        samples = self.samples[operation]
+        latencies = sorted(latency * 1000 for latency, _ in samples)
+        return {
+            "requests": len(samples),
+            "errors": self.errors[operation],
+            # Share of the phase's wall time, so the operations of a mix add up
+            "rps": len(samples) / wall_seconds if wall_seconds else None,
+            "latency_ms": {
+                "mean": sum(latencies) / len(latencies) if latencies else None,
+                "p50": percentile(latencies, 0.50),
+                "p95": percentile(latencies, 0.95),
+                "p99": percentile(latencies, 0.99),
+                "max": latencies[-1] if latencies else None,
+            },
+            "queries_per_request": sum(q for _, q in samples) / len(samples) if samples else None,
+        }
+
+
+async def main(args):
+    # Configure the app before it is imported; settings are read once
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["TOKEN_SWEEP_ENABLED"] = "false"
+    # No background SMTP traffic during the run; registrations still queue their jobs
+    os.environ["EMAIL_WORKER_ENABLED"] = "false"
+    if args.password_hash_rounds:
+        os.environ["PASSWORD_HASH_ROUNDS"] = str(args.password_hash_rounds)
+
+    import httpx
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import event
+
+    from app.core import hashing
+    from app.database import engine_created_hooks
+    from app.main import app
+
+    command.upgrade(Config(os.path.join(BACKEND_DIR, "alembic.ini")), "head")
+
+    def count_queries(sync_engine):
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _count(*_):
+            queries = _request_queries.get()
+            if queries is not None:
+                queries[0] += 1
+
+    engine_created_hooks.append(count_queries)
+
+    rng = random.Random(args.seed)
+    run_id = f"{time.time_ns():x}"
+    users = [VirtualUser(f"load-{run_id}-{i}@example.com") for i in range(args.users)]
+    names = list(args.mix)
+    mix = rng.choices(names, weights=[args.mix[name] for name in names], k=args.requests)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            load = LoadRun(client)
+            register_seconds = await load.run_phase(["register"] * len(users), users, args.concurrency)
+            mix_seconds = await load.run_phase(mix, users, args.concurrency)
+        bcrypt_rounds = hashing.bcrypt_rounds
+
+    operations = {"register": load.summary("register", register_seconds)}
+    for name in OPERATIONS[1:]:
+        if load.samples[name]:
+            operations[name] = load.summary(name, mix_seconds)
+    mixed = sum(len(load.samples[name]) for name in OPERATIONS[1:])
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": args.database_url.split(":", 1)[0],
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "seed": args.seed,
+            "bcrypt_rounds": bcrypt_rounds,
+        },
+        "mix": {
+            "requests": mixed,
+            "seconds": mix_seconds,
+            "rps": mixed / mix_seconds if mix_seconds else None,
+        },
+        "operations": operations,
+    }
+
+
+def print_results(results, baseline=None):
+    meta = results["meta"]
+    print(
+        f"{meta['commit']} {meta['database']} users={meta['users']} concurrency={meta['concurrency']} "
+        f"bcrypt_rounds={meta['bcrypt_rounds']} mix rps={results['mix']['rps']:.1f}"
+    )
+    print(f"{'operation':<10}{'requests':>9}{'errors':>7}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for name, op in results["operations"].items():
+        latency = op["latency_ms"]
+        print(
+            f"{name:<10}{op['requests']:>9}{op['errors']:>7}{op['rps']:>9.1f}{latency['p50']:>9.2f}"
+            f"{latency['p95']:>9.2f}{latency['p99']:>9.2f}{op['queries_per_request']:>9.2f}"
+        )
+    if baseline is None:
+        return
+
+    print(f"\nchange vs {baseline['meta']['commit']} ({baseline['meta']['timestamp']})")
+    print(f"{'operation':<10}{'rps':>10}{'p95':>10}{'p99':>10}{'queries':>10}")
+    for name, op in results["operations"].items():
+        old = baseline["operations"].get(name)
+        if old is None:
+            continue
+
+        def change(new_value, old_value):
+            if not old_value:
+                return "n/a"
+            return f"{(new_value - old_value) / old_value * 100:+.1f}%"
+
+        print(
+            f"{name:<10}{change(op['rps'], old['rps']):>10}"
+            f"{change(op['latency_ms']['p95'], old['latency_ms']['p95']):>10}"
+            f"{change(op['latency_ms']['p99'], old['latency_ms']['p99']):>10}"
+            f"{op['queries_per_request'] - old['queries_per_request']:>+10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="requests in the mixed phase")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--password-hash-rounds", type=int,
+                        help="bcrypt cost; defaults to the app's own calibration")
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/auth_load-<commit>.json)")
+    parser.add_argument("--compare", help="JSON results of an earlier run to diff against")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"auth_load-{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    print(f"\nSaved {output}")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark JWT encode/decode throughput: python-jose vs TokenSigner.
+
+The jose rows reproduce the previous implementation (string secret parsed on
+every call, ``datetime`` claims); they are skipped if python-jose is not
+installed. Asymmetric algorithms use freshly generated keys.
+
+    python benchmarks/bench_jwt.py --iterations 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Add the app directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+from app.core.token_signing import TokenSigner
+
+SECRET = "benchmark-secret-key"
+
+
+def ops_per_second(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - started)
+
+
+def private_pem(private_key):
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def jose_cases():
+    try:
+        from jose import jwt as jose_jwt
+    except ImportError:
+        print("python-jose not installed; skipping the baseline rows")
+        return []
+
+    def claims():
+        return {
+            "sub": "user@example.com",
+            "exp": datetime.utcnow() + timedelta(minutes=30),
+            "jti": uuid.uuid4().hex,
+        }
+
+    cases = []
+    es256_key = private_pem(ec.generate_private_key(ec.SECP256R1())).decode()
+    for algorithm, key in (("HS256", SECRET), ("ES256", es256_key)):
+        token = jose_jwt.encode(claims(), key, algorithm=algorithm)
+        verify_key = key if algorithm == "HS256" else jose_public_key(key)
+        cases.append((
+            f"python-jose {algorithm}",
+            lambda key=key, algorithm=algorithm: jose_jwt.encode(claims(), key, algorithm=algorithm),
+            lambda token=token, key=verify_key, algorithm=algorithm: jose_jwt.decode(token, key, algorithms=[algorithm]),
+        ))
+    return cases
+
+
+def jose_public_key(private_key_pem):
+    key = serialization.load_pem_private_key(private_key_pem.encode(), password=None)
+    return key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+
+def signer_cases():
+    def claims():
+        return {"sub": "user@example.com", "exp": int(time.time()) + 1800, "jti": uuid.uuid4().hex}
+
+    cases = []
+    for algorithm, key in (
+        ("HS256", SECRET),
+        ("ES256", private_pem(ec.generate_private_key(ec.SECP256R1()))),
+        ("EdDSA", private_pem(ed25519.Ed25519PrivateKey.generate())),
+    ):
+        signer = TokenSigner(algorithm, signing_key=key)
+        token = signer.encode(claims())
+        cases.append((
+            f"TokenSigner {algorithm}",
+            lambda signer=signer: signer.encode(claims()),
+            lambda signer=signer, token=token: signer.decode(token),
+        ))
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JWT encode/decode")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'implementation':<22} {'encode ops/s':>14} {'decode ops/s':>14}")
+    for name, encode, decode in jose_cases() + signer_cases():
+        encode_rate = ops_per_second(encode, args.iterations)
+        decode_rate = ops_per_second(decode, args.iterations)
+        print(f"{name:<22} {encode_rate:>14,.0f} {decode_rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark mood analytics: per-row Python loops vs the vectorized engine.
+
+Generates a synthetic mood history for many users, checks that both
+implementations agree, and reports the time for a full batch pass.
+
+    python benchmarks/bench_mood_analytics.py --users 1000 --days 365
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the app directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from app.core.mood_analytics import MoodArrays, analyze_users
+
+TAGS = ["work", "gym", "family", "friends", "sleep", "travel", "study", "outdoors"]
+
+
+def generate_rows(users, days, entries_per_day, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    rows = []
+    for user_id in range(1, users + 1):
+        for day in range(days):
+            for _ in range(rng.randint(0, entries_per_day * 2)):
+                created_at = start + timedelta(days=day, seconds=rng.randrange(86400))
+                rows.append((user_id, created_at, rng.randint(1, 10), rng.sample(TAGS, rng.randint(0, 3))))
+    return rows
+
+
+def naive_analyze(rows, window):
+    """Reference implementation: one Python dict update per entry"""
+    by_user = {}
+    for user_id, created_at, score, tags in rows:
+        by_user.setdefault(user_id, []).append((created_at.date(), score, tags))
+
+    results = {}
+    for user_id, entries in by_user.items():
+        days = {}
+        weekdays = {}
+        for day, score, _ in entries:
+            days.setdefault(day, []).append(score)
+            weekdays.setdefault(day.weekday(), []).append(score)
+
+        first, last = min(days), max(days)
+        daily_mean, rolling_mean, volatility = [], [], []
+        for offset in range((last - first).days + 1):
+            day = first + timedelta(days=offset)
+            scores = days.get(day)
+            daily_mean.append(sum(scores) / len(scores) if scores else math.nan)
+
+            window_scores, window_means = [], []
+            for back in range(window):
+                previous = day - timedelta(days=back)
+                if previous < first:
+                    break
+                if previous in days:
+                    window_scores.extend(days[previous])
+                    window_means.append(sum(days[previous]) / len(days[previous]))
+            rolling_mean.append(sum(window_scores) / len(window_scores) if window_scores else math.nan)
+            if len(window_means) >= 2:
+                mean = sum(window_means) / len(window_means)
+                volatility.append(math.sqrt(sum((m - mean) ** 2 for m in window_means) / len(window_means)))
+            else:
+                volatility.append(math.nan)
+
+        weekday_mean = [
+            sum(weekdays[d]) / len(weekdays[d]) if d in weekdays else math.nan for d in range(7)
+        ]
+
+        scores = [score for _, score, _ in entries]
+        score_mean = sum(scores) / len(scores)
+        tag_correlation = {}
+        for tag in sorted({tag for _, _, tags in entries for tag in tags}):
+            present = [1.0 if tag in tags else 0.0 for _, _, tags in entries]
+            present_mean = sum(present) / len(present)
+            covariance = sum((x - present_mean) * (y - score_mean) for x, y in zip(present, scores))
+            spread = math.sqrt(
+                sum((x - present_mean) ** 2 for x in present) * sum((y - score_mean) ** 2 for y in scores)
+            )
+            tag_correlation[tag] = covariance / spread if spread else math.nan
+
+        results[user_id] = (daily_mean, rolling_mean, volatility, weekday_mean, tag_correlation)
+    return results
+
+
+def check_agreement(naive, vectorized):
+    for user_id, (daily_mean, rolling_mean, volatility, weekday_mean, tag_correlation) in naive.items():
+        trends = vectorized[user_id]
+        for expected, actual in (
+            (daily_mean, trends.daily_mean),
+            (rolling_mean, trends.rolling_mean),
+            (volatility, trends.volatility),
+            (weekday_mean, trends.weekday_mean),
+        ):
+            assert np.allclose(expected, actual, equal_nan=True, atol=1e-6), f"user {user_id} differs"
+        assert tag_correlation.keys() == trends.tag_correlation.keys()
+        assert np.allclose(
+            list(tag_correlation.values()), list(trends.tag_correlation.values()), equal_nan=True, atol=1e-6
+        )
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mood analytics")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--entries-per-day", type=int, default=2, help="average entries per user per day")
+    parser.add_argument("--window", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = generate_rows(args.users, args.days, args.entries_per_day)
+    print(f"{len(rows)} entries across {args.users} users and {args.days} days")
+
+    naive, naive_seconds = timed(naive_analyze, rows, args.window)
+    data, load_seconds = timed(MoodArrays.from_rows, rows)
+    vectorized, vectorized_seconds = timed(analyze_users, data, args.window)
+    check_agreement(naive, vectorized)
+
+    print(f"{'implementation':<28} {'seconds':>10}")
+    print(f"{'naive per-row':<28} {naive_seconds:>10.3f}")
+    print(f"{'vectorized (build arrays)':<28} {load_seconds:>10.3f}")
+    print(f"{'vectorized (analyze)':<28} {vectorized_seconds:>10.3f}")
+    print(f"analyze speedup: {naive_seconds / vectorized_seconds:.1f}x, "
+          f"including array build: {naive_seconds / (load_seconds + vectorized_seconds):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
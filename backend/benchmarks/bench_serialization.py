@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark response encoding for /auth/me and /auth/login payloads.
+
+Compares FastAPI's response_model pass (validate, dump to a dict, encode with
+the stdlib json in JSONResponse), the same pass encoded by ORJSONResponse, and
+``serialize`` with a precompiled TypeAdapter. Runs on in-memory objects and
+needs no database.
+
+    python benchmarks/bench_serialization.py --iterations 20000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+# Add the app directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from pydantic import TypeAdapter
+
+from app.main import app
+from app.models import User
+from app.schemas import Token, UserResponse
+from app.core.serialization import serialize
+from app.core.token_cache import UserSnapshot
+
+
+def route_field(path, method):
+    for route in app.routes:
+        if getattr(route, "path", None) == path and method in route.methods:
+            return route.response_field
+    raise LookupError(path)
+
+
+async def ops_per_second(encode, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await encode()
+    return iterations / (time.perf_counter() - started)
+
+
+def payloads():
+    user = User(
+        id=42,
+        email="bench@example.com",
+        name="Bench User",
+        hashed_password="$2b$12$" + "x" * 53,
+        avatar_url="https://api.dicebear.com/7.x/avataaars/svg?seed=bench@example.com",
+        is_active=True,
+        created_at=datetime(2026, 1, 2, 3, 4, 5, 678901),
+        last_login=datetime(2026, 10, 18, 9, 30, 0, 123456),
+    )
+    login = {
+        "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + "a" * 160 + "." + "b" * 43,
+        "refresh_token": "c" * 43,
+        "token_type": "bearer",
+        "user": user,
+    }
+    return [
+        ("/auth/me", "/api/v1/auth/me", "GET", UserResponse, UserSnapshot.from_user(user)),
+        ("/auth/login", "/api/v1/auth/login", "POST", Token, login),
+    ]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark response encoding")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'route':<14} {'response_model':>16} {'+ orjson':>12} {'TypeAdapter':>13}   (responses/s)")
+    for name, path, method, schema, content in payloads():
+        field = route_field(path, method)
+        adapter = TypeAdapter(schema)
+
+        async def response_model(response_class):
+            body = await serialize_response(field=field, response_content=content)
+            return response_class(body).body
+
+        async def fast_path():
+            return serialize(adapter, content).body
+
+        rates = [
+            await ops_per_second(lambda: response_model(JSONResponse), args.iterations),
+            await ops_per_second(lambda: response_model(ORJSONResponse), args.iterations),
+            await ops_per_second(fast_path, args.iterations),
+        ]
+        print(f"{name:<14} {rates[0]:>16,.0f} {rates[1]:>12,.0f} {rates[2]:>13,.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
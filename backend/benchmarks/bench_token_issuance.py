@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark login token issuance: two commits (old flow) vs one transaction.
+
+Runs against a temporary SQLite file by default, or any DATABASE_URL passed
+with --database-url, and reports statements, commits and latency per login.
+
+    python benchmarks/bench_token_issuance.py --logins 500
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the app directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base, to_async_url
+from app.models import User, RefreshToken
+from app.core.auth import create_access_token
+from app.core.refresh_tokens import create_refresh_token, refresh_token_digest
+from app.core.token_issuance import issue_login_tokens
+
+
+async def legacy_login(db, user):
+    """The previous login flow: commit last_login, then commit the refresh token"""
+    user.last_login = datetime.utcnow()
+    await db.commit()
+    access_token = create_access_token(data={"sub": user.email}, expires_delta=timedelta(minutes=30))
+    refresh_token = create_refresh_token()
+    db.add(RefreshToken(
+        user_id=user.id,
+        token_hash=refresh_token_digest(refresh_token),
+        expires_at=datetime.utcnow() + timedelta(days=7),
+    ))
+    await db.commit()
+    return access_token, refresh_token
+
+
+async def run(flow, session_factory, counters, user_ids, logins):
+    latencies = []
+    counters.update(statements=0, commits=0)
+    for i in range(logins):
+        async with session_factory() as db:
+            user = (await db.execute(select(User).where(User.id == user_ids[i]))).scalar_one()
+            started = time.perf_counter()
+            await flow(db, user)
+            latencies.append(time.perf_counter() - started)
+        # The user lookup is shared by both flows and excluded from the counts
+        counters["statements"] -= 1
+    return {
+        "statements_per_login": counters["statements"] / logins,
+        "commits_per_login": counters["commits"] / logins,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+async def main(database_url, logins):
+    engine = create_async_engine(to_async_url(database_url))
+    counters = {"statements": 0, "commits": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*args):
+        counters["statements"] += 1
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def count_commit(*args):
+        counters["commits"] += 1
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as db:
+        seeded = [
+            User(email=f"bench{i}-{time.time_ns()}@example.com", name="Bench", hashed_password="x")
+            for i in range(logins)
+        ]
+        db.add_all(seeded)
+        await db.commit()
+        user_ids = [user.id for user in seeded]
+
+    results = {}
+    for name, flow in (("two_commits", legacy_login), ("single_transaction", issue_login_tokens)):
+        results[name] = await run(flow, session_factory, counters, user_ids, logins)
+
+    await engine.dispose()
+
+    print(f"{'flow':<20}{'stmts/login':>12}{'commits/login':>15}{'mean ms':>10}{'p95 ms':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<20}{result['statements_per_login']:>12.2f}{result['commits_per_login']:>15.2f}"
+            f"{result['mean_ms']:>10.3f}{result['p95_ms']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    parser.add_argument("--logins", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.logins))
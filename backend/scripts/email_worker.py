@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Send queued email (email_jobs) until interrupted
+Run alongside API processes started with EMAIL_WORKER_ENABLED=false
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import AsyncSessionLocal, dispose_engines
+from app.core.email_queue import EMAIL_BATCH_SIZE, EMAIL_POLL_INTERVAL_SECONDS, run_email_worker
+from app.core.structured_logging import configure_logging, stop_logging
+
+async def run(batch_size: int, interval_seconds: float):
+    try:
+        await run_email_worker(AsyncSessionLocal, interval_seconds=interval_seconds, batch_size=batch_size)
+    finally:
+        await dispose_engines()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=EMAIL_BATCH_SIZE, help="jobs claimed per batch")
+    parser.add_argument("--interval", type=float, default=EMAIL_POLL_INTERVAL_SECONDS, help="seconds between polls when idle")
+    args = parser.parse_args()
+
+    listener = configure_logging()
+    try:
+        asyncio.run(run(args.batch_size, args.interval))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_logging(listener)
+
+if __name__ == "__main__":
+    main()
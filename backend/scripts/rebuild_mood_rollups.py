@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Rebuild the daily/weekly mood rollups from raw mood entries
+Use after backfills, imports or any change made outside the API
+"""
+
+import argparse
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import SessionLocal
+from app.core.mood_rollups import rebuild_rollups
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-id", type=int, help="only rebuild this user's rollups")
+    parser.add_argument("--batch-size", type=int, default=5000, help="entries fetched per round trip")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        entries = rebuild_rollups(db, user_id=args.user_id, batch_size=args.batch_size)
+        scope = f"user {args.user_id}" if args.user_id is not None else "all users"
+        print(f"✅ Rebuilt mood rollups for {scope} from {entries} entries")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Rebuilding mood rollups failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
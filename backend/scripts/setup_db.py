@@ -6,24 +6,26 @@ This script helps set up the PostgreSQL database
 
 import os
 import sys
-from dotenv import load_dotenv
 
 # Add the app directory to the Python path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(BACKEND_DIR)
 
-from app.database import engine, Base
-from app.models import User, PasswordResetToken, RefreshToken
+from alembic import command
+from alembic.config import Config
+
+from app.models import User
 
 def setup_database():
-    """Create all database tables"""
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    """Create or upgrade the database tables with the Alembic migrations"""
+    print("Applying database migrations...")
+    command.upgrade(Config(os.path.join(BACKEND_DIR, "alembic.ini")), "head")
     print("✅ Database tables created successfully!")
 
 def create_admin_user():
     """Create an admin user for testing"""
-    from sqlalchemy.orm import Session
     from app.core.auth import get_password_hash
+    from app.core.avatars import avatar_url
     from app.database import SessionLocal
     
     db = SessionLocal()
@@ -39,7 +41,7 @@ def create_admin_user():
             email="admin@moodmate.com",
             name="Admin User",
             hashed_password=get_password_hash("admin123"),
-            avatar_url="https://api.dicebear.com/7.x/avataaars/svg?seed=admin@moodmate.com",
+            avatar_url=avatar_url("admin@moodmate.com"),
             is_active=True
         )
         
@@ -56,8 +58,6 @@ def create_admin_user():
         db.close()
 
 if __name__ == "__main__":
-    load_dotenv()
-    
     print("🚀 Setting up MoodMate Database...")
     print("=" * 50)
     
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import (
+    get_db,
+    get_async_db,
+    get_async_read_db,
+    get_async_session_factory,
+    get_async_read_session_factory,
+    Base,
+)
+from app.core.auth import get_password_hash, create_access_token
+from app.core.metrics import instrument_engine
+from app.core.token_cache import token_cache
+from app.core.revocation import revocation_list
+from app.models.email_job import EmailJob
+from app.models.mood import MoodEntry, MoodRollup, MoodRollupEmoji
+from app.models.user import User, RefreshToken, PasswordResetToken, RevokedAccessToken
+
+# Create a temporary SQLite file shared by the sync fixtures and the async app
+SQLALCHEMY_DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{SQLALCHEMY_DATABASE_PATH}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{SQLALCHEMY_DATABASE_PATH}"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# TestClient may run each request on a fresh event loop, so don't pool connections
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+# Create tables
+Base.metadata.create_all(bind=engine)
+
+# Same statement hooks as the app's own engines
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_async_session_factory] = lambda: TestingAsyncSessionLocal
+app.dependency_overrides[get_async_read_db] = override_get_async_db
+app.dependency_overrides[get_async_read_session_factory] = lambda: TestingAsyncSessionLocal
+
+@pytest.fixture
+def test_db():
+    """Create a test database session"""
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def async_session_factory():
+    """Async session factory bound to the test database"""
+    return TestingAsyncSessionLocal
+
+@pytest.fixture
+def test_user(test_db):
+    """Create a test user"""
+    # Clear any existing data first
+    test_db.query(MoodRollupEmoji).delete()
+    test_db.query(MoodRollup).delete()
+    test_db.query(MoodEntry).delete()
+    test_db.query(RefreshToken).delete()
+    test_db.query(RevokedAccessToken).delete()
+    test_db.query(PasswordResetToken).delete()
+    test_db.query(EmailJob).delete()
+    test_db.query(User).delete()
+    test_db.commit()
+    asyncio.run(token_cache.clear())
+    revocation_list.clear()
+    
+    user = User(
+        email="test@example.com",
+        name="Test User",
+        hashed_password=get_password_hash("testpassword123"),
+        is_active=True
+    )
+    test_db.add(user)
+    test_db.commit()
+    test_db.refresh(user)
+    return user
+
+@pytest.fixture
+def auth_headers(test_user):
+    """Authorization headers for the test user"""
+    token = create_access_token(data={"sub": test_user.email})
+    return {"Authorization": f"Bearer {token}"}
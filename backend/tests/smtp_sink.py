@@ -0,0 +1,73 @@
+"""Minimal in-process SMTP server that records what it receives"""
+import email
+import socketserver
+import threading
+from email import policy
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Accepts every message; refuses recipients containing ``reject`` with 550"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply("220 sink ready")
+        recipients = []
+        for raw in self.rfile:
+            command = raw.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 sink")
+            elif verb in ("MAIL", "RSET", "NOOP"):
+                if verb == "RSET":
+                    recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                if "reject" in command:
+                    self.reply("550 No such user")
+                else:
+                    recipients.append(command)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for data in self.rfile:
+                    if data in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                with self.server.lock:
+                    self.server.messages.append(email.message_from_bytes(b"".join(lines), policy=policy.default))
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
@@ -1,68 +1,17 @@
-import pytest
+from datetime import datetime, timedelta
+
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy import delete
 
 from app.main import app
-from app.database import get_db, Base
-from app.core.auth import get_password_hash
-from app.models.user import User
-
-# Create in-memory database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Create tables
-Base.metadata.create_all(bind=engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
+from app.core.token_cache import token_cache
+from app.core.hashing import _hash_job, bcrypt_rounds
+from app.models.user import RefreshToken, User
+from app.core.refresh_tokens import refresh_token_digest
+from app.schemas import Token
 
 client = TestClient(app)
 
-@pytest.fixture
-def test_db():
-    """Create a test database session"""
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@pytest.fixture
-def test_user(test_db):
-    """Create a test user"""
-    # Clear any existing data first
-    from app.models.user import RefreshToken, PasswordResetToken
-    test_db.query(RefreshToken).delete()
-    test_db.query(PasswordResetToken).delete()
-    test_db.query(User).delete()
-    test_db.commit()
-    
-    user = User(
-        email="test@example.com",
-        name="Test User",
-        hashed_password=get_password_hash("testpassword123"),
-        is_active=True
-    )
-    test_db.add(user)
-    test_db.commit()
-    test_db.refresh(user)
-    return user
-
 def test_register_success():
     """Test successful user registration"""
     response = client.post(
@@ -112,6 +61,30 @@ def test_login_success(test_user):
     assert "refresh_token" in data
     assert "user" in data
 
+def test_login_response_matches_token_schema(test_user, test_db):
+    """Test that the serialization fast path returns exactly the Token schema"""
+    response = client.post(
+        "/api/v1/auth/login",
+        json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    data = response.json()
+    test_db.refresh(test_user)
+    expected = Token.model_validate(
+        {**data, "user": test_user}, from_attributes=True
+    ).model_dump(mode="json")
+    assert data == expected
+    assert "hashed_password" not in data["user"]
+    
+    schema = client.get("/openapi.json").json()
+    login_schema = schema["paths"]["/api/v1/auth/login"]["post"]["responses"]["200"]
+    assert login_schema["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/Token"}
+
 def test_login_invalid_credentials():
     """Test login with invalid credentials"""
     response = client.post(
@@ -125,6 +98,24 @@ def test_login_invalid_credentials():
     assert response.status_code == 401
     assert "Incorrect email or password" in response.json()["detail"]
 
+def test_login_upgrades_cheaper_password_hash(test_user, test_db):
+    """Test that a hash below the current cost is replaced on successful login"""
+    test_user.hashed_password, _ = _hash_job("testpassword123", 4)
+    test_db.commit()
+    
+    response = client.post(
+        "/api/v1/auth/login",
+        json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    
+    assert response.status_code == 200
+    test_db.expire_all()
+    stored = test_db.query(User).filter(User.email == "test@example.com").one().hashed_password
+    assert stored.startswith(f"$2b${bcrypt_rounds:02d}$")
+
 def test_get_current_user(test_user):
     """Test getting current user info"""
     # First login to get token
@@ -149,12 +140,144 @@ def test_get_current_user(test_user):
     assert data["email"] == "test@example.com"
     assert data["name"] == "Test User"
 
+def test_current_user_is_served_from_cache(test_user):
+    """Test that repeated requests with the same token hit the cache"""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    
+    client.get("/api/v1/auth/me", headers=headers)
+    before = token_cache.stats()
+    response = client.get("/api/v1/auth/me", headers=headers)
+    after = token_cache.stats()
+    
+    assert response.status_code == 200
+    assert after["tokens"]["hits"] == before["tokens"]["hits"] + 1
+    assert after["shared"]["hits"] == before["shared"]["hits"] + 1
+
+def test_update_current_user_evicts_cache(test_user):
+    """Test that profile updates are visible on the next request"""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    
+    client.get("/api/v1/auth/me", headers=headers)
+    update_response = client.put(
+        "/api/v1/auth/me",
+        json={"name": "Renamed User"},
+        headers=headers
+    )
+    response = client.get("/api/v1/auth/me", headers=headers)
+    
+    assert update_response.status_code == 200
+    assert response.json()["name"] == "Renamed User"
+
+def test_user_deleted_behind_cached_snapshot_is_unauthorized(test_user, test_db):
+    """Test that profile and password changes reject a user deleted after caching"""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    client.get("/api/v1/auth/me", headers=headers)
+    
+    # A bulk delete skips the ORM eviction, leaving the cached snapshot behind
+    test_db.execute(delete(RefreshToken))
+    test_db.execute(delete(User))
+    test_db.commit()
+    
+    update_response = client.put("/api/v1/auth/me", json={"name": "Ghost"}, headers=headers)
+    password_response = client.post(
+        "/api/v1/auth/change-password",
+        json={"current_password": "testpassword123", "new_password": "newpassword123"},
+        headers=headers
+    )
+    
+    assert update_response.status_code == 401
+    assert password_response.status_code == 401
+
 def test_get_current_user_unauthorized():
     """Test getting current user without token"""
     response = client.get("/api/v1/auth/me")
     
     assert response.status_code == 403
 
+def test_refresh_and_logout(test_user):
+    """Test refreshing an access token and revoking the refresh token"""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    refresh_token = login_response.json()["refresh_token"]
+    
+    refresh_response = client.post(
+        "/api/v1/auth/refresh",
+        json={"refresh_token": refresh_token}
+    )
+    assert refresh_response.status_code == 200
+    assert "access_token" in refresh_response.json()
+    
+    logout_response = client.post(
+        "/api/v1/auth/logout",
+        json={"refresh_token": refresh_token}
+    )
+    assert logout_response.status_code == 200
+    
+    response = client.post(
+        "/api/v1/auth/refresh",
+        json={"refresh_token": refresh_token}
+    )
+    assert response.status_code == 401
+
+def test_refresh_token_is_opaque_and_stored_hashed(test_user, test_db):
+    """Test that only the SHA-256 digest of the refresh token is stored"""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }
+    )
+    refresh_token = login_response.json()["refresh_token"]
+    
+    stored = test_db.query(RefreshToken).one()
+    assert "." not in refresh_token
+    assert stored.token is None
+    assert stored.token_hash == refresh_token_digest(refresh_token)
+
+def test_legacy_refresh_token_still_accepted(test_user, test_db):
+    """Test that refresh tokens stored before the switch to digests keep working"""
+    legacy_token = "header.payload.signature"
+    test_db.add(RefreshToken(
+        user_id=test_user.id,
+        token=legacy_token,
+        expires_at=datetime.utcnow() + timedelta(days=1)
+    ))
+    test_db.commit()
+    
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": legacy_token})
+    assert response.status_code == 200
+    
+    client.post("/api/v1/auth/logout", json={"refresh_token": legacy_token})
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": legacy_token})
+    assert response.status_code == 401
+
 def test_forgot_password():
     """Test forgot password request"""
     response = client.post(
@@ -166,6 +289,13 @@ def test_forgot_password():
     data = response.json()
     assert "If the email exists, a password reset link has been sent" in data["message"]
 
+def test_jwks_empty_for_hmac():
+    """Test that no public keys are published when tokens use a shared secret"""
+    response = client.get("/api/v1/auth/jwks")
+    
+    assert response.status_code == 200
+    assert response.json() == {"keys": []}
+
 def test_health_check():
     """Test health check endpoint"""
     response = client.get("/health")
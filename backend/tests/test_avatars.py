@@ -0,0 +1,118 @@
+import asyncio
+import os
+from urllib.parse import urlsplit
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.avatars import AvatarCache, avatar_cache, avatar_key
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def avatar_dir(tmp_path, monkeypatch):
+    """Point the app's avatar cache at an empty directory"""
+    monkeypatch.setattr(avatar_cache, "directory", str(tmp_path))
+    avatar_cache.clear()
+    yield tmp_path
+    avatar_cache.clear()
+
+
+def test_register_uses_local_avatar(test_user):
+    """Test that new users get an avatar served by the API, keyed by their email hash"""
+    response = client.post(
+        "/api/v1/auth/register",
+        json={"email": "Avatar@Example.com", "name": "Avatar", "password": "avatarpassword123"},
+    )
+
+    avatar_url = response.json()["user"]["avatar_url"]
+    assert avatar_url.endswith(f"/api/v1/avatars/{avatar_key('avatar@example.com')}.svg")
+    assert "dicebear" not in avatar_url
+
+
+def test_avatar_is_deterministic_and_immutable(avatar_dir):
+    """Test that an avatar is the same SVG each time, with a strong ETag and immutable caching"""
+    key = avatar_key("someone@example.com")
+    first = client.get(f"/api/v1/avatars/{key}.svg")
+    avatar_cache.clear()
+    second = client.get(f"/api/v1/avatars/{key}.svg")
+
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "image/svg+xml"
+    assert first.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert not first.headers["etag"].startswith("W/")
+    assert first.content == second.content
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.content.startswith(b"<svg")
+    assert client.get(f"/api/v1/avatars/{avatar_key('other@example.com')}.svg").content != first.content
+
+
+def test_matching_etag_returns_not_modified(avatar_dir):
+    """Test that a revalidation with the current ETag gets an empty 304"""
+    url = f"/api/v1/avatars/{avatar_key('etag@example.com')}.svg"
+    etag = client.get(url).headers["etag"]
+
+    response = client.get(url, headers={"If-None-Match": f'"stale", {etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_invalid_key_is_rejected():
+    """Test that only 64-character hex keys are served"""
+    assert client.get("/api/v1/avatars/not-a-key.svg").status_code == 422
+    assert client.get(f"/api/v1/avatars/{'A' * 64}.svg").status_code == 422
+
+
+def test_only_known_avatars_are_written_to_disk(test_user, avatar_dir):
+    """Test that random keys are rendered without persisting, users' avatars are persisted"""
+    random_key = avatar_key("nobody@example.com")
+    assert client.get(f"/api/v1/avatars/{random_key}.svg").status_code == 200
+    assert not list(avatar_dir.rglob("*.svg"))
+
+    response = client.post(
+        "/api/v1/auth/register",
+        json={"email": "known@example.com", "name": "Known", "password": "knownpassword123"},
+    )
+    key = avatar_key("known@example.com")
+    assert client.get(urlsplit(response.json()["user"]["avatar_url"]).path).status_code == 200
+    assert [path.name for path in avatar_dir.rglob("*.svg")] == [f"{key}.svg"]
+
+
+def _always_known(key):
+    async def known():
+        return True
+    return known()
+
+
+def test_cache_serves_from_memory_then_disk(tmp_path):
+    """Test that a render is stored on disk and reused by a cache with an empty memory"""
+    key = avatar_key("disk@example.com")
+    cache = AvatarCache(max_entries=1, directory=str(tmp_path))
+    content, etag = asyncio.run(cache.get(key, _always_known))
+
+    assert (tmp_path / "v1" / key[:2] / f"{key}.svg").read_bytes() == content
+    assert asyncio.run(cache.get(key)) == (content, etag)
+    assert cache.stats()["memory"]["hits"] == 1
+
+    fresh = AvatarCache(max_entries=1, directory=str(tmp_path))
+    (tmp_path / "v1" / key[:2] / f"{key}.svg").write_bytes(b"<svg>from disk</svg>")
+    assert asyncio.run(fresh.get(key))[0] == b"<svg>from disk</svg>"
+
+
+def test_disk_cache_prunes_least_recently_used_files(tmp_path):
+    """Test that the directory stays under its file cap, dropping the oldest files"""
+    cache = AvatarCache(max_entries=1, directory=str(tmp_path), max_files=10)
+    keys = [avatar_key(f"user{i}@example.com") for i in range(11)]
+    for i, key in enumerate(keys):
+        asyncio.run(cache.get(key, _always_known))
+        path = tmp_path / "v1" / key[:2] / f"{key}.svg"
+        os.utime(path, (i, i))
+
+    files = {path.stem for path in tmp_path.rglob("*.svg")}
+    assert len(files) <= 10
+    assert keys[0] not in files
+    assert keys[-1] in files
+    assert cache.stats()["files_pruned"] >= 1
@@ -0,0 +1,106 @@
+import asyncio
+import socket
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.cache import CacheUnavailableError, MemoryCacheBackend, RedisCacheBackend
+from app.core.token_cache import TokenCache, UserSnapshot
+
+def test_memory_backend_get_set_delete():
+    """Test basic operations and multi-key reads and writes"""
+    async def scenario():
+        backend = MemoryCacheBackend(max_entries=10)
+        await backend.set_many({"a": b"1", "b": b"2"}, ttl_seconds=60)
+        assert await backend.get("a") == b"1"
+        assert await backend.get_many(["a", "b", "c"]) == [b"1", b"2", None]
+        await backend.delete("a", "b")
+        assert await backend.get_many(["a", "b"]) == [None, None]
+
+    asyncio.run(scenario())
+
+def test_memory_backend_ttl_and_lru_bound():
+    """Test that expired keys vanish and the least recently used key is evicted"""
+    async def scenario():
+        backend = MemoryCacheBackend(max_entries=2)
+        await backend.set("gone", b"x", ttl_seconds=-1)
+        assert await backend.get("gone") is None
+
+        await backend.set("a", b"1", ttl_seconds=60)
+        await backend.set("b", b"2", ttl_seconds=60)
+        await backend.get("a")
+        await backend.set("c", b"3", ttl_seconds=60)
+        assert await backend.get_many(["a", "b", "c"]) == [b"1", None, b"3"]
+        assert backend.stats()["evictions"] == 1
+
+    asyncio.run(scenario())
+
+def test_memory_backend_incr_keeps_first_expiry():
+    """Test counters start at zero and keep the expiry set by the first increment"""
+    async def scenario():
+        backend = MemoryCacheBackend()
+        assert await backend.incr("hits", ttl_seconds=60) == 1
+        assert await backend.incr("hits", amount=4, ttl_seconds=1) == 5
+        _, expires_at = backend._cache._data["hits"]
+        assert expires_at > datetime.now().timestamp() + 30
+
+    asyncio.run(scenario())
+
+def test_user_snapshot_round_trip():
+    """Test that snapshots survive serialization and are reachable by id and email"""
+    snapshot = UserSnapshot(
+        id=7, email="a@example.com", name="A", avatar_url=None, is_active=True,
+        created_at=datetime(2026, 1, 1, tzinfo=timezone.utc), last_login=None,
+    )
+
+    async def scenario():
+        cache = TokenCache(MemoryCacheBackend(), max_entries=10, user_ttl_seconds=60)
+        await cache.put_user(snapshot)
+        assert await cache.get_user("a@example.com") == snapshot
+        assert await cache.get_user_by_id(7) == snapshot
+        await cache.invalidate_user(7, "a@example.com")
+        assert await cache.get_user_by_id(7) is None
+
+    asyncio.run(scenario())
+
+def test_unreachable_redis_degrades_to_misses():
+    """Test that Redis errors become misses and dropped writes, and incr reports them"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    async def scenario():
+        backend = RedisCacheBackend(url=f"redis://127.0.0.1:{port}/0", timeout_seconds=0.2)
+        assert await backend.get("a") is None
+        assert await backend.get_many(["a", "b"]) == [None, None]
+        await backend.set("a", b"1", ttl_seconds=60)
+        await backend.set_many({"a": b"1"}, ttl_seconds=60)
+        await backend.delete("a")
+        with pytest.raises(CacheUnavailableError):
+            await backend.incr("hits")
+        assert backend.stats()["errors"] == 6
+        await backend.close()
+
+    asyncio.run(scenario())
+
+def test_redis_write_waits_for_scheduled_delete():
+    """Test that a delete scheduled from an ORM event cannot wipe a later write"""
+    operations = []
+
+    class SlowDeleteClient:
+        async def delete(self, *keys):
+            await asyncio.sleep(0.05)
+            operations.append("delete")
+
+        async def set(self, key, value, px):
+            operations.append("set")
+
+    async def scenario():
+        backend = RedisCacheBackend(url="redis://127.0.0.1:1/0")
+        backend._client = SlowDeleteClient()
+        backend.delete_soon("user:a@example.com")
+        await backend.set("user:a@example.com", b"1", ttl_seconds=60)
+        assert backend._pending == {}
+
+    asyncio.run(scenario())
+    assert operations == ["delete", "set"]
@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.database import engine_options, to_async_url
+
+
+def test_to_async_url():
+    """Test that sync URLs are mapped onto async drivers"""
+    assert to_async_url("postgresql://u:p@localhost/db") == "postgresql+asyncpg://u:p@localhost/db"
+    assert to_async_url("postgresql+psycopg2://u:p@localhost/db") == "postgresql+asyncpg://u:p@localhost/db"
+    assert to_async_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+
+
+def test_pool_records_checkouts_and_timeouts():
+    """Test checkout wait, usage and timeout instrumentation"""
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pool.db')}"
+    options = engine_options(url, "test")
+    options.update(pool_size=1, max_overflow=0, pool_timeout=0.05)
+    test_engine = create_engine(url, **options)
+
+    with test_engine.connect() as connection:
+        connection.execute(text("select 1"))
+        with pytest.raises(exc.TimeoutError):
+            test_engine.connect()
+
+    stats = test_engine.pool.stats.snapshot(test_engine.pool)
+    assert stats["pool"] == "QueuePool"
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["max_checked_out"] == 1
+    assert stats["checked_out"] == 0
+    test_engine.dispose()
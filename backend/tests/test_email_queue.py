@@ -0,0 +1,99 @@
+import asyncio
+import socket
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.email_queue import enqueue_email, process_email_jobs
+from app.core.mailer import SMTPSender
+from app.models.email_job import EmailJob
+from tests.smtp_sink import SMTPSink
+
+client = TestClient(app)
+
+
+def _queue(session_factory, *recipients):
+    async def add():
+        async with session_factory() as db:
+            for recipient in recipients:
+                enqueue_email(db, "welcome", recipient, {"name": "Queued"})
+            await db.commit()
+
+    asyncio.run(add())
+
+
+def _unused_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_register_and_forgot_password_queue_email(test_user, test_db):
+    """Test that registration and password resets queue email instead of sending it inline"""
+    response = client.post(
+        "/api/v1/auth/register",
+        json={"email": "queued@example.com", "name": "Queued", "password": "queuedpassword123"},
+    )
+    assert response.status_code == 200
+    response = client.post("/api/v1/auth/forgot-password", json={"email": test_user.email})
+    assert response.status_code == 200
+
+    jobs = test_db.query(EmailJob).order_by(EmailJob.id).all()
+    assert [(job.template, job.recipient, job.status) for job in jobs] == [
+        ("welcome", "queued@example.com", "pending"),
+        ("password_reset", test_user.email, "pending"),
+    ]
+    assert jobs[1].context["token"]
+
+
+def test_worker_sends_batch_over_one_connection(test_user, test_db, async_session_factory):
+    """Test that a batch is sent over one pooled connection and sent jobs are deleted"""
+    _queue(async_session_factory, "a@example.com", "b@example.com", "c@example.com")
+
+    with SMTPSink() as sink:
+        sender = SMTPSender(host="127.0.0.1", port=sink.port, pool_size=1)
+        claimed = asyncio.run(process_email_jobs(async_session_factory, sender, batch_size=10))
+        sender.close()
+
+    assert claimed == 3
+    assert sink.connections == 1
+    assert sorted(message["To"] for message in sink.messages) == ["a@example.com", "b@example.com", "c@example.com"]
+    assert sink.messages[0]["Subject"] == "Welcome to MoodMate"
+    assert test_db.query(EmailJob).count() == 0
+
+
+def test_unreachable_server_retries_with_backoff_then_fails(test_user, test_db, async_session_factory):
+    """Test that connection errors reschedule the job until max attempts, then mark it failed"""
+    _queue(async_session_factory, "retry@example.com")
+    sender = SMTPSender(host="127.0.0.1", port=_unused_port(), timeout_seconds=1)
+
+    asyncio.run(process_email_jobs(async_session_factory, sender, max_attempts=2))
+    job = test_db.query(EmailJob).one()
+    assert (job.status, job.attempts) == ("pending", 1)
+    assert job.run_at > datetime.utcnow()
+    assert "Connection" in job.last_error
+
+    # Nothing is due until the backoff has passed
+    assert asyncio.run(process_email_jobs(async_session_factory, sender, max_attempts=2)) == 0
+    job.run_at = datetime.utcnow()
+    test_db.commit()
+    asyncio.run(process_email_jobs(async_session_factory, sender, max_attempts=2))
+    test_db.expire_all()
+    job = test_db.query(EmailJob).one()
+    assert (job.status, job.attempts) == ("failed", 2)
+
+
+def test_refused_recipient_fails_without_retry(test_user, test_db, async_session_factory):
+    """Test that a 5xx recipient refusal fails only that job, immediately"""
+    _queue(async_session_factory, "reject@example.com", "ok@example.com")
+
+    with SMTPSink() as sink:
+        sender = SMTPSender(host="127.0.0.1", port=sink.port)
+        asyncio.run(process_email_jobs(async_session_factory, sender))
+        sender.close()
+
+    assert [message["To"] for message in sink.messages] == ["ok@example.com"]
+    job = test_db.query(EmailJob).one()
+    assert (job.recipient, job.status, job.attempts) == ("reject@example.com", "failed", 1)
+    assert "550" in job.last_error
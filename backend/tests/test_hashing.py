@@ -0,0 +1,111 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.hashing import HashingPool, _hash_job, _verify_and_update_job, _verify_job, calibrate_bcrypt_rounds
+
+
+def _blocking_job(event: threading.Event):
+    event.wait(5)
+    return None, 0.0
+
+
+def test_hash_and_verify_on_pool():
+    """Test hashing and verification round trip through the pool"""
+    pool = HashingPool("thread", workers=2, max_queue=4)
+
+    async def run():
+        hashed = await pool.run(_hash_job, "secret123")
+        return hashed, await pool.run(_verify_job, "secret123", hashed)
+
+    try:
+        hashed, valid = asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert hashed.startswith("$2")
+    assert valid is True
+    stats = pool.stats()
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == 0
+    assert stats["hash_seconds_max"] > 0
+
+
+def test_full_pool_rejects_with_503():
+    """Test that jobs beyond workers + max_queue are rejected"""
+    pool = HashingPool("thread", workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        running = [asyncio.ensure_future(pool.run(_blocking_job, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(HTTPException) as exc_info:
+                await pool.run(_blocking_job, release)
+        finally:
+            release.set()
+            await asyncio.gather(*running)
+        return exc_info.value
+
+    try:
+        error = asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+    assert pool.stats()["rejected"] == 1
+
+
+def test_cancelled_caller_keeps_job_counted_until_it_finishes():
+    """Test that a disconnected caller does not free its slot while bcrypt still runs"""
+    pool = HashingPool("thread", workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def run():
+        task = asyncio.ensure_future(pool.run(_blocking_job, release))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        in_flight_after_cancel = pool.in_flight
+        with pytest.raises(HTTPException):
+            await pool.run(_blocking_job, release)
+
+        release.set()
+        for _ in range(100):
+            if pool.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        return in_flight_after_cancel
+
+    try:
+        in_flight_after_cancel = asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert in_flight_after_cancel == 1
+    assert pool.in_flight == 0
+
+
+def test_calibration_respects_bounds():
+    """Test that calibration stays within the configured cost range"""
+    assert calibrate_bcrypt_rounds(target_seconds=1e-9, min_rounds=4, max_rounds=6, samples=1) == 4
+    assert calibrate_bcrypt_rounds(target_seconds=60, min_rounds=4, max_rounds=6, samples=1) == 6
+
+
+def test_verify_and_update_rehashes_cheaper_hash():
+    """Test that only valid passwords with a below-cost hash are rehashed"""
+    hashed, _ = _hash_job("secret123", 4)
+
+    (valid, new_hash), _ = _verify_and_update_job("secret123", hashed, 5)
+    assert valid is True
+    assert new_hash.startswith("$2b$05$")
+
+    (valid, new_hash), _ = _verify_and_update_job("secret123", hashed, 4)
+    assert (valid, new_hash) == (True, None)
+
+    (valid, new_hash), _ = _verify_and_update_job("wrong", hashed, 5)
+    assert (valid, new_hash) == (False, None)
@@ -0,0 +1,107 @@
+import logging
+import re
+import threading
+
+from fastapi.testclient import TestClient
+from starlette.routing import Route
+
+from app.main import app
+from app.core import metrics
+from app.core.metrics import Counter, Histogram
+
+client = TestClient(app)
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test histogram exposition format"""
+    histogram = Histogram("test_latency_seconds", "Test latency", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(("/a",), 0.05)
+    histogram.observe(("/a",), 0.5)
+    histogram.observe(("/a",), 5.0)
+
+    lines = histogram.render()
+
+    assert "# TYPE test_latency_seconds histogram" in lines
+    assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{route="/a"} 3' in lines
+
+
+def test_counter_sums_thread_shards():
+    """Test that increments from several threads are aggregated"""
+    counter = Counter("test_events_total", "Test events", ("kind",))
+    threads = [
+        threading.Thread(target=lambda: [counter.inc(("a",)) for _ in range(1000)])
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.collect() == {("a",): 4000}
+
+
+def test_metrics_endpoint_labels_requests_by_route():
+    """Test that requests are recorded by route template and status"""
+    client.get("/health")
+    client.get("/does-not-exist")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in response.text
+    assert 'route="<unmatched>",status="404"' in response.text
+    assert "http_request_duration_seconds_bucket" in response.text
+
+
+def test_route_table_is_scanned_once_per_request(monkeypatch):
+    """Test that the logging and metrics middleware share one route lookup"""
+    scans = []
+    original = Route.matches
+
+    def counting_matches(self, scope):
+        if scope["type"] == "http" and self.path == "/health":
+            scans.append(scope["path"])
+        return original(self, scope)
+
+    monkeypatch.setattr(Route, "matches", counting_matches)
+    client.get("/health")
+
+    # One scan by the middleware, one by the router dispatching the request
+    assert scans == ["/health", "/health"]
+
+
+def test_server_timing_counts_request_queries(test_user):
+    """Test that the Server-Timing header reports the request's statements"""
+    response = client.post("/api/v1/auth/login", json={
+        "email": "test@example.com",
+        "password": "testpassword123"
+    })
+
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    match = re.fullmatch(r'db;dur=[\d.]+;desc="(\d+) queries", app;dur=[\d.]+', timing)
+    assert match is not None, timing
+    assert int(match.group(1)) >= 2
+
+    assert "server-timing" in client.get("/health").headers
+
+
+def test_slow_queries_are_logged_with_route(test_user, monkeypatch, caplog):
+    """Test that statements over the threshold are logged and counted by route"""
+    monkeypatch.setattr(metrics, "SLOW_QUERY_THRESHOLD_SECONDS", 0)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.metrics"):
+        response = client.post("/api/v1/auth/login", json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        })
+
+    assert response.status_code == 200
+    messages = [record.getMessage() for record in caplog.records if record.name == "app.core.metrics"]
+    assert any("on /api/v1/auth/login: SELECT" in message for message in messages)
+    assert metrics.SLOW_QUERIES.collect()[("/api/v1/auth/login", "select")] >= 1
+    assert 'http_request_db_queries_count{method="POST",route="/api/v1/auth/login"}' in client.get("/metrics").text
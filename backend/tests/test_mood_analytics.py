@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+import math
+
+import numpy as np
+
+from app.core.mood_analytics import MoodArrays, analyze_user, analyze_users
+
+def test_daily_and_rolling_means():
+    """Test daily means, gaps and the entry-weighted trailing window"""
+    rows = [
+        (1, datetime(2026, 3, 2, 9), 4, []),
+        (1, datetime(2026, 3, 2, 21), 8, []),
+        (1, datetime(2026, 3, 4, 12), 3, []),
+    ]
+    trends = analyze_user(MoodArrays.from_rows(rows), window=2)
+
+    assert [str(day) for day in trends.days] == ["2026-03-02", "2026-03-03", "2026-03-04"]
+    assert np.allclose(trends.daily_mean, [6, np.nan, 3], equal_nan=True)
+    assert np.allclose(trends.rolling_mean, [6, 6, 3])
+
+def test_volatility_is_std_of_daily_means():
+    """Test volatility over a trailing window of days"""
+    start = datetime(2026, 1, 5)
+    scores = [2, 4, 6, 6, 6]
+    rows = [(1, start + timedelta(days=i), score, []) for i, score in enumerate(scores)]
+    trends = analyze_user(MoodArrays.from_rows(rows), window=3)
+
+    assert math.isnan(trends.volatility[0])
+    assert np.isclose(trends.volatility[1], 1.0)
+    assert np.isclose(trends.volatility[2], np.std([2, 4, 6]))
+    assert trends.volatility[4] == 0.0
+
+def test_weekday_seasonality_uses_utc_days():
+    """Test day-of-week means, Monday first, with aware timestamps normalized to UTC"""
+    rows = [
+        (1, datetime(2026, 3, 2, 10), 9, []),  # Monday
+        (1, datetime(2026, 3, 9, 10), 7, []),  # Monday
+        # Sunday 23:30 in UTC-2 is Monday 01:30 UTC
+        (1, datetime(2026, 3, 15, 23, 30, tzinfo=timezone(timedelta(hours=-2))), 5, []),
+        (1, datetime(2026, 3, 7, 10), 1, []),  # Saturday
+    ]
+    trends = analyze_user(MoodArrays.from_rows(rows))
+
+    assert np.allclose(trends.weekday_mean, [7, np.nan, np.nan, np.nan, np.nan, 1, np.nan], equal_nan=True)
+
+def test_tag_correlation():
+    """Test Pearson correlation between tag presence and score"""
+    rows = [
+        (1, datetime(2026, 3, 1), 9, ["gym"]),
+        (1, datetime(2026, 3, 2), 8, ["gym", "work"]),
+        (1, datetime(2026, 3, 3), 3, ["work"]),
+        (1, datetime(2026, 3, 4), 2, []),
+    ]
+    trends = analyze_user(MoodArrays.from_rows(rows))
+
+    scores = np.array([9, 8, 3, 2])
+    assert np.isclose(trends.tag_correlation["gym"], np.corrcoef([1, 1, 0, 0], scores)[0, 1])
+    assert np.isclose(trends.tag_correlation["work"], np.corrcoef([0, 1, 1, 0], scores)[0, 1])
+
+def test_batch_matches_single_user_runs():
+    """Test that analyzing users together equals analyzing each alone"""
+    rows = [
+        (user_id, datetime(2026, 2, 1) + timedelta(days=(user_id * 3 + i) % 17, hours=i), (user_id + i) % 10 + 1, ["a"] if i % 2 else ["b"])
+        for user_id in (3, 1, 2)
+        for i in range(25)
+    ]
+    batch = analyze_users(MoodArrays.from_rows(rows), window=4)
+
+    assert sorted(batch) == [1, 2, 3]
+    for user_id, trends in batch.items():
+        alone = analyze_user(MoodArrays.from_rows([row for row in rows if row[0] == user_id]), window=4)
+        assert trends.first_day == alone.first_day
+        for name in ("daily_mean", "rolling_mean", "volatility", "weekday_mean"):
+            assert np.allclose(getattr(trends, name), getattr(alone, name), equal_nan=True)
+        assert trends.tag_correlation.keys() == alone.tag_correlation.keys()
+        assert np.allclose(list(trends.tag_correlation.values()), list(alone.tag_correlation.values()))
+
+def test_empty_input():
+    """Test that no entries produce no trends"""
+    assert analyze_users(MoodArrays.from_rows([])) == {}
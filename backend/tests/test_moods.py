@@ -0,0 +1,185 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.api.moods import MOOD_BULK_MAX_BYTES, read_bulk_body
+from app.models.mood import MoodEntry, MoodRollup
+from app.core.mood_rollups import rebuild_rollups
+
+client = TestClient(app)
+
+def test_bulk_create_json_array(auth_headers, test_db):
+    """Test bulk upload of a JSON array of mood entries"""
+    entries = [
+        {"score": (i % 10) + 1, "emoji": "😊", "tags": ["work"], "created_at": f"2026-01-{(i % 28) + 1:02d}T08:00:00Z"}
+        for i in range(500)
+    ]
+    response = client.post("/api/v1/moods/bulk", json=entries, headers=auth_headers)
+
+    assert response.status_code == 201
+    assert response.json() == {"inserted": 500}
+    assert test_db.query(MoodEntry).count() == 500
+
+def test_bulk_create_ndjson(auth_headers, test_db):
+    """Test bulk upload of newline-delimited JSON"""
+    body = "\n".join(json.dumps({"score": 7, "emoji": "🙂", "note": f"day {i}"}) for i in range(3)) + "\n"
+    response = client.post(
+        "/api/v1/moods/bulk",
+        content=body,
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 201
+    assert response.json() == {"inserted": 3}
+    notes = sorted(entry.note for entry in test_db.query(MoodEntry))
+    assert notes == ["day 0", "day 1", "day 2"]
+
+def test_bulk_create_ndjson_errors_point_at_lines(auth_headers, test_db):
+    """Test that each NDJSON line holds one entry and errors are reported by line number"""
+    body = "\n".join([
+        json.dumps({"score": 7, "emoji": "🙂"}),
+        "",
+        json.dumps({"score": 7, "emoji": "🙂"}) + "," + json.dumps({"score": 8, "emoji": "🙂"}),
+        json.dumps({"score": 42, "emoji": "🙂"}),
+    ])
+    response = client.post(
+        "/api/v1/moods/bulk",
+        content=body,
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 422
+    errors = response.json()["detail"]
+    assert [error["loc"] for error in errors] == [["line", 3], ["line", 4, "score"]]
+    assert errors[0]["type"] == "json_invalid"
+    assert test_db.query(MoodEntry).count() == 0
+
+def test_bulk_create_rejects_invalid_batch(auth_headers, test_db):
+    """Test that one invalid entry rejects the whole batch"""
+    entries = [{"score": 5, "emoji": "😐"}, {"score": 42, "emoji": "😐"}]
+    response = client.post("/api/v1/moods/bulk", json=entries, headers=auth_headers)
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == [1, "score"]
+    assert test_db.query(MoodEntry).count() == 0
+
+def test_bulk_create_rejects_oversized_upload_before_reading(auth_headers):
+    """Test that the size limit is enforced on Content-Length and while the body streams"""
+    response = client.post(
+        "/api/v1/moods/bulk",
+        content=b"[]",
+        headers={**auth_headers, "Content-Type": "application/json", "Content-Length": str(MOOD_BULK_MAX_BYTES + 1)},
+    )
+    assert response.status_code == 413
+
+    received = []
+
+    async def receive():
+        received.append(True)
+        return {"type": "http.request", "body": b"x" * 10, "more_body": len(received) < 100}
+
+    request = Request({"type": "http", "method": "POST", "headers": []}, receive)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(read_bulk_body(request, max_bytes=25))
+    assert exc_info.value.status_code == 413
+    assert len(received) == 3
+
+def test_bulk_create_requires_auth():
+    """Test that bulk upload requires authentication"""
+    response = client.post("/api/v1/moods/bulk", json=[])
+
+    assert response.status_code == 403
+
+def test_list_moods_keyset_pagination(auth_headers):
+    """Test that following next_cursor walks every entry exactly once, newest first"""
+    entries = [{"score": 5, "emoji": "😐", "created_at": f"2026-02-{(i // 2) + 1:02d}T12:00:00Z"} for i in range(7)]
+    client.post("/api/v1/moods/bulk", json=entries, headers=auth_headers)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/v1/moods", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        page = response.json()
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert len({item["id"] for item in seen}) == 7
+    keys = [(item["created_at"], item["id"]) for item in seen]
+    assert keys == sorted(keys, reverse=True)
+
+def test_list_moods_rejects_bad_cursor(auth_headers):
+    """Test that a malformed cursor is a client error"""
+    response = client.get("/api/v1/moods", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+
+    assert response.status_code == 400
+
+def test_export_moods_ndjson_and_csv(auth_headers):
+    """Test streaming export in both formats"""
+    entries = [{"score": i + 1, "emoji": "🙂", "tags": ["a", "b"], "note": f"n{i}"} for i in range(3)]
+    client.post("/api/v1/moods/bulk", json=entries, headers=auth_headers)
+
+    response = client.get("/api/v1/moods/export", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["score"] for row in rows] == [1, 2, 3]
+    assert rows[0]["tags"] == ["a", "b"]
+
+    response = client.get("/api/v1/moods/export", params={"format": "csv"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert 'filename="moods.csv"' in response.headers["content-disposition"]
+    lines = response.text.splitlines()
+    assert lines[0] == "id,created_at,score,emoji,tags,note"
+    assert len(lines) == 4
+    assert lines[1].endswith(",1,🙂,a;b,n0")
+
+def test_summary_rollups_update_incrementally(auth_headers):
+    """Test that each upload adds onto the daily and weekly rollups"""
+    first = [{"score": 4, "emoji": "😐", "created_at": "2026-03-02T09:00:00Z"}, {"score": 8, "emoji": "😊", "created_at": "2026-03-02T21:00:00Z"}]
+    second = [{"score": 2, "emoji": "😐", "created_at": "2026-03-02T23:30:00+01:00"}, {"score": 6, "emoji": "🙂", "created_at": "2026-03-08T10:00:00Z"}]
+    client.post("/api/v1/moods/bulk", json=first, headers=auth_headers)
+    client.post("/api/v1/moods/bulk", json=second, headers=auth_headers)
+
+    response = client.get("/api/v1/moods/summary", params={"period": "day"}, headers=auth_headers)
+    assert response.status_code == 200
+    days = response.json()["buckets"]
+    assert [day["period_start"] for day in days] == ["2026-03-02", "2026-03-08"]
+    assert days[0] == {
+        "period_start": "2026-03-02", "entry_count": 3, "score_mean": 14 / 3,
+        "score_min": 2, "score_max": 8, "emojis": {"😐": 2, "😊": 1},
+    }
+
+    response = client.get("/api/v1/moods/summary", params={"period": "week", "start": "2026-03-01"}, headers=auth_headers)
+    weeks = response.json()["buckets"]
+    assert len(weeks) == 1
+    assert weeks[0]["period_start"] == "2026-03-02"
+    assert weeks[0]["entry_count"] == 4
+    assert weeks[0]["emojis"] == {"😐": 2, "😊": 1, "🙂": 1}
+
+def test_rebuild_rollups_matches_incremental(auth_headers, test_db):
+    """Test that a full rebuild reproduces the incrementally maintained rollups"""
+    entries = [
+        {"score": (i % 10) + 1, "emoji": "😊" if i % 3 else "😢", "created_at": f"2026-04-{(i % 20) + 1:02d}T{i % 24:02d}:00:00Z"}
+        for i in range(200)
+    ]
+    client.post("/api/v1/moods/bulk", json=entries[:120], headers=auth_headers)
+    client.post("/api/v1/moods/bulk", json=entries[120:], headers=auth_headers)
+
+    def snapshot():
+        test_db.expire_all()
+        return sorted(
+            (r.period, r.period_start, r.entry_count, r.score_sum, r.score_min, r.score_max)
+            for r in test_db.query(MoodRollup)
+        )
+
+    incremental = snapshot()
+    assert rebuild_rollups(test_db) == 200
+    assert snapshot() == incremental
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import rate_limit
+from app.core.cache import CacheUnavailableError, MemoryCacheBackend
+from app.core.hashing import hashing_pool
+from app.core.rate_limit import Rate, SlidingWindowLimiter
+
+client = TestClient(app)
+
+def test_rate_parse():
+    """Test parsing a rate from configuration"""
+    assert Rate.parse("5/60") == Rate(limit=5, window_seconds=60)
+
+def test_sliding_window_limits_within_window():
+    """Test that requests over the limit are rejected with a retry delay"""
+    limiter = SlidingWindowLimiter(MemoryCacheBackend())
+    rate = Rate(3, 60)
+    
+    async def run():
+        results = [await limiter.hit("test", "subject", rate, now=600.0 + i) for i in range(4)]
+        other = await limiter.hit("test", "other", rate, now=604.0)
+        return results, other
+    
+    results, other = asyncio.run(run())
+    assert results[:3] == [None, None, None]
+    assert results[3] == 57
+    assert other is None
+
+def test_sliding_window_weights_previous_window():
+    """Test that the previous window's count decays as the window slides"""
+    limiter = SlidingWindowLimiter(MemoryCacheBackend())
+    rate = Rate(4, 60)
+    
+    async def run():
+        for _ in range(4):
+            await limiter.hit("test", "subject", rate, now=610.0)
+        # Just into the next window, nearly all of the previous 4 still count
+        blocked = await limiter.hit("test", "subject", rate, now=665.0)
+        # Three quarters in, only 1 of them does
+        allowed = await limiter.hit("test", "subject", rate, now=705.0)
+        return blocked, allowed
+    
+    blocked, allowed = asyncio.run(run())
+    assert blocked is not None
+    assert allowed is None
+
+class _DownBackend(MemoryCacheBackend):
+    async def incr(self, key, amount=1, ttl_seconds=60):
+        raise CacheUnavailableError("connection refused")
+
+def test_unavailable_cache_fails_open_or_closed(monkeypatch):
+    """Test that RATE_LIMIT_FAIL_OPEN decides what happens when the counters are unreachable"""
+    monkeypatch.setattr(rate_limit, "limiter", SlidingWindowLimiter(_DownBackend()))
+
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_FAIL_OPEN", True)
+    asyncio.run(rate_limit.enforce("test", "subject", Rate(1, 60)))
+
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_FAIL_OPEN", False)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(rate_limit.enforce("test", "subject", Rate(1, 60)))
+    assert exc_info.value.status_code == 503
+
+def test_login_rate_limited_before_hashing(test_user):
+    """Test that repeated logins for one account are rejected without a bcrypt verify"""
+    credentials = {"email": "test@example.com", "password": "wrongpassword"}
+    for _ in range(5):
+        response = client.post("/api/v1/auth/login", json=credentials)
+        assert response.status_code == 401
+    
+    completed = hashing_pool.completed
+    response = client.post("/api/v1/auth/login", json=credentials)
+    
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert hashing_pool.completed == completed
+
+def test_forgot_password_rate_limited(test_user):
+    """Test that password reset requests are throttled per account"""
+    for _ in range(3):
+        response = client.post("/api/v1/auth/forgot-password", json={"email": "test@example.com"})
+        assert response.status_code == 200
+    
+    response = client.post("/api/v1/auth/forgot-password", json={"email": "TEST@example.com"})
+    
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
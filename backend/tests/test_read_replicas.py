@@ -0,0 +1,144 @@
+import asyncio
+import os
+import tempfile
+
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base
+from app.core.auth import create_access_token, get_current_user
+from app.core.read_replicas import Replica, ReplicaSet, RoutingSession
+from app.core.token_cache import token_cache
+from app.models.user import User
+
+
+def _database(name, *emails):
+    """SQLite file with the schema and one user per email, as an async engine"""
+    path = os.path.join(tempfile.mkdtemp(), f"{name}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all([User(email=email, name=name, hashed_password="x") for email in emails])
+        db.commit()
+    engine.dispose()
+    return create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+
+def _read_sessions(primary, replicas):
+    return async_sessionmaker(
+        bind=primary, class_=AsyncSession, sync_session_class=RoutingSession,
+        replicas=replicas, expire_on_commit=False,
+    )
+
+
+async def _names(db):
+    return (await db.execute(select(User.name).order_by(User.email))).scalars().all()
+
+
+def test_reads_go_to_replica_until_the_session_writes():
+    """Test read routing and read-your-writes stickiness after a write"""
+    async def scenario():
+        primary = _database("primary", "a@example.com")
+        replica = Replica("replica0", _database("replica", "a@example.com"))
+        sessions = _read_sessions(primary, ReplicaSet([replica]))
+
+        async with sessions() as db:
+            assert await _names(db) == ["replica"]
+            db.add(User(email="b@example.com", name="primary", hashed_password="x"))
+            await db.commit()
+            # The new row is only on the primary, and so is every read from now on
+            assert await _names(db) == ["primary", "primary"]
+            assert db.sync_session.sticky_primary
+
+        async with sessions() as db:
+            locked = await db.execute(select(User.name).with_for_update())
+            assert locked.scalars().all() == ["primary", "primary"]
+
+        for engine in (primary, replica.engine):
+            await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_lagging_or_failing_replicas_fall_back_to_primary():
+    """Test that health checks skip lagging and unreachable replicas"""
+    async def scenario():
+        primary = _database("primary", "a@example.com")
+        lagging = Replica("replica0", _database("replica", "a@example.com"))
+        missing = Replica("replica1", create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'missing', 'x.db')}"
+        ))
+        replicas = ReplicaSet([lagging, missing], max_lag_seconds=5)
+        sessions = _read_sessions(primary, replicas)
+
+        lag = 30.0
+
+        async def measure_lag():
+            return lag
+
+        lagging.measure_lag = measure_lag
+        await replicas.check()
+        assert replicas.stats()["replica0"]["lag_seconds"] == 30.0
+        assert not lagging.healthy and not missing.healthy
+        async with sessions() as db:
+            assert await _names(db) == ["primary"]
+
+        lag = 0.5
+        await replicas.check()
+        assert lagging.healthy and not missing.healthy
+        async with sessions() as db:
+            assert await _names(db) == ["replica"]
+
+        for engine in (primary, lagging.engine, missing.engine):
+            await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_without_replicas_reads_use_primary():
+    """Test that read sessions are plain primary sessions when no replica is configured"""
+    async def scenario():
+        primary = _database("primary", "a@example.com")
+        async with _read_sessions(primary, ReplicaSet([]))() as db:
+            assert await _names(db) == ["primary"]
+        await primary.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_current_user_missing_on_lagging_replica_is_read_from_primary():
+    """Test that a user who just registered is found even if the replica has not caught up"""
+    async def scenario():
+        primary = _database("primary", "new@example.com")
+        replica = Replica("replica0", _database("replica"))
+        sessions = _read_sessions(primary, ReplicaSet([replica]))
+        await token_cache.clear()
+        token = create_access_token(data={"sub": "new@example.com"})
+
+        async with sessions() as db:
+            user = await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), db)
+            assert user.email == "new@example.com"
+            assert db.sync_session.sticky_primary
+
+        await token_cache.clear()
+        for engine in (primary, replica.engine):
+            await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_register_caches_the_new_user(test_user):
+    """Test that registration caches the user, so /me does not depend on replica lag"""
+    asyncio.run(token_cache.clear())
+    response = TestClient(app).post(
+        "/api/v1/auth/register",
+        json={"email": "fresh@example.com", "name": "Fresh", "password": "freshpassword123"},
+    )
+
+    assert response.status_code == 200
+    cached = asyncio.run(token_cache.get_user("fresh@example.com"))
+    assert cached is not None and cached.id == response.json()["user"]["id"]
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.refresh_tokens import refresh_token_digest
+from app.core.revocation import BloomFilter, RevocationList, access_key, refresh_key, revocation_list
+from app.models.user import RefreshToken, RevokedAccessToken
+
+client = TestClient(app)
+
+def _login():
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": "test@example.com", "password": "testpassword123"}
+    )
+    return response.json()
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test that every added key is found and the false positive rate is near target"""
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(f"key-{i}")
+
+    assert all(f"key-{i}" in bloom for i in range(5000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(20000))
+    assert false_positives < 20000 * 0.03
+
+def test_revocation_list_grows_and_prunes():
+    """Test that the list outgrows its initial capacity and forgets expired tokens"""
+    revocations = RevocationList(capacity=4, error_rate=0.01)
+    later = datetime.now(timezone.utc) + timedelta(hours=1)
+    for i in range(50):
+        revocations.add(f"access:{i}", later)
+    revocations.add("access:old", datetime.now(timezone.utc) - timedelta(seconds=1))
+
+    assert all(revocations.is_revoked(f"access:{i}") for i in range(50))
+    assert not revocations.is_revoked("access:old")
+    assert not revocations.is_revoked("access:never")
+
+    revocations._revoked["access:0"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+    assert revocations.prune() == 1
+    assert not revocations.is_revoked("access:0")
+
+def test_logout_revokes_refresh_and_access_tokens(test_user):
+    """Test that logout with a bearer token revokes both tokens at once"""
+    tokens = _login()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+    response = client.post("/api/v1/auth/logout", json={"refresh_token": tokens["refresh_token"]}, headers=headers)
+    assert response.status_code == 200
+
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+def test_revocations_reload_from_database(test_user, test_db, async_session_factory):
+    """Test that a fresh worker learns revocations at startup and then incrementally"""
+    tokens = _login()
+    client.post("/api/v1/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+
+    # A new worker starts with an empty list and loads it from the database
+    revocation_list.clear()
+    assert asyncio.run(revocation_list.sync(async_session_factory)) == 1
+    assert revocation_list.is_revoked(refresh_key(tokens["refresh_token"]))
+
+    # Revocations written by another worker arrive on the next sync
+    expires_at = datetime.utcnow() + timedelta(minutes=5)
+    test_db.add(RevokedAccessToken(jti="elsewhere", expires_at=expires_at, revoked_at=datetime.utcnow()))
+    test_db.commit()
+    assert not revocation_list.is_revoked(access_key("elsewhere"))
+    assert asyncio.run(revocation_list.sync(async_session_factory)) >= 1
+    assert revocation_list.is_revoked(access_key("elsewhere"))
+
+def test_refresh_requires_a_stored_token(test_user, test_db):
+    """Test that refresh is decided by the stored token row, not the token itself"""
+    tokens = _login()
+    test_db.query(RefreshToken).delete()
+    test_db.commit()
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+def test_refresh_rejects_tokens_revoked_or_expired_elsewhere(test_user, test_db):
+    """Test that refresh checks the stored row even when this worker's list has not synced"""
+    revoked = _login()["refresh_token"]
+    expired = _login()["refresh_token"]
+    rows = {row.token_hash: row for row in test_db.query(RefreshToken)}
+    rows[refresh_token_digest(revoked)].is_revoked = True
+    rows[refresh_token_digest(expired)].expires_at = datetime.utcnow() - timedelta(seconds=1)
+    test_db.commit()
+
+    assert not revocation_list.is_revoked(refresh_key(revoked))
+    for token in (revoked, expired):
+        response = client.post("/api/v1/auth/refresh", json={"refresh_token": token})
+        assert response.status_code == 401
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+
+from app.core.settings import Settings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Self time of the app's own modules under `python -X importtime`, i.e. excluding
+# FastAPI, SQLAlchemy and other libraries; about 150 ms on a typical laptop
+APP_IMPORT_BUDGET_MS = 400
+
+# Nothing listens here, so any connection attempt at import time would fail
+UNREACHABLE_DATABASE_URL = "postgresql://moodmate@127.0.0.1:1/moodmate_db"
+
+
+def _import_app(*python_args, code="import app.main"):
+    env = {**os.environ, "DATABASE_URL": UNREACHABLE_DATABASE_URL}
+    env.pop("ASYNC_DATABASE_URL", None)
+    return subprocess.run(
+        [sys.executable, *python_args, "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60,
+    )
+
+
+def test_import_does_not_touch_the_database():
+    """Test that importing the app neither connects nor loads a database driver"""
+    result = _import_app(code=(
+        "import sys, app.main; "
+        "print(sorted(m for m in ('asyncpg', 'psycopg2', 'aiosqlite') if m in sys.modules))"
+    ))
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+def test_app_import_time_budget():
+    """Test that the app's own modules stay within the import-time budget"""
+    result = _import_app("-X", "importtime")
+    assert result.returncode == 0, result.stderr
+
+    app_self_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, module = line[len("import time:"):].split("|")
+        if module.strip() == "app" or module.strip().startswith("app."):
+            app_self_us += int(self_us)
+
+    assert app_self_us > 0
+    assert app_self_us / 1000 < APP_IMPORT_BUDGET_MS
+
+
+def test_settings_parse_environment():
+    """Test that settings are typed from their upper-cased environment variables"""
+    settings = Settings.from_env({
+        "DB_POOL_SIZE": "12",
+        "RATE_LIMIT_ENABLED": "false",
+        "ALLOWED_ORIGINS": "https://a.example, https://b.example",
+        "PASSWORD_HASH_ROUNDS": "",
+        "JWT_KEY_ID": "k1",
+    })
+
+    assert settings.db_pool_size == 12
+    assert settings.rate_limit_enabled is False
+    assert settings.allowed_origins == ("https://a.example", "https://b.example")
+    assert settings.password_hash_rounds is None
+    assert settings.jwt_key_id == "k1"
+    assert settings.token_sweep_enabled is True
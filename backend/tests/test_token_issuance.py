@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event, select
+from sqlalchemy.dialects import postgresql
+
+from app.main import app
+from app.core.refresh_tokens import refresh_token_digest
+from app.core.token_issuance import _login_statement, issue_login_tokens
+from app.models.user import RefreshToken, User
+
+client = TestClient(app)
+
+
+def test_postgres_login_is_a_single_statement():
+    """Test that last_login and the refresh token are written by one statement"""
+    now = datetime.utcnow()
+    statement = _login_statement(1, now, "refresh-token", now + timedelta(days=7))
+
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("WITH touched AS")
+    assert "UPDATE users SET" in sql
+    assert "INSERT INTO refresh_tokens" in sql
+    assert sql.rstrip().endswith("RETURNING refresh_tokens.id")
+
+
+def test_login_writes_last_login_and_refresh_token_in_one_commit(test_user, async_session_factory):
+    """Test that a login commits once, with both the last_login update and the refresh token"""
+    async def scenario():
+        async with async_session_factory() as db:
+            user = await db.get(User, test_user.id)
+            commits = []
+            event.listen(db.sync_session, "after_commit", lambda session: commits.append(session))
+            _, refresh_token = await issue_login_tokens(db, user)
+
+        async with async_session_factory() as db:
+            stored = (await db.execute(
+                select(RefreshToken).where(RefreshToken.token_hash == refresh_token_digest(refresh_token))
+            )).scalar_one()
+            last_login = (await db.get(User, test_user.id)).last_login
+        return commits, stored, last_login
+
+    commits, stored, last_login = asyncio.run(scenario())
+
+    assert len(commits) == 1
+    assert stored.user_id == test_user.id and not stored.is_revoked
+    assert last_login is not None
+
+
+def test_login_for_a_deleted_user_raises_lookup_error(test_user, async_session_factory):
+    """Test that a user deleted between lookup and token issue gets LookupError and no token row"""
+    async def scenario():
+        async with async_session_factory() as db:
+            user = await db.get(User, test_user.id)
+            async with async_session_factory() as other:
+                await other.execute(delete(User).where(User.id == test_user.id))
+                await other.commit()
+            with pytest.raises(LookupError):
+                await issue_login_tokens(db, user)
+            return (await db.execute(select(RefreshToken))).scalars().all()
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_login_race_with_deletion_is_unauthorized(test_user, monkeypatch):
+    """Test that login answers 401, not 500, when the user disappears mid-login"""
+    async def deleted(db, user):
+        raise LookupError(f"User {user.id} no longer exists")
+
+    monkeypatch.setattr("app.api.auth.issue_login_tokens", deleted)
+    response = client.post("/api/v1/auth/login", json={"email": "test@example.com", "password": "testpassword123"})
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Incorrect email or password"
@@ -0,0 +1,88 @@
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+from app.core.token_signing import InvalidTokenError, TokenSigner
+
+
+def _pem_pair(private_key):
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return private_pem, public_pem
+
+
+def _claims(ttl=60):
+    return {"sub": "test@example.com", "exp": int(time.time()) + ttl}
+
+
+def test_hmac_round_trip():
+    """Test encoding and decoding with a shared secret"""
+    signer = TokenSigner("HS256", signing_key="secret")
+
+    token = signer.encode(_claims())
+
+    assert signer.decode(token)["sub"] == "test@example.com"
+    assert signer.jwks() == {"keys": []}
+
+
+@pytest.mark.parametrize("algorithm,private_key", [
+    ("ES256", ec.generate_private_key(ec.SECP256R1())),
+    ("EdDSA", ed25519.Ed25519PrivateKey.generate()),
+])
+def test_asymmetric_tokens_verify_with_public_key_only(algorithm, private_key):
+    """Test that a verify-only signer accepts tokens without the private key"""
+    private_pem, public_pem = _pem_pair(private_key)
+    signer = TokenSigner(algorithm, signing_key=private_pem, key_id="k1")
+    verifier = TokenSigner(algorithm, verification_key=public_pem)
+
+    token = signer.encode(_claims())
+
+    assert verifier.decode(token)["sub"] == "test@example.com"
+    assert not verifier.can_sign
+    with pytest.raises(RuntimeError):
+        verifier.encode(_claims())
+    assert signer.jwks()["keys"][0]["kid"] == "k1"
+
+
+def test_rejects_expired_tampered_and_foreign_tokens():
+    """Test that expiry, signature and algorithm are enforced"""
+    signer = TokenSigner("HS256", signing_key="secret")
+    header, payload, signature = signer.encode(_claims()).split(".")
+    private_pem, public_pem = _pem_pair(ec.generate_private_key(ec.SECP256R1()))
+
+    with pytest.raises(InvalidTokenError):
+        signer.decode(signer.encode(_claims(ttl=-10)))
+    with pytest.raises(InvalidTokenError):
+        signer.decode(".".join([header, payload, signature[::-1]]))
+    with pytest.raises(InvalidTokenError):
+        signer.decode(TokenSigner("HS256", signing_key="other").encode(_claims()))
+    with pytest.raises(InvalidTokenError):
+        # An HS256 token must not be accepted by an ES256 verifier
+        TokenSigner("ES256", verification_key=public_pem).decode(signer.encode(_claims()))
+    with pytest.raises(InvalidTokenError):
+        signer.decode(signer.encode({"sub": "test@example.com"}))
+
+
+def test_decode_matches_pyjwt_and_checks_time_claims():
+    """Test that tokens are accepted like PyJWT accepts them, without re-preparing the key"""
+    signer = TokenSigner("HS256", signing_key="secret", leeway_seconds=0)
+    foreign = jwt.encode({**_claims(), "iat": int(time.time())}, "secret", algorithm="HS256", headers={"kid": "x"})
+
+    assert signer.decode(foreign)["sub"] == "test@example.com"
+    for claims in ({**_claims(), "nbf": int(time.time()) + 60}, {**_claims(), "iat": int(time.time()) + 60},
+                   {**_claims(), "exp": "soon"}):
+        with pytest.raises(InvalidTokenError):
+            signer.decode(signer.encode(claims))
+    for garbage in ("", "a.b", "a.b.c.d", "!!!.???.***"):
+        with pytest.raises(InvalidTokenError):
+            signer.decode(garbage)
+    none_token = jwt.encode(_claims(), None, algorithm="none")
+    with pytest.raises(InvalidTokenError):
+        signer.decode(none_token)
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.core.token_sweeper import sweep_tokens
+from app.models.email_job import EmailJob
+from app.models.user import PasswordResetToken, RefreshToken, User
+
+
+def test_sweep_deletes_dead_tokens_in_batches():
+    """Test that expired and used tokens and old failed email jobs are deleted, the rest kept"""
+    path = os.path.join(tempfile.mkdtemp(), "sweep.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+
+    with sessionmaker(bind=engine)() as db:
+        user = User(email="sweep@example.com", name="Sweep", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(
+            [RefreshToken(user_id=user.id, token=f"expired-{i}", expires_at=now - timedelta(days=1)) for i in range(5)]
+            + [RefreshToken(user_id=user.id, token="revoked", expires_at=now + timedelta(days=1), is_revoked=True)]
+            + [RefreshToken(user_id=user.id, token="live", expires_at=now + timedelta(days=1), is_revoked=False)]
+            + [
+                PasswordResetToken(email=user.email, token="used", expires_at=now + timedelta(hours=1), used=True),
+                PasswordResetToken(email=user.email, token="stale", expires_at=now - timedelta(hours=1), used=False),
+                PasswordResetToken(email=user.email, token="pending", expires_at=now + timedelta(hours=1), used=False),
+            ]
+            + [
+                EmailJob(template="password_reset", recipient=user.email, context={"token": "old"},
+                         status="failed", attempts=5, run_at=now - timedelta(days=2)),
+                EmailJob(template="password_reset", recipient=user.email, context={"token": "recent"},
+                         status="failed", attempts=5, run_at=now - timedelta(minutes=5)),
+                EmailJob(template="welcome", recipient=user.email, context={"name": "Sweep"},
+                         status="pending", attempts=0, run_at=now - timedelta(days=2)),
+            ]
+        )
+        db.commit()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    deleted = asyncio.run(sweep_tokens(async_sessionmaker(async_engine), batch_size=2))
+    asyncio.run(async_engine.dispose())
+
+    assert deleted == {
+        "refresh_tokens": 5, "revoked_access_tokens": 0, "password_reset_tokens": 2, "email_jobs": 1,
+    }
+    with sessionmaker(bind=engine)() as db:
+        assert sorted(t.token for t in db.query(RefreshToken)) == ["live", "revoked"]
+        assert [t.token for t in db.query(PasswordResetToken)] == ["pending"]
+        # Recent failures stay for inspection; pending jobs are never swept
+        assert sorted(job.status for job in db.query(EmailJob)) == ["failed", "pending"]
+    engine.dispose()